@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Локальная замена api.php для проверки режима INGEST="api" без сети.
+Ответы собираются из заготовленного JSON (по умолчанию bench_corpus/api.json —
+те же статьи, что HTML-корпус бенчмарка, в виде викитекста):
+
+  {"pages":      {название: {"revid": N, "categories": [...], "content": викитекст}},
+   "redirects":  {откуда: куда},
+   "categories": {категория: [названия участников]}}
+
+Сервер отвечает как MediaWiki (format=json, formatversion=2):
+  - list=categorymembers — не больше MAX_MEMBERS за ответ, дальше continue/cmcontinue;
+  - prop=revisions|categories и prop=info — с normalized, redirects и missing;
+  - list=recentchanges — пустой список (правок после прогона нет).
+
+  python api_stub.py serve [--port N] [--fixture FILE]
+        только сервер: для ручного прогона lab.py с API_URL=http://127.0.0.1:N/ru/api.php;
+  python api_stub.py crawl [--fixture FILE] [--out FILE]
+        прогон lab с INGEST="api" против сервера (семена + категории фикстуры),
+        итог — JSON: число триплетов и запросов по видам.
+"""
+from __future__ import annotations
+
+import argparse
+import http.server
+import json
+import logging
+import os
+import tempfile
+import threading
+import urllib.parse
+from collections import Counter
+from typing import Optional
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_corpus", "api.json")
+API_PATH = "/ru/api.php"
+MAX_MEMBERS = 10  # участников категории за ответ: меньше CATEGORY_LIMIT, чтобы continue работал и на малом корпусе
+
+
+def load_fixture(path: str = FIXTURE) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("redirects", {})
+    data.setdefault("categories", {})
+    return data
+
+
+# -----------------------------
+# Ответы api.php
+# -----------------------------
+def _normalize(title: str) -> str:
+    title = title.replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+def _resolve(fixture: dict, titles: list[str]) -> tuple[dict, list[str]]:
+    """normalized/redirects как у MediaWiki и итоговые названия в порядке запроса."""
+    normalized, redirects, resolved = [], [], []
+    for title in titles:
+        name = _normalize(title)
+        if name != title:
+            normalized.append({"from": title, "to": name})
+        target = fixture["redirects"].get(name)
+        if target is not None:
+            redirects.append({"from": name, "to": target})
+            name = target
+        if name not in resolved:
+            resolved.append(name)
+    query = {}
+    if normalized:
+        query["normalized"] = normalized
+    if redirects:
+        query["redirects"] = redirects
+    return query, resolved
+
+
+def category_members(fixture: dict, params: dict) -> dict:
+    category = params.get("cmtitle", "").split(":", 1)[-1]
+    members = fixture["categories"].get(category, [])
+    start = int(params.get("cmcontinue") or 0)
+    limit = min(int(params.get("cmlimit") or MAX_MEMBERS), MAX_MEMBERS)
+    chunk = members[start:start + limit]
+    data = {"batchcomplete": True,
+            "query": {"categorymembers": [{"ns": 0, "title": t} for t in chunk]}}
+    if start + limit < len(members):
+        data["continue"] = {"cmcontinue": str(start + limit), "continue": "-||"}
+    return data
+
+
+def pages(fixture: dict, params: dict) -> dict:
+    titles = [t for t in params.get("titles", "").split("|") if t]
+    query, resolved = _resolve(fixture, titles)
+    props = set(params.get("prop", "").split("|"))
+    result = []
+    for name in resolved:
+        page = fixture["pages"].get(name)
+        if page is None:
+            result.append({"ns": 0, "title": name, "missing": True})
+            continue
+        entry = {"ns": 0, "title": name}
+        if "info" in props:
+            entry["lastrevid"] = page["revid"]
+        if "revisions" in props:
+            entry["revisions"] = [{"revid": page["revid"],
+                                   "slots": {"main": {"contentmodel": "wikitext", "content": page["content"]}}}]
+        if "categories" in props:
+            entry["categories"] = [{"ns": 14, "title": "Категория:" + c} for c in page.get("categories", [])]
+        result.append(entry)
+    query["pages"] = result
+    return {"batchcomplete": True, "query": query}
+
+
+def respond(fixture: dict, params: dict) -> dict:
+    if params.get("action") != "query":
+        return {"error": {"code": "badvalue", "info": f"Unrecognized action: {params.get('action')}"}}
+    if params.get("list") == "categorymembers":
+        return category_members(fixture, params)
+    if params.get("list") == "recentchanges":
+        return {"batchcomplete": True, "query": {"recentchanges": []}}
+    if params.get("titles"):
+        return pages(fixture, params)
+    return {"error": {"code": "missingparam", "info": "Nothing to query"}}
+
+
+def serve(fixture: dict, port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Сервер в фоновом потоке; server.requests — счётчик запросов по видам (list/prop)."""
+    requests = Counter()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urllib.parse.urlsplit(self.path)
+            if parts.path != API_PATH:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            params = dict(urllib.parse.parse_qsl(parts.query))
+            requests[params.get("list") or params.get("prop") or params.get("action")] += 1
+            body = json.dumps(respond(fixture, params), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.requests = requests
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def api_url(server: http.server.ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}{API_PATH}"
+
+
+# -----------------------------
+# Прогон lab против сервера
+# -----------------------------
+def crawl(fixture: dict, out: Optional[str] = None) -> dict:
+    """lab в режиме api против сервера; выходные файлы — во временном каталоге (граф — в out, если задан)."""
+    server = serve(fixture)
+    os.chdir(tempfile.mkdtemp(prefix="hp-kg-api-"))
+    import lab
+    lab.INGEST = "api"
+    lab.API_URL = api_url(server)
+    lab.page_cache = None
+    lab.METRICS_FILE = lab.METRICS_PROM_FILE = None
+    lab.reporter.json_path = lab.reporter.prom_path = None
+    if out:
+        lab.OUT_FILE = out
+
+    lab.start_crawl()
+    try:
+        seeds = [t for t in lab.CHAR_SEED + lab.MUGGLE_SEED + lab.SQUIB_SEED if t in fixture["pages"]]
+        lab.scrape_titles(seeds)
+        for category, members in fixture["categories"].items():
+            lab.scrape_category_characters(category, cap=len(members))
+    finally:
+        lab.stop_category_listing()
+        lab.engine.close()
+    lab.finish_crawl()
+    server.shutdown()
+    return {"triples": len(lab.g), "pages": lab.metrics.snapshot()["counters"].get("pages", 0),
+            "requests": dict(server.requests), "out": os.path.abspath(lab.OUT_FILE)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный api.php из заготовленного JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="только сервер")
+    p.add_argument("--port", type=int, default=8765)
+    p = sub.add_parser("crawl", help="прогон lab с INGEST=\"api\" против сервера")
+    p.add_argument("--out", help="куда записать граф (по умолчанию — во временный каталог)")
+    for name in ("serve", "crawl"):
+        sub.choices[name].add_argument("--fixture", default=FIXTURE)
+
+    args = parser.parse_args(argv)
+    fixture = load_fixture(os.path.abspath(args.fixture))
+    if args.command == "serve":
+        server = serve(fixture, args.port)
+        print(f"api.php: {api_url(server)} (Ctrl+C — остановить)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    out = os.path.abspath(args.out) if args.out else None
+    print(json.dumps(crawl(fixture, out), ensure_ascii=False, indent=1, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Офлайн-бенчмарк краулера на записанном корпусе страниц.
+Корпус — обычный кеш страниц (PageCache, CACHE_DIR): его наполняет любой
+прогон lab.py с включённым кешем или команда record. Без --cache micro и e2e
+берут небольшой корпус из bench_corpus/ (манифест: путь страницы → HTML-файл),
+так что бенчмарк работает и без записанного кеша, и без сети.
+Там же api.json — те же статьи викитекстом, для локального api.php (api_stub.py).
+
+  python bench.py record  [--cache DIR] [--base URL] [--cap N]
+        небольшой прогон (семена + первые категории персонажей) в кеш;
+  python bench.py micro   [--cache DIR] [--limit N] [--repeat R] [--out FILE]
+        горячие функции по каждой статье корпуса: разбор страницы (stream и дерево),
+        parse_infobox, parse_family_field_from_infobox,
+        extract_family_relations_from_text, type_from_sources, scrape_character
+        (страницы — из кеша, без сети);
+  python bench.py e2e     [--cache DIR] [--latency SEC] [--out FILE]
+        main() целиком против локального HTTP-сервера, который отдаёт корпус;
+  python bench.py compare OLD.json NEW.json
+        разница двух результатов (пропускная способность и p50 стадий).
+
+Результат — JSON: страниц/с, задержки стадий (count/sum/квантили, как в metrics.py),
+пиковая память (tracemalloc — отдельным проходом, чтобы не искажать время; ru_maxrss).
+"""
+from __future__ import annotations
+
+import argparse
+import http.server
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from typing import Iterator, Optional
+
+from bs4 import BeautifulSoup
+
+from metrics import Stage
+from page_cache import PageCache
+
+DEFAULT_CACHE = ".hp_cache"
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_corpus")
+FIXTURE_BASE = "https://harrypotter.fandom.com/ru/wiki/"  # lab.BASE, от которого строятся URL корпуса
+
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _version() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def article_title(url: str) -> Optional[str]:
+    """Заголовок статьи по URL вида .../wiki/Название; None — категория, api.php и т.п."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.query or "/wiki/" not in parts.path:
+        return None
+    title = urllib.parse.unquote(parts.path.split("/wiki/", 1)[1]).replace("_", " ")
+    return None if ":" in title else title
+
+
+def article_base(url: str) -> str:
+    """Префикс статей записанного URL (как lab.BASE): https://host/ru/wiki/."""
+    return url.split("/wiki/", 1)[0] + "/wiki/"
+
+
+def corpus(cache: PageCache, limit: Optional[int] = None) -> Iterator[tuple[str, str, str]]:
+    """(url, заголовок, html) для статей из кеша."""
+    n = 0
+    for entry in cache.entries():
+        title = article_title(entry.url)
+        if title is None:
+            continue
+        text = cache.read(entry)
+        if text is None:
+            continue
+        yield entry.url, title, text
+        n += 1
+        if limit and n >= limit:
+            return
+
+
+def fixture_cache(root: str = FIXTURES, base: str = FIXTURE_BASE) -> PageCache:
+    """
+    Корпус из bench_corpus/ во временном кеше. Ключи манифеста — путь страницы от base
+    («Категория:Люди?from=...»); URL строится так же, как lab.fandom_url и ссылки пагинации.
+    """
+    with open(os.path.join(root, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    cache = PageCache(tempfile.mkdtemp(prefix="hp-kg-corpus-"), offline=True)
+    for path, name in manifest.items():
+        path, _, query = path.partition("?")
+        url = urllib.parse.urljoin(base, urllib.parse.quote(path.replace(" ", "_")))
+        if query:
+            url += "?" + urllib.parse.quote(query, safe="=&")
+        with open(os.path.join(root, name), encoding="utf-8") as f:
+            cache.store(url, f.read())
+    return cache
+
+
+def open_corpus(args) -> PageCache:
+    return PageCache(args.cache, offline=True) if args.cache else fixture_cache()
+
+
+class Timings:
+    def __init__(self):
+        self.stages: dict[str, Stage] = {}
+
+    def run(self, stage: str, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        self.stages.setdefault(stage, Stage()).observe(time.perf_counter() - started)
+        return result
+
+    def snapshot(self) -> dict:
+        return {name: stage.snapshot() for name, stage in self.stages.items()}
+
+
+def _isolated_lab(workdir: str, cache: Optional[PageCache]):
+    """lab с выходными файлами во workdir; страницы — только из cache (или по сети, если None)."""
+    os.chdir(workdir)
+    import lab
+    lab.page_cache = cache
+    lab.METRICS_FILE = lab.METRICS_PROM_FILE = None
+    lab.reporter.json_path = lab.reporter.prom_path = None
+    return lab
+
+
+# -----------------------------
+# micro
+# -----------------------------
+def _micro_pass(lab, pages, timings: Optional[Timings], repeat: int):
+    from extract import (extract_page, parse_infobox, parse_family_field_from_infobox,
+                         extract_family_relations_from_text)
+    run = timings.run if timings else (lambda _stage, fn, *args: fn(*args))
+    for _ in range(repeat):
+        for _url, _title, text in pages:
+            run("extract_stream", extract_page, text, "stream")
+            soup = run("soup", BeautifulSoup, text, "html.parser")
+            info = run("parse_infobox", parse_infobox, soup)
+            family = info.get("Семья")
+            if family and family["text"]:
+                run("parse_family_field", parse_family_field_from_infobox, family["text"])
+            run("family_relations_text", extract_family_relations_from_text, soup, "")
+            page = extract_page(text, "stream")
+            if page.has_infobox:
+                run("type_from_sources", lab.type_from_sources, page.infobox, page.categories, page.text)
+
+
+def cmd_micro(args) -> dict:
+    cache = open_corpus(args)
+    pages = list(corpus(cache, args.limit))
+    if not pages:
+        raise SystemExit(f"Корпус пуст: {args.cache or FIXTURES} (сначала bench.py record или прогон lab.py с кешем)")
+    workdir = tempfile.mkdtemp(prefix="hp-kg-bench-")
+    lab = _isolated_lab(workdir, cache)
+    # URL статей строятся от BASE: он должен совпасть с тем, с которого записан корпус
+    lab.BASE = article_base(pages[0][0])
+
+    timings = Timings()
+    started = time.perf_counter()
+    _micro_pass(lab, pages, timings, args.repeat)
+    elapsed = time.perf_counter() - started
+
+    # scrape_character целиком: граф, реестр, типы родственников — страницы из кеша
+    lab.start_crawl()
+    scrape_started = time.perf_counter()
+    for _url, title, _text in pages:
+        timings.run("scrape_character", lab.scrape_character, title)
+    scrape_elapsed = time.perf_counter() - scrape_started
+    lab.engine.close()
+
+    tracemalloc.start()
+    _micro_pass(lab, pages, None, 1)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "pages": len(pages), "repeat": args.repeat,
+        "hot_path_pages_per_sec": len(pages) * args.repeat / elapsed,
+        "scrape_pages_per_sec": len(pages) / scrape_elapsed,
+        "triples": len(lab.g),
+        "stages": timings.snapshot(),
+        "tracemalloc_peak_bytes": traced_peak,
+    }
+
+
+# -----------------------------
+# e2e: main() против локального сервера с корпусом
+# -----------------------------
+def corpus_server(cache: PageCache, origin: str, latency: float = 0.0) -> http.server.ThreadingHTTPServer:
+    """HTTP-сервер: путь запроса + origin записанного URL → тело из кеша (или 404)."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            # кеш хранит URL в том виде, в каком его построил краулер; клиент мог его закодировать
+            entry = cache.lookup(origin + self.path) or cache.lookup(origin + urllib.parse.unquote(self.path))
+            body = cache.read(entry) if entry else None
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def cmd_e2e(args) -> dict:
+    cache = open_corpus(args)
+    workdir = tempfile.mkdtemp(prefix="hp-kg-bench-")
+    lab = _isolated_lab(workdir, None)
+    first = next(cache.entries(), None)
+    if first is None:
+        raise SystemExit(f"Корпус пуст: {args.cache or FIXTURES}")
+    origin = args.origin or "{0.scheme}://{0.netloc}".format(urllib.parse.urlsplit(first.url))
+    server = corpus_server(cache, origin, args.latency)
+    local = f"http://127.0.0.1:{server.server_port}"
+    lab.BASE = local + urllib.parse.urlsplit(article_base(first.url)).path
+    lab.API_URL = lab.API_URL and local + urllib.parse.urlsplit(lab.API_URL).path
+    lab.engine.rate = args.rate
+    lab.engine.max_rate = max(lab.engine.max_rate or 0, args.rate)
+
+    started = time.perf_counter()
+    lab.main()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    snapshot = lab.metrics.snapshot()
+    pages = snapshot["counters"].get("pages", 0)
+    return {
+        "seconds": elapsed, "pages": pages, "pages_per_sec": pages / elapsed,
+        "triples": len(lab.g), "stages": snapshot["stages"],
+        "transport": snapshot["sources"].get("transport"),
+    }
+
+
+# -----------------------------
+# record / compare
+# -----------------------------
+def cmd_record(args) -> dict:
+    cache = PageCache(args.cache)
+    workdir = tempfile.mkdtemp(prefix="hp-kg-bench-")
+    lab = _isolated_lab(workdir, cache)
+    if args.base:
+        lab.BASE = args.base
+    lab.start_crawl()
+    try:
+        lab.scrape_titles(lab.CHAR_SEED + lab.MUGGLE_SEED + lab.SQUIB_SEED)
+        for cat in lab.PERSON_CATS[:args.categories]:
+            lab.scrape_category_characters(cat, cap=args.cap)
+    finally:
+        lab.stop_category_listing()
+        lab.engine.close()
+    return {"cache": os.path.abspath(args.cache), "pages": sum(1 for _ in corpus(cache))}
+
+
+def cmd_compare(args) -> dict:
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows = []
+    for key in sorted(k for k in set(old) & set(new) if k.endswith("per_sec")):
+        rows.append((key, old[key], new[key]))
+    for stage in sorted(set(old.get("stages", {})) & set(new.get("stages", {}))):
+        a = old["stages"][stage]["quantiles"]["0.5"]
+        b = new["stages"][stage]["quantiles"]["0.5"]
+        rows.append((f"{stage} p50, мс", a and a * 1000, b and b * 1000))
+    for name, a, b in rows:
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "—"
+        print(f"{name:<36}{a or 0:>12.3f}{b or 0:>12.3f}{change:>10}")
+    return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк краулера на записанном корпусе")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="наполнить корпус небольшим прогоном")
+    p.add_argument("--cache", default=DEFAULT_CACHE)
+    p.add_argument("--base", help="вики вместо lab.BASE (например, зеркало)")
+    p.add_argument("--cap", type=int, default=100, help="статей на категорию")
+    p.add_argument("--categories", type=int, default=2, help="сколько первых PERSON_CATS")
+
+    p = sub.add_parser("micro", help="горячие функции по корпусу")
+    p.add_argument("--cache", help="записанный кеш страниц (по умолчанию — bench_corpus/)")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("e2e", help="main() против локального сервера с корпусом")
+    p.add_argument("--cache", help="записанный кеш страниц (по умолчанию — bench_corpus/)")
+    p.add_argument("--origin", help="схема и хост записанных URL (по умолчанию — из корпуса)")
+    p.add_argument("--latency", type=float, default=0.0, help="искусственная задержка ответа, сек")
+    p.add_argument("--rate", type=float, default=200.0, help="запросов/с к локальному серверу")
+
+    p = sub.add_parser("compare", help="сравнить два результата")
+    p.add_argument("old")
+    p.add_argument("new")
+
+    for name in ("record", "micro", "e2e"):
+        sub.choices[name].add_argument("--out", help="куда записать результат (JSON)")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        cmd_compare(args)
+        return
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    # режимы переходят во временный каталог (_isolated_lab): относительные пути — от текущего
+    out = os.path.abspath(args.out) if args.out else None
+    if args.cache:
+        args.cache = os.path.abspath(args.cache)
+    result = {"command": args.command, "version": _version(), "timestamp": time.time()}
+    result.update({"record": cmd_record, "micro": cmd_micro, "e2e": cmd_e2e}[args.command](args))
+    result["peak_rss_kb"] = _peak_rss_kb()
+    text = json.dumps(result, ensure_ascii=False, indent=1, sort_keys=True)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Перечисление категорий независимо от скрапинга статей.
+CategoryLister — поток-производитель: идёт по пагинации категории через
+FetchEngine и складывает разобранные страницы списка в ограниченную очередь.
+Пока потребитель скрапит участников страницы N, страницы N+1… уже скачаны;
+очередь на pages_ahead страниц не даёт производителю уйти далеко вперёд.
+Листеры всех категорий прогона запускаются сразу и работают параллельно
+(общие лимиты — у FetchEngine). Состояние обхода (CrawlState, SQLite) трогает
+только потребитель в основном потоке: курсор сдвигается, когда страница
+из очереди реально взята в работу, так что продолжение после падения не меняется.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import urllib.parse
+from typing import Callable, Optional
+
+_END = object()  # страниц больше нет (или листер остановлен)
+
+
+class CategoryLister:
+    """
+    get_page(url) → PageExtract (или None); members и next_href — из страницы.
+    limit — сколько заголовков достаточно (cap категории): дальше пагинацию не качаем;
+    если после дедупликации их всё же не хватило, truncated=True и потребитель
+    продолжает новым листером с курсора.
+    """
+
+    def __init__(self, category: str, start_url: str, get_page: Callable[[str], object],
+                 base: str = "", pages_ahead: int = 2, limit: Optional[int] = None):
+        self.category = category
+        self.start_url = start_url
+        self.base = base
+        self.limit = limit
+        self.pages_fetched = 0
+        self._get_page = get_page
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, pages_ahead))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.finished = False
+        self.truncated = False
+
+    def start(self) -> CategoryLister:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._produce, daemon=True,
+                                            name=f"hp-kg-category:{self.category}")
+            self._thread.start()
+        return self
+
+    def _resolve(self, href: Optional[str]) -> Optional[str]:
+        if href and href.startswith("/"):
+            return urllib.parse.urljoin(self.base, href)
+        return href
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        url, listed = self.start_url, 0
+        try:
+            while url and not self._stop.is_set():
+                page = self._get_page(url)
+                if not page:
+                    break
+                self.pages_fetched += 1
+                url = self._resolve(page.next_href)
+                listed += len(page.members)
+                if not self._put((page.members, url)):
+                    return
+                if url and self.limit and listed >= self.limit:
+                    self.truncated = True
+                    break
+        finally:
+            self._put(_END)
+
+    def next_page(self) -> Optional[tuple[list[str], Optional[str]]]:
+        """
+        Следующая страница списка: (заголовки, URL следующей страницы или None).
+        None — пагинация кончилась (или страница недоступна).
+        """
+        if self.finished:
+            return None
+        self.start()
+        item = self._queue.get()
+        if item is _END:
+            self.finished = True
+            return None
+        return item
+
+    def close(self):
+        self._stop.set()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Скомпилированные признаки для определения типа (type_from_sources).
+Словарь правил (подстроки и основы слов) собирается заранее в TextMatcher:
+регулярки с границей слова компилируются один раз при импорте.
+PageSignals приводит текст к нижнему регистру один раз и запоминает каждую
+проверку — каскад решений в lab.py читает готовые ответы и не проходит
+по тексту статьи повторно.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterable, Optional
+
+logger = logging.getLogger("hp-kg")
+
+
+class TextMatcher:
+    """
+    substrings — подстроки «где угодно» (как `x in text`);
+    word_stems — начала слов (\\bоснова, без учёта регистра).
+    Проверка, которой нет в словаре (правило дописали в lab.py, а сюда — нет),
+    не падает: считается как обычно, в лог — одно предупреждение на подстроку.
+    """
+
+    def __init__(self, substrings: Iterable[str] = (), word_stems: Iterable[str] = ()):
+        self.substrings = frozenset(substrings)
+        self.word_res = {stem: self._compile(stem) for stem in word_stems}
+        self._undeclared: set[tuple[str, str]] = set()
+
+    @staticmethod
+    def _compile(stem: str) -> re.Pattern:
+        return re.compile(rf"(?iu)\b{re.escape(stem)}")
+
+    def undeclared(self, kind: str, value: str):
+        if (kind, value) not in self._undeclared:
+            self._undeclared.add((kind, value))
+            logger.warning("%s не объявлена в TextMatcher: %r", kind, value)
+
+    def word_re(self, stem: str) -> re.Pattern:
+        pattern = self.word_res.get(stem)
+        if pattern is None:
+            self.undeclared("Основа слова", stem)
+            pattern = self.word_res[stem] = self._compile(stem)
+        return pattern
+
+    def signals(self, text: str) -> PageSignals:
+        return PageSignals(self, text)
+
+
+class PageSignals:
+    """
+    Совпадения по одному тексту. Каждая проверка считается при первом
+    обращении и запоминается: ранний выход каскада не платит за остальные.
+    """
+
+    def __init__(self, matcher: TextMatcher, text: str):
+        self._matcher = matcher
+        self._text = text
+        self._lower: Optional[str] = None
+        self._seen: dict[str, bool] = {}
+        self._words: dict[str, bool] = {}
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self._text.lower()
+        return self._lower
+
+    def has(self, substring: str) -> bool:
+        if substring not in self._matcher.substrings:
+            self._matcher.undeclared("Подстрока", substring)
+        hit = self._seen.get(substring)
+        if hit is None:
+            hit = self._seen[substring] = substring in self.lower
+        return hit
+
+    def any(self, substrings: Iterable[str]) -> bool:
+        return any(self.has(s) for s in substrings)
+
+    def has_word(self, stem: str) -> bool:
+        hit = self._words.get(stem)
+        if hit is None:
+            # сначала дешёвая проверка подстроки (на C), регулярка — только если она есть
+            hit = self._words[stem] = (
+                stem in self.lower and self._matcher.word_re(stem).search(self.lower) is not None
+            )
+        return hit
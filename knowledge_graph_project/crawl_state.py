@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Состояние обхода в SQLite: очередь (frontier) по категориям, курсоры пагинации,
+посещённые страницы и кеш типов. Все изменения копятся в одной транзакции
+и фиксируются commit() вместе с чекпоинтом графа — после падения прогон
+продолжается с последнего чекпоинта, уже скачанные страницы не запрашиваются.
+Кеш типов новый прогон не сбрасывает: устаревание решает TypeCache по checked_at.
+Ревизии скрапленных статей и время прошлого прогона тоже переживают begin():
+по ним обновление (lab.update_main) находит, что изменилось на вики.
+Так же живёт происхождение триплетов: источник — (статья, экстрактор, ревизия),
+у каждого свой набор триплетов; вклад страницы убирается за O(её триплетов).
+Термы хранятся закодированными строками (triple_store.encode), как в SQLiteStore.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from typing import Iterable, Iterator, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS visited (
+    title TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    category TEXT PRIMARY KEY,
+    next_url TEXT,          -- следующая страница пагинации (NULL — страниц больше нет)
+    done     INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    category TEXT NOT NULL,
+    title    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frontier_by_category ON frontier(category, seq);
+CREATE TABLE IF NOT EXISTS category_seen (
+    category TEXT NOT NULL,
+    title    TEXT NOT NULL,
+    PRIMARY KEY (category, title)
+);
+CREATE TABLE IF NOT EXISTS type_cache (
+    title      TEXT PRIMARY KEY,
+    type_uri   TEXT,                    -- NULL — тип определить не удалось
+    checked_at REAL NOT NULL DEFAULT 0  -- unix time проверки
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    title  TEXT PRIMARY KEY,  -- заголовок, под которым статья скраплена
+    page   TEXT,              -- каноническое название (после редиректа), если известно
+    revid  INTEGER            -- ревизия, из которой взяты триплеты (NULL — неизвестна)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    id        INTEGER PRIMARY KEY,
+    page      TEXT NOT NULL,     -- статья или категория, откуда извлечено
+    extractor TEXT NOT NULL,     -- infobox | family_infobox | family_section | family_text | category | seed
+    revid     INTEGER,           -- ревизия статьи (NULL — неизвестна)
+    UNIQUE (page, extractor)
+);
+CREATE TABLE IF NOT EXISTS provenance (
+    source INTEGER NOT NULL,
+    s      TEXT NOT NULL,
+    p      TEXT NOT NULL,
+    o      TEXT NOT NULL,
+    PRIMARY KEY (source, s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS provenance_by_triple ON provenance(s, p, o);
+"""
+
+_TABLES = ("visited", "cursors", "frontier", "category_seen")
+
+
+class CrawlState:
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(type_cache)")}
+        if "checked_at" not in columns:
+            # файл состояния старого формата: записи без времени считаются устаревшими
+            self.db.execute("ALTER TABLE type_cache ADD COLUMN checked_at REAL NOT NULL DEFAULT 0")
+        self.db.commit()
+
+    # --- прогон целиком ---
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, value))
+
+    def unfinished(self) -> bool:
+        return self._meta("status") == "running"
+
+    def mode(self) -> str:
+        """Вид последнего прогона: "crawl" (полный обход) или "update" (только изменившиеся статьи)."""
+        return self._meta("mode") or "crawl"
+
+    def last_crawl(self) -> Optional[float]:
+        """Начало последнего завершённого прогона (unix time); None — такого не было."""
+        value = self._meta("last_crawl")
+        return float(value) if value else None
+
+    def begin(self, mode: str = "crawl"):
+        """Новый прогон: старое состояние больше не нужно."""
+        for table in _TABLES:
+            self.db.execute(f"DELETE FROM {table}")
+        self._set_meta("status", "running")
+        self._set_meta("mode", mode)
+        self._set_meta("started", repr(time.time()))
+        self.db.commit()
+
+    def finish(self):
+        self._set_meta("status", "done")
+        started = self._meta("started")
+        if started:
+            # страницы прогона не старше его начала: следующее обновление ищет правки после него
+            self._set_meta("last_crawl", started)
+        self.db.commit()
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # --- посещённые страницы ---
+    def is_visited(self, title: str) -> bool:
+        return self.db.execute("SELECT 1 FROM visited WHERE title = ?", (title,)).fetchone() is not None
+
+    def mark_visited(self, title: str):
+        self.db.execute("INSERT OR IGNORE INTO visited(title) VALUES (?)", (title,))
+
+    def visited_titles(self) -> Iterator[str]:
+        for (title,) in self.db.execute("SELECT title FROM visited"):
+            yield title
+
+    # --- курсоры категорий ---
+    def cursor(self, category: str, start_url: str) -> tuple[Optional[str], bool]:
+        row = self.db.execute("SELECT next_url, done FROM cursors WHERE category = ?", (category,)).fetchone()
+        if row is None:
+            self.db.execute("INSERT INTO cursors(category, next_url) VALUES (?, ?)", (category, start_url))
+            return start_url, False
+        return row[0], bool(row[1])
+
+    def advance(self, category: str, next_url: Optional[str]):
+        self.db.execute("UPDATE cursors SET next_url = ? WHERE category = ?", (next_url, category))
+
+    def close_cursor(self, category: str):
+        self.db.execute("UPDATE cursors SET next_url = NULL, done = 1 WHERE category = ?", (category,))
+        self.db.execute("DELETE FROM frontier WHERE category = ?", (category,))
+
+    # --- очередь ---
+    def push(self, category: str, titles: Iterable[str]) -> list[str]:
+        """Ставит в очередь категории новые (ещё не виденные в ней) заголовки и возвращает их."""
+        queued = []
+        for title in titles:
+            cur = self.db.execute(
+                "INSERT OR IGNORE INTO category_seen(category, title) VALUES (?, ?)", (category, title)
+            )
+            if cur.rowcount:
+                self.db.execute("INSERT INTO frontier(category, title) VALUES (?, ?)", (category, title))
+                queued.append(title)
+        return queued
+
+    def pending(self, category: str) -> list[str]:
+        rows = self.db.execute(
+            "SELECT title FROM frontier WHERE category = ? ORDER BY seq", (category,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def processed(self, category: str) -> int:
+        """Сколько заголовков категории уже выдано и обработано."""
+        row = self.db.execute(
+            "SELECT (SELECT COUNT(*) FROM category_seen WHERE category = ?)"
+            "     - (SELECT COUNT(*) FROM frontier WHERE category = ?)", (category, category)
+        ).fetchone()
+        return row[0]
+
+    def done(self, category: str, title: str):
+        self.db.execute("DELETE FROM frontier WHERE category = ? AND title = ?", (category, title))
+
+    # --- кеш типов ---
+    def get_type(self, title: str) -> Optional[tuple[Optional[str], float]]:
+        return self.db.execute(
+            "SELECT type_uri, checked_at FROM type_cache WHERE title = ?", (title,)
+        ).fetchone()
+
+    def put_type(self, title: str, type_uri: Optional[str], checked_at: float):
+        self.db.execute(
+            "INSERT OR REPLACE INTO type_cache(title, type_uri, checked_at) VALUES (?, ?, ?)",
+            (title, type_uri, checked_at),
+        )
+
+    # --- ревизии скрапленных статей ---
+    def put_revision(self, title: str, page: Optional[str], revid: Optional[int]):
+        self.db.execute(
+            "INSERT OR REPLACE INTO revisions(title, page, revid) VALUES (?, ?, ?)", (title, page, revid)
+        )
+
+    def revisions(self) -> dict[str, tuple[Optional[str], Optional[int]]]:
+        """{заголовок: (каноническое название, ревизия)}."""
+        return {title: (page, revid)
+                for title, page, revid in self.db.execute("SELECT title, page, revid FROM revisions")}
+
+    def forget_graph(self):
+        """Граф строится с нуля — прежние ревизии и происхождение триплетов к нему не относятся."""
+        for table in ("revisions", "sources", "provenance"):
+            self.db.execute(f"DELETE FROM {table}")
+
+    # --- происхождение триплетов ---
+    def source(self, page: str, extractor: str, revid: Optional[int] = None) -> int:
+        """ID источника (page, extractor); ревизия обновляется на последнюю извлечённую."""
+        row = self.db.execute(
+            "SELECT id FROM sources WHERE page = ? AND extractor = ?", (page, extractor)
+        ).fetchone()
+        if row is not None:
+            self.db.execute("UPDATE sources SET revid = ? WHERE id = ?", (revid, row[0]))
+            return row[0]
+        cur = self.db.execute(
+            "INSERT INTO sources(page, extractor, revid) VALUES (?, ?, ?)", (page, extractor, revid)
+        )
+        return cur.lastrowid
+
+    def record(self, source: int, triples: Iterable[tuple[str, str, str]]):
+        """Триплеты источника (закодированные) — одним executemany."""
+        self.db.executemany(
+            "INSERT OR IGNORE INTO provenance(source, s, p, o) VALUES (?, ?, ?, ?)",
+            ((source, s, p, o) for s, p, o in triples),
+        )
+
+    def sources_of(self, page: Optional[str] = None, extractor: Optional[str] = None) -> list[int]:
+        """ID источников статьи и/или экстрактора (None — любые)."""
+        rows = self.db.execute(
+            "SELECT id FROM sources WHERE (?1 IS NULL OR page = ?1) AND (?2 IS NULL OR extractor = ?2)",
+            (page, extractor),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def retract(self, sources: list[int]) -> list[tuple[str, str, str]]:
+        """
+        Забывает источники и возвращает их триплеты, которые больше никто не утверждает
+        (их пора убрать из графа). ID источников — во временной таблице (их может быть
+        больше лимита параметров SQLite); каждый триплет проверяется одним EXISTS по
+        индексу (s, p, o) — цена O(триплетов источников).
+        """
+        if not sources:
+            return []
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS retracting (id INTEGER PRIMARY KEY)")
+        self.db.executemany("INSERT OR IGNORE INTO temp.retracting(id) VALUES (?)", ((s,) for s in sources))
+        try:
+            candidates = self.db.execute(
+                "SELECT DISTINCT s, p, o FROM provenance JOIN temp.retracting ON provenance.source = retracting.id"
+            ).fetchall()
+            self.db.execute("DELETE FROM provenance WHERE source IN (SELECT id FROM temp.retracting)")
+            self.db.execute("DELETE FROM sources WHERE id IN (SELECT id FROM temp.retracting)")
+        finally:
+            self.db.execute("DELETE FROM temp.retracting")
+        return [t for t in candidates if not self.is_tracked(*t)]
+
+    def is_tracked(self, s: str, p: str, o: str) -> bool:
+        return bool(self.db.execute(
+            "SELECT EXISTS (SELECT 1 FROM provenance WHERE s = ? AND p = ? AND o = ?)", (s, p, o)
+        ).fetchone()[0])
+
+    def sources(self) -> Iterator[tuple[str, str, Optional[int]]]:
+        """(статья, экстрактор, ревизия) по порядку."""
+        yield from self.db.execute("SELECT page, extractor, revid FROM sources ORDER BY page, extractor")
+
+    def quads(self) -> Iterator[tuple[str, str, str, str, str]]:
+        """(статья, экстрактор, s, p, o) — триплеты по источникам, в стабильном порядке."""
+        yield from self.db.execute(
+            "SELECT sources.page, sources.extractor, provenance.s, provenance.p, provenance.o"
+            " FROM provenance JOIN sources ON sources.id = provenance.source"
+            " ORDER BY sources.page, sources.extractor, provenance.s, provenance.p, provenance.o"
+        )
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Дедупликация статей за прогон: каждая страница обрабатывается не больше одного раза,
+в какой бы категории (или списке семян) она ни встретилась.
+Ключ — нормализованный заголовок (как его понимает MediaWiki: «_» = пробел,
+HTML-сущности раскрыты, первая буква заглавная). Хранятся не строки,
+а 64-битные отпечатки (blake2b):
+  - основная часть — отсортированный array('Q'), 8 байт на заголовок, поиск — бисекцией;
+  - недавние отпечатки — в обычном множестве (около 60 байт на элемент), которое
+    вливается в массив, когда дорастает до 1/MERGE_RATIO его размера; в среднем
+    выходит порядка 16 байт на заголовок против сотни с лишним у set[str];
+  - фильтр Блума перед ними отвечает «точно не видели» без бисекции: а это
+    почти все обращения, потому что новых заголовков в прогоне больше, чем повторов.
+Ложные срабатывания Блума отсеивает точный поиск, так что ответы точные.
+Емкость задаётся заранее; при её превышении растёт только доля обращений
+к точному поиску.
+report() — сколько повторной работы не было сделано, по источникам.
+"""
+from __future__ import annotations
+
+import hashlib
+import html
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable
+
+MERGE_MIN = 4096  # недавних отпечатков, после которых их всегда можно влить в массив
+MERGE_RATIO = 8   # ... или когда их больше 1/MERGE_RATIO массива: слияние O(n), амортизированно — O(1)
+
+
+def normalize_title(title: str) -> str:
+    t = " ".join(html.unescape(title).replace("_", " ").split())
+    return t[:1].upper() + t[1:]
+
+
+def _hash(key: str) -> tuple[int, int, int]:
+    """Один blake2b на ключ: отпечаток для точного множества и два хеша для Блума."""
+    d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    fingerprint = int.from_bytes(d[:8], "little")
+    return fingerprint, fingerprint, int.from_bytes(d[8:], "little") | 1
+
+
+class BloomFilter:
+    """Битовый массив на bytearray; k позиций — двойное хеширование h1 + i*h2."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h1: int, h2: int) -> Iterable[int]:
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add_hashed(self, h1: int, h2: int):
+        for pos in self._positions(h1, h2):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def contains_hashed(self, h1: int, h2: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h1, h2))
+
+    def add(self, key: str):
+        _, h1, h2 = _hash(key)
+        self.add_hashed(h1, h2)
+
+    def __contains__(self, key: str) -> bool:
+        _, h1, h2 = _hash(key)
+        return self.contains_hashed(h1, h2)
+
+    def __sizeof__(self) -> int:
+        return len(self.bits)
+
+
+class Fingerprints:
+    """Множество 64-битных чисел: отсортированный array('Q') плюс буфер недавних добавлений."""
+
+    def __init__(self):
+        self.sorted = array("Q")
+        self.recent: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.sorted) + len(self.recent)
+
+    def __contains__(self, fingerprint: int) -> bool:
+        if fingerprint in self.recent:
+            return True
+        i = bisect_left(self.sorted, fingerprint)
+        return i < len(self.sorted) and self.sorted[i] == fingerprint
+
+    def add(self, fingerprint: int):
+        """Только для отпечатков, которых ещё нет (SeenTitles.claim это проверяет)."""
+        self.recent.add(fingerprint)
+        if len(self.recent) >= max(MERGE_MIN, len(self.sorted) // MERGE_RATIO):
+            self._merge()
+
+    def _merge(self):
+        # sorted() находит уже упорядоченный отрезок массива и сливает с ним буфер почти за O(n)
+        self.sorted = array("Q", sorted(self.sorted.tolist() + list(self.recent)))
+        self.recent = set()
+
+    def __sizeof__(self) -> int:
+        return self.sorted.buffer_info()[1] * self.sorted.itemsize + self.recent.__sizeof__()
+
+
+class SeenTitles:
+    """
+    claim(title, source) — True, если страница в этом прогоне встретилась впервые
+    (и теперь считается взятой в работу); повтор засчитывается источнику.
+    is_duplicate(title, source) — то же без записи: для фильтрации очередей.
+    """
+
+    def __init__(self, capacity: int = 500_000, error_rate: float = 0.001):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._exact = Fingerprints()
+        self.claimed: Counter[str] = Counter()
+        self.duplicates: Counter[str] = Counter()
+        self.false_positives = 0
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _lookup(self, title: str) -> tuple[bool, int, int, int]:
+        fingerprint, h1, h2 = _hash(normalize_title(title))
+        if not self.bloom.contains_hashed(h1, h2):
+            return False, fingerprint, h1, h2
+        if fingerprint in self._exact:
+            return True, fingerprint, h1, h2
+        self.false_positives += 1
+        return False, fingerprint, h1, h2
+
+    def __contains__(self, title: str) -> bool:
+        return self._lookup(title)[0]
+
+    def is_duplicate(self, title: str, source: str = "") -> bool:
+        if self._lookup(title)[0]:
+            self.duplicates[source] += 1
+            return True
+        return False
+
+    def claim(self, title: str, source: str = "") -> bool:
+        seen, fingerprint, h1, h2 = self._lookup(title)
+        if seen:
+            self.duplicates[source] += 1
+            return False
+        self.bloom.add_hashed(h1, h2)
+        self._exact.add(fingerprint)
+        self.claimed[source] += 1
+        return True
+
+    def update(self, titles: Iterable[str], source: str = ""):
+        for title in titles:
+            self.claim(title, source)
+
+    def report(self) -> dict:
+        return {
+            "unique": len(self._exact),
+            "duplicates_avoided": sum(self.duplicates.values()),
+            "by_source": {s: {"new": self.claimed[s], "duplicates": self.duplicates[s]}
+                          for s in sorted(set(self.claimed) | set(self.duplicates))},
+            "bloom_false_positives": self.false_positives,
+            "bloom_bytes": len(self.bloom.bits),
+            "fingerprint_bytes": self._exact.__sizeof__(),
+        }
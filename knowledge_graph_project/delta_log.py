@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Инкрементальные чекпоинты графа.
+Каждый новый триплет дописывается в журнал N-Triples (append-only),
+чекпоинт = сброс журнала на диск, O(новых триплетов) вместо O(всего графа).
+Удалённый триплет (обновление статьи) пишется строкой-комментарием «#- <s> <p> <o> .»:
+для парсера N-Triples её нет, replay() применяет удаления по порядку.
+Итоговый Turtle собирается один раз — при компактизации в конце прогона.
+"""
+from __future__ import annotations
+
+import os
+
+from rdflib import Graph, URIRef, Literal, BNode
+
+RETRACTED = "#- "  # префикс строки журнала с удалённым триплетом
+
+
+def _escape(s: str) -> str:
+    return (s.replace("\\", "\\\\").replace('"', '\\"')
+             .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def nt_term(term) -> str:
+    if isinstance(term, URIRef):
+        return f"<{term}>"
+    if isinstance(term, Literal):
+        lit = f'"{_escape(str(term))}"'
+        if term.language:
+            return f"{lit}@{term.language}"
+        if term.datatype:
+            return f"{lit}^^<{term.datatype}>"
+        return lit
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    raise TypeError(f"Не RDF-терм: {term!r}")
+
+
+def nt_line(triple) -> str:
+    s, p, o = triple
+    return f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+
+
+class DeltaLog:
+    """
+    Журнал новых триплетов. append() только копит строки в памяти,
+    flush() дописывает их в файл и делает fsync.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending: list[str] = []
+        self._fh = None
+        self.written = 0
+
+    def append(self, triple):
+        self._pending.append(nt_line(triple))
+
+    def retract(self, triple):
+        self._pending.append(RETRACTED + nt_line(triple))
+
+    def flush(self) -> int:
+        n = len(self._pending)
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        if n:
+            self._fh.write("".join(self._pending))
+            self._pending.clear()
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self.written += n
+        return n
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def reset(self):
+        """После компактизации журнал больше не нужен."""
+        self.close()
+        self._pending.clear()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.written = 0
+
+
+class LoggedGraph(Graph):
+    """Graph, который пишет в DeltaLog каждый действительно новый и каждый удалённый триплет."""
+
+    def __init__(self, *args, delta_log: DeltaLog | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delta_log = delta_log
+
+    def add(self, triple):
+        if self.delta_log is not None and triple not in self:
+            self.delta_log.append(triple)
+        return super().add(triple)
+
+    def remove(self, triple):
+        # удаление по шаблону (reset_graph) — не правка, а начало нового графа
+        if self.delta_log is not None and None not in triple and triple in self:
+            self.delta_log.retract(triple)
+        return super().remove(triple)
+
+
+def write_turtle(graph: Graph, path: str):
+    """Атомарная запись Turtle потоковым экспортом (export.py): сначала во временный файл, потом rename."""
+    import export  # export сам использует nt_term/nt_line отсюда
+    export.export_graph(graph, path, "turtle")
+
+
+def _read_log(log_path: str) -> str:
+    with open(log_path, "r", encoding="utf-8") as f:
+        data = f.read()
+    # последняя строка могла не дописаться при падении
+    return data[: data.rfind("\n") + 1]
+
+
+def _apply(data: str, graph: Graph):
+    """Добавления — пачками через парсер N-Triples, удаления — по одному, в порядке журнала."""
+    added: list[str] = []
+    for line in data.splitlines(keepends=True):
+        if not line.startswith(RETRACTED):
+            added.append(line)
+            continue
+        if added:
+            graph.parse(data="".join(added), format="nt")
+            added.clear()
+        for triple in Graph().parse(data=line[len(RETRACTED):], format="nt"):
+            graph.remove(triple)
+    if added:
+        graph.parse(data="".join(added), format="nt")
+
+
+def replay(log_path: str, graph: LoggedGraph) -> int:
+    """
+    Загружает журнал обратно в граф (продолжение прерванного прогона).
+    Сами триплеты уже в журнале, поэтому повторно их не логируем.
+    Возвращает изменение числа триплетов.
+    """
+    if not os.path.exists(log_path):
+        return 0
+    before = len(graph)
+    log, graph.delta_log = graph.delta_log, None
+    try:
+        _apply(_read_log(log_path), graph)
+    finally:
+        graph.delta_log = log
+    return len(graph) - before
+
+
+def recover(log_path: str, out_path: str, bind: dict | None = None) -> int:
+    """
+    Если предыдущий прогон упал, его журнал остался на диске —
+    собираем из него Turtle (как будто успел пройти последний чекпоинт).
+    Возвращает число восстановленных триплетов.
+    """
+    if not os.path.exists(log_path) or os.path.getsize(log_path) == 0:
+        return 0
+    old = Graph()
+    for prefix, ns in (bind or {}).items():
+        old.bind(prefix, ns)
+    old.parse(data=_read_log(log_path), format="nt")
+    write_turtle(old, out_path)
+    os.unlink(log_path)
+    return len(old)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр сущностей графа: slug → (URI, основной тип, метка).
+Проверки «есть ли сущность» и «какого она типа» — обращение к словарю,
+без шаблонов триплетов rdflib (и без SQL, если граф лежит на диске).
+Реестр пополняется вместе с графом в add_labeled_instance; после загрузки
+графа (продолжение прогона, хранилище на диске, готовый Turtle)
+перестраивается rebuild().
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from rdflib import Graph, URIRef, Literal
+from rdflib.namespace import RDF, RDFS
+
+
+@dataclass
+class Entity:
+    uri: URIRef
+    type: URIRef            # первый тип, с которым сущность попала в граф
+    label: Optional[str] = None
+
+
+class EntityIndex:
+    def __init__(self, namespace: str):
+        self.namespace = str(namespace)
+        self._by_slug: dict[str, Entity] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_slug)
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self._by_slug
+
+    def __iter__(self) -> Iterator[Entity]:
+        return iter(self._by_slug.values())
+
+    def get(self, slug: str) -> Optional[Entity]:
+        return self._by_slug.get(slug)
+
+    def type_of(self, slug: str) -> Optional[URIRef]:
+        entity = self._by_slug.get(slug)
+        return entity.type if entity else None
+
+    def add(self, slug: str, uri: URIRef, rdf_type: URIRef, label: Optional[str] = None) -> bool:
+        """Регистрирует сущность; True — если её ещё не было."""
+        if slug in self._by_slug:
+            return False
+        self._by_slug[slug] = Entity(uri, rdf_type, label)
+        return True
+
+    def slug_of(self, uri) -> Optional[str]:
+        s = str(uri)
+        return s[len(self.namespace):] if s.startswith(self.namespace) else None
+
+    def rebuild(self, source: Graph | str) -> int:
+        """
+        Заполняет реестр заново по графу или по файлу Turtle (например,
+        OUT_FILE прошлого прогона). Возвращает число сущностей.
+        """
+        if isinstance(source, str):
+            graph = Graph()
+            graph.parse(source, format="turtle")
+        else:
+            graph = source
+        self._by_slug.clear()
+        for s, _, t in graph.triples((None, RDF.type, None)):
+            slug = self.slug_of(s)
+            if slug is not None and isinstance(t, URIRef):
+                self.add(slug, s, t)
+        for s, _, label in graph.triples((None, RDFS.label, None)):
+            entity = self._by_slug.get(self.slug_of(s) or "")
+            if entity is not None and entity.label is None and isinstance(label, Literal):
+                entity.label = str(label)
+        return len(self._by_slug)
+
+    def refresh(self, graph: Graph, uri: URIRef):
+        """Перечитывает одну сущность из графа — после того как её тип или метка убраны."""
+        slug = self.slug_of(uri)
+        if slug is None:
+            return
+        self._by_slug.pop(slug, None)
+        rdf_type = next((t for t in graph.objects(uri, RDF.type) if isinstance(t, URIRef)), None)
+        if rdf_type is None:
+            return
+        label = next((str(lit) for lit in graph.objects(uri, RDFS.label) if isinstance(lit, Literal)), None)
+        self.add(slug, uri, rdf_type, label)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Потоковая выгрузка графа в файл: Turtle, N-Triples или RDF/XML, по желанию в gzip.
+В отличие от pretty-printer rdflib, граф не раскладывается целиком в памяти:
+субъекты идут в порядке слагов (URI), для каждого — один запрос (s, None, None),
+готовый блок сразу пишется на диск. В памяти — только отсортированный список
+субъектов и ограниченный кеш QName.
+Вид Turtle тот же, что у rdflib: префиксы (только использованные, по алфавиту),
+блок на субъект, «a» и rdfs:label первыми, остальные предикаты и объекты
+отсортированы, блоки разделены пустой строкой. Порядок субъектов — по слагу,
+а не по числу ссылок, как у rdflib: новая ссылка на сущность не двигает её блок,
+поэтому диффы между выгрузками остаются короткими.
+Пустые узлы пишутся метками (_:b0), без вложенных [ ... ].
+В RDF/XML из литералов выбрасываются символы, которых нет в XML 1.0 (управляющие
+\x00–\x1f, кроме табуляции и переводов строки): иначе файл не откроет ни один парсер.
+export_quads() — N-Quads с именованными графами (происхождение триплетов), тоже потоком.
+"""
+from __future__ import annotations
+
+import functools
+import gzip
+import math
+import os
+import re
+import shutil
+import tempfile
+from typing import Iterable, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from rdflib import Graph, URIRef, Literal, BNode, RDF, RDFS, XSD
+
+import delta_log
+
+QNAME_CACHE_SIZE = 65536  # URI → QName; кеш rdflib (compute_qname) растёт без предела
+
+EXTENSIONS = {".ttl": "turtle", ".nt": "nt", ".owl": "xml", ".rdf": "xml", ".xml": "xml"}
+PREDICATE_ORDER = (RDF.type, RDFS.label)  # как у сериализатора Turtle rdflib
+PLAIN_DATATYPES = (XSD.integer, XSD.decimal, XSD.double, XSD.boolean)  # в Turtle — без кавычек
+
+_PN_LOCAL = re.compile(r"[\w:][\w\-.:]*")
+_NC_NAME = re.compile(r"[^\W\d][\w\-.]*")
+_DECIMAL = re.compile(r"[+-]?\d*\.?\d+")
+_XSD_SPECIAL = {"inf": "INF", "-inf": "-INF", "Infinity": "INF", "-Infinity": "-INF", "nan": "NaN"}  # вид Python → XSD
+_XML_ENTITIES = {"\r": "&#13;"}  # иначе парсер XML превратит \r\n в \n
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def _order_subjects(graph: Graph) -> list:
+    """URI по алфавиту (то есть по слагу внутри пространства имён), пустые узлы в конце."""
+    return sorted(set(graph.subjects()), key=lambda s: (isinstance(s, BNode), str(s)))
+
+
+def _predicate_objects(graph: Graph, subject) -> list[tuple]:
+    """[(предикат, [объекты...])] в порядке вывода."""
+    props: dict = {}
+    for p, o in graph.predicate_objects(subject):
+        props.setdefault(p, []).append(o)
+    first = [p for p in PREDICATE_ORDER if p in props]
+    rest = sorted(p for p in props if p not in PREDICATE_ORDER)
+    return [(p, sorted(props[p])) for p in first + rest]
+
+
+def _quote(s: str) -> str:
+    """Строка Turtle; многострочная — в тройных кавычках, как у rdflib."""
+    s = s.replace("\\", "\\\\")
+    if "\n" not in s:
+        return '"' + s.replace('"', '\\"').replace("\r", "\\r") + '"'
+    return '"""' + s.replace('"', '\\"').replace("\r", "\\r") + '"""'
+
+
+def _plain(node: Literal) -> Optional[str]:
+    """Число или boolean без кавычек (вид rdflib); None — писать строкой с типом."""
+    if node.datatype not in PLAIN_DATATYPES or node.value is None:
+        return None  # value None — лексическая форма не разобралась
+    if node.datatype == XSD.boolean:
+        return "true" if node.value else "false"
+    if node.datatype == XSD.integer:
+        return str(int(node.value))
+    if node.datatype == XSD.decimal:
+        s = str(node)
+        return (s if "." in s else s + ".0") if _DECIMAL.fullmatch(s) else None
+    v = float(node.value)
+    if math.isinf(v) or math.isnan(v):
+        return None
+    return re.sub(r"\.?0*e", "e", f"{v:e}")
+
+
+def _xml_chars(s: str) -> str:
+    return _XML_INVALID.sub("", s)
+
+
+class _Writer:
+    """Общее: префиксы графа и сбор тех, что реально встретились в выгрузке."""
+
+    def __init__(self, graph: Graph):
+        # длинные пространства имён первыми: у вложенных выигрывает самое точное
+        self.bound = sorted(((str(ns), prefix) for prefix, ns in graph.namespaces()),
+                            key=lambda item: -len(item[0]))
+        self.used: dict[str, str] = {}
+        self._split = functools.lru_cache(maxsize=QNAME_CACHE_SIZE)(self._split_uri)
+
+    def _split_uri(self, uri: str) -> Optional[tuple[str, str, str]]:
+        for ns, prefix in self.bound:
+            if uri.startswith(ns):
+                return prefix, ns, uri[len(ns):]
+        return None
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+
+class TurtleWriter(_Writer):
+    def qname(self, uri: URIRef) -> Optional[str]:
+        parts = self._split(str(uri))
+        if parts is None:
+            return None
+        prefix, ns, local = parts
+        if local and (not _PN_LOCAL.fullmatch(local) or local.endswith(".")):
+            return None
+        self.used[prefix] = ns
+        return f"{prefix}:{local}"
+
+    def term(self, node) -> str:
+        if isinstance(node, Literal):
+            return self.literal(node)
+        if isinstance(node, URIRef):
+            return self.qname(node) or f"<{node}>"
+        return delta_log.nt_term(node)
+
+    def literal(self, node: Literal) -> str:
+        """Тот же вид, что у сериализатора rdflib: числа без кавычек, тип — QName, если есть префикс."""
+        plain = _plain(node)
+        if plain is not None:
+            return plain
+        if node.language:
+            return f"{_quote(str(node))}@{node.language}"
+        if node.datatype:
+            lexical = str(node)
+            if node.datatype in (XSD.double, XSD.float, XSD.decimal):
+                lexical = _XSD_SPECIAL.get(lexical, lexical)
+            return f"{_quote(lexical)}^^{self.qname(node.datatype) or f'<{node.datatype}>'}"
+        return _quote(str(node))
+
+    def block(self, subject, props: list[tuple]) -> str:
+        lines = []
+        for p, objects in props:
+            verb = "a" if p == RDF.type else self.term(p)
+            lines.append(f"{verb} " + ",\n        ".join(self.term(o) for o in objects))
+        return f"{self.term(subject)} " + " ;\n    ".join(lines) + " .\n\n"
+
+    def header(self) -> str:
+        return "".join(f"@prefix {prefix}: <{ns}> .\n" for prefix, ns in sorted(self.used.items())) + "\n"
+
+
+class NTriplesWriter(_Writer):
+    def block(self, subject, props: list[tuple]) -> str:
+        return "".join(delta_log.nt_line((subject, p, o)) for p, objects in props for o in objects)
+
+
+class RdfXmlWriter(_Writer):
+    """Плоский RDF/XML (rdf:Description на субъект), как сериализатор "xml" rdflib — читается Protégé."""
+
+    def __init__(self, graph: Graph):
+        super().__init__(graph)
+        self.used["rdf"] = str(RDF)
+        self._generated = 0
+
+    def _node(self, attr_about: str, node) -> str:
+        if isinstance(node, BNode):
+            return f"rdf:nodeID={quoteattr(str(node))}"
+        return f"rdf:{attr_about}={quoteattr(str(node))}"
+
+    def tag(self, predicate: URIRef) -> str:
+        uri = str(predicate)
+        parts = self._split(uri)
+        if parts is not None and _NC_NAME.fullmatch(parts[2]):
+            prefix, ns, local = parts
+        else:
+            cut = max(uri.rfind("#"), uri.rfind("/")) + 1
+            ns, local = uri[:cut], uri[cut:]
+            if not cut or not _NC_NAME.fullmatch(local):
+                raise ValueError(f"Предикат нельзя записать в RDF/XML: {uri}")
+            prefix = next((p for p, n in self.used.items() if n == ns), None)
+            if prefix is None:
+                self._generated += 1
+                prefix = f"ns{self._generated}"
+        self.used[prefix] = ns
+        return f"{prefix}:{local}"
+
+    def block(self, subject, props: list[tuple]) -> str:
+        out = [f"  <rdf:Description {self._node('about', subject)}>\n"]
+        for p, objects in props:
+            tag = self.tag(p)
+            for o in objects:
+                if isinstance(o, Literal):
+                    attrs = ""
+                    if o.language:
+                        attrs = f" xml:lang={quoteattr(o.language)}"
+                    elif o.datatype:
+                        attrs = f" rdf:datatype={quoteattr(str(o.datatype))}"
+                    out.append(f"    <{tag}{attrs}>{escape(_xml_chars(str(o)), _XML_ENTITIES)}</{tag}>\n")
+                else:
+                    out.append(f"    <{tag} {self._node('resource', o)}/>\n")
+        out.append("  </rdf:Description>\n")
+        return "".join(out)
+
+    def header(self) -> str:
+        xmlns = "".join(f"   xmlns:{prefix}={quoteattr(ns)}\n" for prefix, ns in sorted(self.used.items()))
+        return f'<?xml version="1.0" encoding="utf-8"?>\n<rdf:RDF\n{xmlns}>\n'
+
+    def footer(self) -> str:
+        return "</rdf:RDF>\n"
+
+
+WRITERS = {"turtle": TurtleWriter, "nt": NTriplesWriter, "xml": RdfXmlWriter}
+
+
+def guess_format(path: str) -> str:
+    base = path[:-3] if path.endswith(".gz") else path
+    return EXTENSIONS.get(os.path.splitext(base)[1].lower(), "turtle")
+
+
+def export_graph(graph: Graph, path: str, format: Optional[str] = None,
+                 compress: Optional[bool] = None) -> int:
+    """
+    Атомарно пишет граф в path. format — "turtle" | "nt" | "xml" (по умолчанию —
+    по расширению: .ttl, .nt, .owl/.rdf/.xml); compress — gzip (по умолчанию — если .gz).
+    Заголовок (префиксы) известен только после обхода, поэтому тело сначала
+    пишется во временный файл, а потом копируется за заголовком.
+    Возвращает число записанных триплетов.
+    """
+    format = format or guess_format(path)
+    compress = path.endswith(".gz") if compress is None else compress
+    try:
+        writer = WRITERS[format](graph)
+    except KeyError:
+        raise ValueError(f"Неизвестный формат: {format!r} (есть: {', '.join(WRITERS)})") from None
+
+    directory = os.path.dirname(os.path.abspath(path))
+    body_fd, body_path = tempfile.mkstemp(dir=directory, prefix=".tmp-body-")
+    out_fd, out_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(out_fd)
+    written = 0
+    try:
+        with os.fdopen(body_fd, "w", encoding="utf-8", newline="\n") as body:
+            for subject in _order_subjects(graph):
+                props = _predicate_objects(graph, subject)
+                body.write(writer.block(subject, props))
+                written += sum(len(objects) for _, objects in props)
+        opener = gzip.open if compress else open
+        with opener(out_path, "wt", encoding="utf-8", newline="\n") as out:
+            out.write(writer.header())
+            with open(body_path, "r", encoding="utf-8", newline="\n") as body:
+                shutil.copyfileobj(body, out)
+            out.write(writer.footer())
+        os.replace(out_path, path)
+    except BaseException:
+        if os.path.exists(out_path):
+            os.unlink(out_path)
+        raise
+    finally:
+        os.unlink(body_path)
+    return written
+
+
+def export_quads(path: str, default: Iterable[tuple], named: Iterable[tuple],
+                 compress: Optional[bool] = None) -> int:
+    """
+    Атомарно пишет N-Quads: default — триплеты графа по умолчанию,
+    named — пары (IRI именованного графа, триплет). Оба потока пишутся как идут,
+    без сбора в памяти. compress — gzip (по умолчанию — если path кончается на .gz).
+    Возвращает число записанных строк.
+    """
+    compress = path.endswith(".gz") if compress is None else compress
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    written = 0
+    try:
+        opener = gzip.open if compress else open
+        with opener(tmp, "wt", encoding="utf-8", newline="\n") as out:
+            for triple in default:
+                out.write(delta_log.nt_line(triple))
+                written += 1
+            for graph_iri, (s, p, o) in named:
+                out.write(f"{delta_log.nt_term(s)} {delta_log.nt_term(p)} {delta_log.nt_term(o)} <{graph_iri}> .\n")
+                written += 1
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return written
@@ -0,0 +1,648 @@
+# -*- coding: utf-8 -*-
+"""
+Разбор HTML-страниц ru.fandom без обращения к графу.
+extract_page() превращает сырой HTML в PageExtract — простую picklable-запись
+(инфобокс, категории, семейные связи, текст), поэтому разбор можно вынести
+в пул процессов, а граф остаётся только в основном процессе.
+"""
+from __future__ import annotations
+
+import re
+import json
+import logging
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from rules import RULES
+
+try:
+    import lxml  # noqa: F401  — необязательный быстрый бэкенд для BeautifulSoup
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+logger = logging.getLogger("hp-kg")
+
+SKIP_TITLE_PATTERNS = [
+    r"\(персонажи\)$", r"\(персонаж\)$", r"\(персонажи фильма\)$",
+    r"^Список($|[ \t])", r"^Персонажи($|[ \t])", r"^Категория:",
+]
+def should_skip_title(title: str) -> bool:
+    if not title:
+        return True
+    t = title.strip()
+    for pat in SKIP_TITLE_PATTERNS:
+        if re.search(pat, t, flags=re.IGNORECASE):
+            return True
+    return False
+
+
+# --------- категории из шапки страницы ----------
+def parse_categories(soup: BeautifulSoup) -> set[str]:
+    """
+    Возвращает категории именно этой статьи (из шапки / page header).
+    Не сканируем всю страницу, чтобы не ловить навигацию/шаблоны.
+    """
+    cats = set()
+    for a in soup.select('.page-header__categories a.category[href^="/ru/wiki/Категория:"]'):
+        t = (a.get("title") or a.get_text(strip=True) or "").strip()
+        if t.startswith("Категория:"):
+            cats.add(t.replace("Категория:", "").strip())
+    # резервный блок категорий (если включен темой)
+    for a in soup.select('#articleCategories a[href^="/ru/wiki/Категория:"]'):
+        t = (a.get("title") or a.get_text(strip=True) or "").strip()
+        if t.startswith("Категория:"):
+            cats.add(t.replace("Категория:", "").strip())
+    return cats
+
+def parse_infobox(soup: BeautifulSoup) -> dict:
+    data = {}
+    box = soup.select_one(".portable-infobox")
+    if not box:
+        return data
+    for row in box.select(".pi-data"):
+        label = row.select_one(".pi-data-label")
+        value = row.select_one(".pi-data-value")
+        if not label or not value:
+            continue
+        key = label.get_text(separator=" ", strip=True)
+        text = value.get_text(separator=" ", strip=True)
+        links = []
+        for a in value.select("a[href]"):
+            href = a.get("href") or ""
+            title = a.get("title") or a.get_text(strip=True)
+            if href.startswith("/ru/wiki/") and title and "/Категория:" not in href:
+                links.append(title)
+        data[key] = {"text": text, "links": links}
+    return data
+
+def extract_family_relations_from_text(soup: BeautifulSoup, subject_title: str) -> list[tuple[str, str]]:
+    """
+    Ищет в тексте статьи упоминания вида:
+      «брат <имя>», «сестра <имя>», «сын <имя>», «муж <имя>», «жена <имя>» и т.д.
+    Возвращает список пар: (relation_type, person_title)
+    """
+    relations = []
+
+    # Получаем весь текст статьи, но лучше — только основное тело (кроме навигации, комментариев)
+    content = soup.select_one(".mw-parser-output")
+    if not content:
+        return relations
+
+    # Извлекаем текст, сохраняя структуру параграфов и заголовков
+    text_blocks = []
+    for elem in content.children:
+        if elem.name in {"p", "ul", "ol", "h2", "h3"}:
+            text_blocks.append(elem.get_text(separator=" ", strip=True))
+
+    return family_relations_in_text(" ".join(text_blocks))
+
+
+def family_relations_in_text(full_text: str) -> list[tuple[str, str]]:
+    """Эвристический поиск родственников в уже извлечённом тексте статьи."""
+    relations = []
+
+    # Эвристики: ищем фразы вида "X — брат Y", "Y имеет брата X", "его брат — X"
+    # паттерны (свойство, регулярка с группой имени) — в rules.json, скомпилированы при импорте
+    for rel_type, pattern in RULES.text_relations:
+        for match in pattern.finditer(full_text):
+            name_candidate = match.group(1).strip()
+            # Очистка от лишних слов: «и», «также», «позже», знаков препинания в конце
+            name_candidate = re.sub(r"[,\.!\?;:]+$", "", name_candidate)
+            name_candidate = re.sub(r"\s+(?:и|или|также|ранее|позже)\s+.*$", "", name_candidate)
+            if name_candidate and not should_skip_title(name_candidate):
+                # Фильтрация: не должно быть местоимений, глаголов и т.д.
+                if len(name_candidate.split()) >= 2 and re.match(r"^[А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+)+$", name_candidate):
+                    relations.append((rel_type, name_candidate))
+
+
+    return relations
+
+
+def parse_family_section(soup: BeautifulSoup) -> list[tuple[str, str]]:
+    """
+    Парсит раздел '== Семья ==' и возвращает список связей: (relation_type, person_title)
+    Пример: 'Орион Блэк (отец)†' → ('hasFather', 'Орион Блэк')
+    """
+    relations = []
+
+    # Находим заголовок "Семья" и следующий элемент (обычно <p>)
+    family_header = None
+    for h2 in soup.select("h2"):
+        if "семья" in h2.get_text(strip=True).lower():
+            family_header = h2
+            break
+
+    if not family_header:
+        return relations
+
+    # Берём следующий (обычно <p>) или идём до следующего h2
+    next_elem = family_header.find_next_sibling()
+    family_text = ""
+    while next_elem and next_elem.name != "h2":
+        if next_elem.name in {"p", "ul", "ol"}:
+            family_text += " " + next_elem.get_text(separator=" ", strip=True)
+        next_elem = next_elem.find_next_sibling()
+
+    return parse_family_items(family_text)
+
+
+def parse_family_items(family_text: str) -> list[tuple[str, str]]:
+    """Текст раздела «Семья» → [(relation_type, person_title), ...]"""
+    relations = []
+    if not family_text.strip():
+        return relations
+
+    # Разбиваем по запятым и точкам с запятой
+    items = [item.strip() for item in re.split(r"[,;]", family_text)]
+
+    for item in items:
+        # Убираем †, *, и т.д.
+        item = re.sub(r"[†*«»\"]", "", item).strip()
+        if not item:
+            continue
+
+        # Ищем шаблон: "Имя Фамилия (роль)"
+        match = re.match(r"([А-ЯЁ][а-яё\s\-]+?)\s*\(([^)]+)\)", item)
+        if not match:
+            continue
+
+        name = match.group(1).strip()
+        role_desc = match.group(2).strip().lower()
+
+        # роли — в rules.json; самая длинная найденная приоритетна
+        prop_key = RULES.family_section.match(role_desc)
+        if prop_key:
+            relations.append((prop_key, name))
+
+    return relations
+
+
+def parse_family_field_from_infobox(family_text: str) -> list[tuple[str, str]]:
+    """
+    Парсит текст поля 'Семья' из инфобокса.
+    Пример входа: "Марджори Дурсль (сестра), Петуния Дурсль (жена), ..."
+    Возвращает список: [(relation_type, person_title), ...]
+    """
+    logger.debug("🔍 Разбор поля 'Семья': %r", family_text[:200])
+    relations = []
+
+    # Убираем лишние символы (†, *, «», [1], [2] и т.д.)
+    cleaned_text = re.sub(r"[\†*«»\"]|\[\s*\d+\s*\]", "", family_text).strip()
+    if not cleaned_text:
+        return relations
+
+    # Регулярка ищет имя как последовательность символов, не содержащую скобок, перед ролью в скобках.
+    pattern = re.compile(r"([А-ЯЁ][^()]+?)\s*\(([^)]+)\)")
+
+    for match in pattern.finditer(cleaned_text):
+        name = match.group(1).strip()
+        role_desc = match.group(2).strip().lower()
+
+        if len(name) < 2 or should_skip_title(name):
+            continue
+
+        # роли (с синонимами) — в rules.json: сначала целыми словами, чтобы «дед»
+        # не находился в «дедушка», затем частичное совпадение («племянника»)
+        prop_key = RULES.family_infobox.match_word(role_desc) or RULES.family_infobox.match(role_desc)
+        if prop_key:
+            relations.append((prop_key, name))
+
+    return relations
+
+# -----------------------------
+# Запись о странице
+# -----------------------------
+@dataclass
+class PageExtract:
+    has_infobox: bool = False
+    infobox: dict = field(default_factory=dict)
+    categories: set[str] = field(default_factory=set)
+    text: str = ""  # текст страницы одной строкой (для type_from_sources)
+    family_infobox: list[tuple[str, str]] = field(default_factory=list)  # поле «Семья» инфобокса
+    family_section: list[tuple[str, str]] = field(default_factory=list)  # раздел «Семья»
+    family_text: list[tuple[str, str]] = field(default_factory=list)     # упоминания в тексте
+    # для страниц категорий
+    members: list[str] = field(default_factory=list)
+    next_href: Optional[str] = None
+    # каноническое название и номер ревизии статьи (для инкрементального обновления)
+    title: Optional[str] = None
+    revid: Optional[int] = None
+
+
+_REVISION_RE = re.compile(r'"wgCurRevisionId":\s*(\d+)')
+_PAGE_NAME_RE = re.compile(r'"wgPageName":\s*("(?:[^"\\]|\\.)*")')
+
+def page_revision(html_text: str) -> tuple[Optional[str], Optional[int]]:
+    """Название и ревизия из конфигурации MediaWiki в <head> (RLCONF); None — если её нет."""
+    name = _PAGE_NAME_RE.search(html_text)
+    rev = _REVISION_RE.search(html_text)
+    title = json.loads(name.group(1)).replace("_", " ") if name else None
+    return title, int(rev.group(1)) if rev else None
+
+
+def parse_category_members(soup: BeautifulSoup) -> tuple[list[str], Optional[str]]:
+    """Участники категории (без подкатегорий и служебных страниц) и ссылка на следующую страницу."""
+    titles = []
+    for a in soup.select("a.category-page__member-link"):
+        href = a.get("href") or ""
+        title = a.get("title") or a.get_text(strip=True)
+        if not title:
+            continue
+        if "/Категория:" in href or should_skip_title(title):
+            continue
+        titles.append(title)
+    next_a = soup.select_one('a.category-page__pagination-next')
+    next_href = next_a["href"] if (next_a and next_a.get("href")) else None
+    return titles, next_href
+
+
+# -----------------------------
+# Бэкенд разбора и выборочный режим
+# -----------------------------
+def resolve_parser(parser: str = "auto") -> str:
+    """auto → lxml, если установлен, иначе встроенный html.parser."""
+    if parser == "auto":
+        return "lxml" if HAVE_LXML else "html.parser"
+    return parser
+
+# классы узлов, которые читают экстракторы; всё остальное в выборочном режиме не строится
+TARGET_CLASSES = {
+    "portable-infobox", "page-header__categories", "mw-parser-output",
+    "category-page__member-link", "category-page__pagination-next",
+}
+
+def _is_target_class(value) -> bool:
+    if not value:
+        return False
+    values = value.split() if isinstance(value, str) else value
+    return any(v in TARGET_CLASSES for v in values)
+
+TARGET_STRAINER = SoupStrainer(attrs={"class": _is_target_class})
+
+
+class _PageText(HTMLParser):
+    """
+    Тот же текст, что soup.get_text(separator=" ", strip=True), но без построения дерева:
+    строки между тегами, без script/style/template и комментариев.
+    """
+    SKIP_TAGS = {"script", "style", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            data = data.strip()
+            if data:
+                self.parts.append(data)
+
+    def unknown_decl(self, data):
+        if data.startswith("CDATA["):
+            self.handle_data(data[len("CDATA["):])
+
+
+def page_text(html_text: str) -> str:
+    collector = _PageText()
+    collector.feed(html_text)
+    collector.close()
+    return " ".join(collector.parts)
+
+
+# -----------------------------
+# Однопроходный разбор (parser="stream")
+# -----------------------------
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+CONTENT_BLOCK_TAGS = {"p", "ul", "ol", "h2", "h3"}  # прямые потомки .mw-parser-output
+FAMILY_BLOCK_TAGS = {"p", "ul", "ol"}               # блоки раздела «Семья»
+CATEGORY_HREF = "/ru/wiki/Категория:"
+
+
+class _Frame:
+    """Открытый элемент: имя тега и то, что с ним нужно сделать при закрытии."""
+    __slots__ = ("tag", "on_close")
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.on_close: list = []
+
+
+class PageVisitor(HTMLParser):
+    """
+    Один проход по HTML без построения дерева. Экстракторы подписываются
+    на события через on(event, callback):
+      infobox_row(label, text, links) — строка .pi-data первого .portable-infobox;
+      category(title)                 — категория статьи (шапка или #articleCategories);
+      member(title, href)             — a.category-page__member-link;
+      next_page(href)                 — первая a.category-page__pagination-next;
+      section(title)                  — закрылся <h2> (граница раздела);
+      family_block(text)              — p/ul/ol после h2 «Семья» до следующего h2;
+      content_block(tag, text)        — прямой потомок первого .mw-parser-output.
+    Текст элементов — как у BeautifulSoup get_text(separator=" ", strip=True),
+    без script/style/template; текст всей страницы — в self.parts.
+    """
+    SKIP_TAGS = {"script", "style", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.has_infobox = False
+        self._handlers: dict[str, list] = {}
+        self._stack: list[_Frame] = []
+        self._pending: list[str] = []
+        self._captures: list[list[str]] = []
+        self._skip = 0
+        self._infobox = "none"   # none → open → done
+        self._rows: list[dict] = []       # строки инфобокса в порядке начала
+        self._open_rows: list[dict] = []  # незакрытые (в кривой разметке — вложенные)
+        self._header_cats = 0    # глубина внутри .page-header__categories
+        self._article_cats = 0   # внутри #articleCategories
+        self._content = "none"   # none → open → done
+        self._content_depth = 0
+        self._family = "none"    # none → open → done
+        self._family_depth = 0
+        self._next_seen = False
+
+    def on(self, event: str, callback):
+        self._handlers.setdefault(event, []).append(callback)
+        return self
+
+    def _emit(self, event: str, *args):
+        for callback in self._handlers.get(event, ()):
+            callback(*args)
+
+    # --- текст ---
+    def _capture(self, frame: _Frame, done) -> None:
+        """Собирать строки внутри frame; при закрытии — done(parts)."""
+        parts: list[str] = []
+        self._captures.append(parts)
+
+        def finish():
+            # по идентичности: списки с одинаковым текстом равны между собой
+            self._captures = [c for c in self._captures if c is not parts]
+            done(parts)
+        frame.on_close.append(finish)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending).strip()
+        self._pending.clear()
+        if data:
+            self.parts.append(data)
+            for parts in self._captures:
+                parts.append(data)
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._pending.append(data)
+
+    # комментарий, CDATA и т.п. — отдельные узлы: текст по обе стороны не склеивается
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.startswith("CDATA["):
+            self.handle_data(data[len("CDATA["):])
+            self._flush()
+
+    # --- структура ---
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        if tag in VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        classes = set((attrs.get("class") or "").split())
+        depth = len(self._stack)
+        frame = _Frame(tag)
+        self._stack.append(frame)
+
+        if "portable-infobox" in classes:
+            self.has_infobox = True
+            if self._infobox == "none":
+                self._infobox = "open"
+                frame.on_close.append(self._close_infobox)
+        if self._infobox == "open":
+            self._start_infobox_part(frame, tag, attrs, classes)
+
+        if "page-header__categories" in classes:
+            self._header_cats += 1
+            frame.on_close.append(self._leave_header_cats)
+        if attrs.get("id") == "articleCategories":
+            self._article_cats += 1
+            frame.on_close.append(self._leave_article_cats)
+        if tag == "a":
+            self._start_link(frame, attrs, classes)
+        if tag == "h2":
+            self._capture(frame, self._close_h2)
+
+        # прямые потомки контейнеров: тело статьи и раздел «Семья»
+        if self._content == "open" and depth == self._content_depth + 1 and tag in CONTENT_BLOCK_TAGS:
+            self._capture(frame, lambda parts: self._emit("content_block", tag, " ".join(parts)))
+        if self._family == "open" and depth == self._family_depth + 1:
+            if tag == "h2":
+                self._family = "done"
+            elif tag in FAMILY_BLOCK_TAGS:
+                self._capture(frame, lambda parts: self._emit("family_block", " ".join(parts)))
+        if "mw-parser-output" in classes and self._content == "none":
+            self._content, self._content_depth = "open", depth
+            frame.on_close.append(self._close_content)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self.SKIP_TAGS and self._skip:
+            self._skip -= 1
+        # как BeautifulSoup: закрываем до ближайшего открытого тега с тем же именем
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i].tag == tag:
+                while len(self._stack) > i:
+                    frame = self._stack.pop()
+                    for callback in reversed(frame.on_close):
+                        callback()
+                return
+
+    def close(self):
+        super().close()
+        self._flush()
+        while self._stack:
+            frame = self._stack.pop()
+            for callback in reversed(frame.on_close):
+                callback()
+
+    # --- инфобокс ---
+    def _close_infobox(self):
+        self._infobox = "done"
+        for row in self._rows:
+            if isinstance(row["label"], str) and isinstance(row["value"], str):
+                self._emit("infobox_row", row["label"], row["value"], row["links"])
+
+    def _start_infobox_part(self, frame, tag, attrs, classes):
+        # подпись и значение строки — первые такие потомки; у вложенных строк — свои
+        if "pi-data-label" in classes:
+            for row in self._open_rows:
+                if row["label"] is None:
+                    row["label"] = []
+                    self._capture(frame, lambda parts, row=row: row.__setitem__("label", " ".join(parts)))
+        if "pi-data-value" in classes:
+            for row in self._open_rows:
+                if row["value"] is None:
+                    row["value"] = []
+                    row["in_value"] = True
+
+                    def done(parts, row=row):
+                        row["value"] = " ".join(parts)
+                        row["in_value"] = False
+                    self._capture(frame, done)
+        if "pi-data" in classes:
+            row = {"label": None, "value": None, "links": [], "in_value": False}
+            self._rows.append(row)
+            self._open_rows.append(row)
+            frame.on_close.append(lambda: self._open_rows.remove(row))
+
+    # --- ссылки ---
+    def _start_link(self, frame, attrs, classes):
+        href = attrs.get("href")
+        title = attrs.get("title")
+        rows = [row for row in self._open_rows if row["in_value"]]
+        if rows and href is not None:
+            def value_link(parts):
+                t = title or "".join(parts)
+                if href.startswith("/ru/wiki/") and t and "/Категория:" not in href:
+                    for row in rows:
+                        row["links"].append(t)
+            self._capture(frame, value_link)
+        if (href or "").startswith(CATEGORY_HREF) and (
+                self._article_cats or (self._header_cats and "category" in classes)):
+            def category(parts):
+                t = (title or "".join(parts) or "").strip()
+                if t.startswith("Категория:"):
+                    self._emit("category", t.replace("Категория:", "").strip())
+            self._capture(frame, category)
+        if "category-page__member-link" in classes:
+            self._capture(frame, lambda parts: self._emit("member", title or "".join(parts), href or ""))
+        if "category-page__pagination-next" in classes and not self._next_seen:
+            self._next_seen = True
+            if href:
+                self._emit("next_page", href)
+
+    def _leave_header_cats(self):
+        self._header_cats -= 1
+
+    def _leave_article_cats(self):
+        self._article_cats -= 1
+
+    # --- разделы ---
+    def _close_h2(self, parts):
+        title = "".join(parts)
+        self._emit("section", title)
+        if self._family == "none" and "семья" in title.lower():
+            # блоки раздела — следующие братья этого h2 у того же родителя
+            self._family, self._family_depth = "open", len(self._stack) - 1
+            if self._family_depth >= 0:
+                self._stack[self._family_depth].on_close.append(self._close_family)
+            else:
+                self._family = "done"
+
+    def _close_family(self):
+        if self._family == "open":
+            self._family = "done"
+
+    def _close_content(self):
+        self._content = "done"
+
+
+def extract_stream(html_text: str) -> PageExtract:
+    """То же, что extract_page на дереве BeautifulSoup, за один проход без дерева."""
+    page = PageExtract()
+    page.title, page.revid = page_revision(html_text)
+    categories: set[str] = set()
+    family_blocks: list[str] = []
+    content_blocks: list[str] = []
+
+    def member(title, href):
+        if title and "/Категория:" not in href and not should_skip_title(title):
+            page.members.append(title)
+
+    def next_page(href):
+        page.next_href = href
+
+    def infobox_row(label, text, links):
+        page.infobox[label] = {"text": text, "links": links}
+
+    visitor = PageVisitor()
+    visitor.on("member", member).on("next_page", next_page)
+    visitor.on("infobox_row", infobox_row).on("category", categories.add)
+    visitor.on("family_block", family_blocks.append)
+    visitor.on("content_block", lambda tag, text: content_blocks.append(text))
+    visitor.feed(html_text)
+    visitor.close()
+
+    if not visitor.has_infobox:
+        return page
+    page.has_infobox = True
+    page.categories = categories
+    page.text = " ".join(visitor.parts)
+    family = page.infobox.get("Семья")
+    if family and family["text"]:
+        page.family_infobox = parse_family_field_from_infobox(family["text"])
+    page.family_section = parse_family_items("".join(" " + b for b in family_blocks))
+    page.family_text = family_relations_in_text(" ".join(content_blocks))
+    return page
+
+
+def extract_page(html_text: str, parser: str = "html.parser", targeted: bool = False) -> PageExtract:
+    """
+    Всё, что скраперам нужно от страницы, за один разбор.
+    targeted=True — дерево строится только для TARGET_CLASSES (SoupStrainer),
+    текст страницы собирается потоково; результат тот же, что и при полном разборе.
+    parser="stream" — один проход без дерева (extract_stream), targeted не нужен.
+    """
+    if parser == "stream":
+        return extract_stream(html_text)
+    parser = resolve_parser(parser)
+    # резервный блок категорий темы помечен id, а не классом — такие страницы разбираем целиком
+    if targeted and 'id="articleCategories"' not in html_text:
+        soup = BeautifulSoup(html_text, parser, parse_only=TARGET_STRAINER)
+    else:
+        targeted = False
+        soup = BeautifulSoup(html_text, parser)
+    page = PageExtract()
+    page.title, page.revid = page_revision(html_text)
+    page.members, page.next_href = parse_category_members(soup)
+    if not soup.select_one(".portable-infobox"):
+        return page
+    page.has_infobox = True
+    page.infobox = parse_infobox(soup)
+    page.categories = parse_categories(soup)
+    page.text = page_text(html_text) if targeted else soup.get_text(separator=" ", strip=True)
+    family = page.infobox.get("Семья")
+    if family and family["text"]:
+        page.family_infobox = parse_family_field_from_infobox(family["text"])
+    page.family_section = parse_family_section(soup)
+    page.family_text = extract_family_relations_from_text(soup, "")
+    return page
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""
+Асинхронный движок загрузки страниц для краулера ru.fandom.
+Вместо последовательных запросов с time.sleep — ограниченный пул
+запросов «в полёте» и token bucket на каждый хост.
+Темп и число параллельных запросов к хосту подбирает HostController
+по ответам сервера: растут, пока сервер отвечает быстро и без 429/503,
+и падают вдвое (с паузой по Retry-After), как только он просит притормозить.
+"""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import functools
+import logging
+import threading
+import time
+import urllib.parse
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger("hp-kg")
+
+
+class TokenBucket:
+    """
+    Token bucket: пополняется со скоростью rate токенов в секунду,
+    копит не больше burst токенов. Один запрос = один токен.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._not_before = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def hold(self, seconds: float):
+        """Ни одного токена раньше чем через seconds (Retry-After)."""
+        self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while (wait := self._not_before - time.monotonic()) > 0:
+                await asyncio.sleep(wait)
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class Throttled(Exception):
+    """
+    fetch(url) сообщает движку, что сервер просит притормозить (429/503).
+    retry_after — из заголовка Retry-After (сек) или None;
+    fallback — что вернуть, если повторы не помогли (например, устаревшая копия из кеша).
+    """
+
+    def __init__(self, status: int, retry_after: Optional[float] = None, fallback=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+        self.fallback = fallback
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HostController:
+    """
+    AIMD по ответам одного хоста:
+      - каждые window успешных ответов без 429/503, если p90 задержки не выше
+        latency_factor × лучшей медианы, — темп ×increase и +1 параллельный запрос;
+        у темпа, на котором сервер уже отказывал (ceiling), — осторожно, +step запр/с;
+      - 429/503 — темп ×decrease, параллельность вдвое, пауза по Retry-After
+        (не чаще раза в cooldown сек: пачка отказов одного залпа — одно торможение);
+      - p90 задержки выше порога — темп ×decrease, параллельность −1.
+    Темп — в rate (запросов/с, его читает TokenBucket), параллельность — в concurrency.
+    adaptive=False — только паузы по Retry-After, темп и параллельность постоянны.
+    """
+
+    def __init__(self, rate: float, concurrency: int, min_rate: float = 0.2, max_rate: float = 20.0,
+                 max_concurrency: int = 8, adaptive: bool = True, burst: int = 1, window: int = 20,
+                 increase: float = 1.25, decrease: float = 0.5, latency_factor: float = 3.0,
+                 step: float = 0.25, cooldown: float = 1.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.adaptive = adaptive
+        self.min_rate, self.max_rate = min_rate, max(max_rate, rate)
+        self.concurrency = max(1, concurrency)
+        self.max_concurrency = max(self.concurrency, max_concurrency)
+        self.window, self.increase, self.decrease = window, increase, decrease
+        self.latency_factor, self.step, self.cooldown = latency_factor, step, cooldown
+        self.ceiling: Optional[float] = None  # темп последнего 429/503
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.baseline: Optional[float] = None  # лучшая медиана задержки за прогон
+        self.requests = self.throttled = 0
+        self._streak = 0
+        self._last_backoff = 0.0
+        self._active = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _set(self, rate: float, concurrency: int):
+        self.bucket.rate = min(self.max_rate, max(self.min_rate, rate))
+        self.concurrency = min(self.max_concurrency, max(1, concurrency))
+
+    # --- слоты параллельности ---
+    async def acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.concurrency)
+            self._active += 1
+
+    async def release(self):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def detach(self):
+        """Движок закрыт: примитивы asyncio привязаны к старому циклу, подобранный темп остаётся."""
+        self._cond = None
+        self._active = 0
+        self.bucket = TokenBucket(self.bucket.rate, self.bucket.burst)
+
+    # --- обратная связь ---
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def on_success(self, latency: float):
+        self.requests += 1
+        self.latencies.append(latency)
+        self._streak += 1
+        if not self.adaptive or self._streak < self.window:
+            return
+        self._streak = 0
+        p50, p90 = self.percentile(0.5), self.percentile(0.9)
+        self.baseline = p50 if self.baseline is None else min(self.baseline, p50)
+        if p90 > self.latency_factor * self.baseline:
+            self._set(self.rate * self.decrease ** 0.5, self.concurrency - 1)
+            logger.info("Задержка растёт (p90 %.2f с): %.2f запр/с, параллельно %s",
+                        p90, self.rate, self.concurrency)
+        elif self.ceiling is not None and self.rate * self.increase > self.ceiling:
+            self._set(self.rate + self.step, self.concurrency + 1)
+        else:
+            self._set(self.rate * self.increase, self.concurrency + 1)
+
+    def on_throttle(self, retry_after: Optional[float], backoff: float) -> float:
+        """Регистрирует 429/503; возвращает паузу перед повтором."""
+        self.requests += 1
+        self.throttled += 1
+        self._streak = 0
+        delay = retry_after if retry_after is not None else backoff
+        self.bucket.hold(delay)
+        now = time.monotonic()
+        if self.adaptive and now - self._last_backoff >= self.cooldown:
+            self._last_backoff = now
+            self.ceiling = self.rate
+            self._set(self.rate * self.decrease, self.concurrency // 2)
+            logger.warning("Сервер просит притормозить: %.2f запр/с, параллельно %s, пауза %.1f с",
+                           self.rate, self.concurrency, delay)
+        return delay
+
+    def stats(self) -> dict:
+        p50, p90 = self.percentile(0.5), self.percentile(0.9)
+        return {"rate": round(self.rate, 2), "concurrency": self.concurrency,
+                "requests": self.requests, "throttled": self.throttled,
+                "p50": p50 and round(p50, 3), "p90": p90 and round(p90, 3)}
+
+
+class FetchEngine:
+    """
+    Запускает блокирующую функцию fetch(url) в отдельном event loop:
+      - не больше max_in_flight запросов одновременно;
+      - не больше rate запросов в секунду на хост (token bucket);
+      - adaptive=True — rate и параллельность на хост подбирает HostController
+        в пределах [min_rate, max_rate] и [1, max_in_flight], начиная с rate
+        и start_in_flight.
+    fetch может бросить Throttled (429/503): движок ждёт Retry-After (или
+    backoff × 2^попытка) и повторяет до max_retries раз, затем отдаёт fallback.
+    lookup(url) — быстрый путь без сети (локальный кеш): если он вернул
+    результат, лимиты не расходуются. process(url, text) — стадия разбора:
+    при process_workers > 0 идёт в пул процессов и не занимает слоты загрузки.
+    Граф не трогаем: запись в граф — в основном потоке. submit/prefetch
+    ставят страницу в очередь заранее, get ждёт результат. Готовых результатов,
+    которые никто не забрал get(), движок держит не больше max_unclaimed
+    (самые старые выбрасываются: повторный get() загрузит страницу заново).
+    После close() движок не перезапускается: submit отдаёт future с ошибкой.
+    fetch_timeout — сколько может длиться один вызов fetch(url) (таймаут транспорта
+    со всеми его повторами); дольше — попытка считается неудачной, страница — не
+    загруженной. get() ждёт не дольше result_timeout без единой завершённой загрузки
+    (все попытки одной страницы с паузами между ними), иначе тоже отдаёт None.
+    observe(stage, seconds) — необязательный приёмник замеров: "lookup", "fetch"
+    (одна попытка по сети), "parse" (стадия process вместе с ожиданием пула).
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[str]],
+                 max_in_flight: int = 8, rate: float = 5.0, burst: int = 1,
+                 lookup: Callable[[str], Optional[str]] | None = None,
+                 process: Callable[[str, str], object] | None = None,
+                 process_workers: int = 0, adaptive: bool = False,
+                 start_in_flight: Optional[int] = None, min_rate: float = 0.2,
+                 max_rate: Optional[float] = None, max_retries: int = 4, backoff: float = 0.5,
+                 observe: Callable[[str, float], None] | None = None, max_unclaimed: int = 512,
+                 fetch_timeout: Optional[float] = None):
+        self._fetch = fetch
+        self._observe = observe
+        self._lookup = lookup
+        self._process = process
+        self.process_workers = process_workers
+        self.max_in_flight = max(1, max_in_flight)
+        self.start_in_flight = start_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.fetch_timeout = fetch_timeout
+        self.completed = 0  # завершённых future: get() по нему видит, что движок не встал
+        self.hosts: dict[str, HostController] = {}
+        self.lookup_hits = self.lookup_misses = 0
+        self.max_unclaimed = max(1, max_unclaimed)
+        self._pending: dict[str, Future] = {}
+        self._unclaimed: OrderedDict[str, Future] = OrderedDict()  # готовые, ещё не забранные get()
+        self._closed = False
+        # RLock: отмена future в close() синхронно вызывает _on_done под этой же блокировкой
+        self._lock = threading.RLock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._sem: asyncio.Semaphore | None = None
+
+    # --- жизненный цикл ---
+    def _ensure_started(self):
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                            thread_name_prefix="hp-kg-fetch")
+        if self._process is not None and self.process_workers > 0:
+            # spawn: дочерние процессы не наследуют потоки и сокеты родителя
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        self._sem = asyncio.Semaphore(self.max_in_flight)
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="hp-kg-fetch-loop", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for fut in list(self._pending.values()):
+                fut.cancel()
+            self._pending.clear()
+            self._unclaimed.clear()
+            if self._loop is None:
+                return
+            loop, self._loop = self._loop, None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+        for host in self.hosts.values():
+            host.detach()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True, cancel_futures=True)
+        self._thread = self._executor = self._process_pool = self._sem = None
+
+    @property
+    def result_timeout(self) -> Optional[float]:
+        if self.fetch_timeout is None:
+            return None
+        pauses = sum(self.backoff * 2 ** attempt for attempt in range(self.max_retries))
+        return (self.max_retries + 1) * self.fetch_timeout + pauses
+
+    # --- загрузка ---
+    def _host(self, url: str) -> HostController:
+        netloc = urllib.parse.urlsplit(url).netloc
+        host = self.hosts.get(netloc)
+        if host is None:
+            start = self.start_in_flight if self.adaptive and self.start_in_flight else self.max_in_flight
+            host = self.hosts[netloc] = HostController(
+                self.rate, start, min_rate=min(self.min_rate, self.rate),
+                max_rate=self.max_rate or self.rate, max_concurrency=self.max_in_flight,
+                adaptive=self.adaptive, burst=self.burst,
+            )
+        return host
+
+    async def _call_fetch(self, url: str):
+        """
+        fetch(url) в пуле потоков. fetch_timeout отсчитывается с момента, когда поток
+        взялся за запрос, а не с постановки в очередь пула: поток с зависшим запросом
+        не прервать, и занятый им поток не должен «съедать» время следующих запросов.
+        """
+        loop = self._loop
+        if self.fetch_timeout is None:
+            return await loop.run_in_executor(self._executor, self._fetch, url)
+        began = loop.create_future()
+
+        def run():
+            loop.call_soon_threadsafe(lambda: began.done() or began.set_result(None))
+            return self._fetch(url)
+
+        call = loop.run_in_executor(self._executor, run)
+        await asyncio.wait((began, call), return_when=asyncio.FIRST_COMPLETED)
+        return await asyncio.wait_for(call, self.fetch_timeout)
+
+    async def _download(self, url: str):
+        host = self._host(url)
+        for attempt in range(self.max_retries + 1):
+            await host.acquire()
+            try:
+                # сначала место в пуле, потом токен: иначе токены «сгорают» в очереди
+                async with self._sem:
+                    await host.bucket.acquire()
+                    started = time.monotonic()
+                    try:
+                        text = await self._call_fetch(url)
+                    except Throttled as e:
+                        throttled = e
+                        self._measure("fetch", started)
+                    except asyncio.TimeoutError:
+                        self._measure("fetch", started)
+                        logger.warning("Загрузка дольше %.0f с, считаем неудачной: %s", self.fetch_timeout, url)
+                        return None
+                    else:
+                        host.on_success(self._measure("fetch", started))
+                        return text
+            finally:
+                await host.release()
+            # пауза — в token bucket хоста: её ждут и остальные запросы к нему
+            host.on_throttle(throttled.retry_after, self.backoff * 2 ** attempt)
+        logger.warning("Сервер не отвечает (HTTP %s после %s попыток): %s",
+                       throttled.status, self.max_retries + 1, url)
+        return throttled.fallback
+
+    def stats(self) -> dict[str, dict]:
+        return {netloc: host.stats() for netloc, host in self.hosts.items()}
+
+    def _measure(self, stage: str, started: float) -> float:
+        elapsed = time.monotonic() - started
+        if self._observe is not None:
+            self._observe(stage, elapsed)
+        return elapsed
+
+    async def _run(self, url: str):
+        loop = self._loop
+        text = None
+        if self._lookup is not None:
+            started = time.monotonic()
+            text = await loop.run_in_executor(self._executor, self._lookup, url)
+            self._measure("lookup", started)
+            if text is None:
+                self.lookup_misses += 1
+            else:
+                self.lookup_hits += 1
+        if text is None:
+            text = await self._download(url)
+        if text is None or self._process is None:
+            return text
+        started = time.monotonic()
+        result = await loop.run_in_executor(self._process_pool or self._executor, self._process, url, text)
+        self._measure("parse", started)
+        return result
+
+    def submit(self, url: str) -> Future:
+        with self._lock:
+            fut = self._pending.get(url)
+            if fut is not None:
+                return fut
+            if self._closed:
+                # например, поток списка категории, не успевший остановиться до close()
+                fut = Future()
+                fut.set_exception(RuntimeError("движок загрузки закрыт"))
+                return fut
+            self._ensure_started()
+            fut = asyncio.run_coroutine_threadsafe(self._run(url), self._loop)
+            self._pending[url] = fut
+        fut.add_done_callback(functools.partial(self._on_done, url))
+        return fut
+
+    def _on_done(self, url: str, fut: Future):
+        """Готовый результат ждёт get(); лишние (prefetch без get) выбрасываются, старые первыми."""
+        with self._lock:
+            self.completed += 1
+            if self._pending.get(url) is not fut:
+                return
+            self._unclaimed[url] = fut
+            while len(self._unclaimed) > self.max_unclaimed:
+                stale_url, stale = self._unclaimed.popitem(last=False)
+                if self._pending.get(stale_url) is stale:
+                    del self._pending[stale_url]
+
+    def discard(self, url: str):
+        """
+        Результат url больше не нужен движку: забыть его. Загрузка не отменяется —
+        её может ждать get() в другом потоке; без него результат просто уйдёт в сборщик мусора.
+        """
+        with self._lock:
+            self._pending.pop(url, None)
+            self._unclaimed.pop(url, None)
+
+    def prefetch(self, urls: Iterable[str]):
+        for url in urls:
+            self.submit(url)
+
+    def get(self, url: str):
+        fut = self.submit(url)
+        try:
+            while not fut.done():
+                completed = self.completed
+                wait((fut,), timeout=self.result_timeout)
+                # страница может просто стоять в очереди за другими — ждём, пока те завершаются
+                if not fut.done() and self.completed == completed:
+                    logger.warning("Нет результата за %.0f с, считаем загрузку неудачной: %s",
+                                   self.result_timeout, url)
+                    return None
+            return fut.result()
+        except Exception as e:
+            logger.warning("Ошибка загрузки %s: %s", url, e)
+            return None
+        finally:
+            with self._lock:
+                if self._pending.get(url) is fut:
+                    del self._pending[url]
+                if self._unclaimed.get(url) is fut:
+                    del self._unclaimed[url]
@@ -6,20 +6,44 @@
 """
 from __future__ import annotations
 
+import os
 import re
+import json
 import time
+import functools
 import html
+import contextlib
 import urllib.parse
-import requests
 import logging
-from bs4 import BeautifulSoup
 from unidecode import unidecode
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-from rdflib import Graph, Namespace, URIRef, Literal
-from rdflib.namespace import RDF, RDFS, OWL
-from typing import Optional
+from rdflib import Namespace, URIRef, Literal
+from rdflib.namespace import RDF, RDFS, OWL, PROV
+from collections import deque
+from typing import Iterable, Optional
+
+from fetcher import FetchEngine, Throttled, parse_retry_after
+from transport import open_transport, TransportError
+from metrics import Metrics, Reporter
+from page_cache import PageCache
+import mw_api
+import delta_log
+import export
+import triple_store
+from crawl_state import CrawlState
+from entity_index import EntityIndex
+from type_cache import TypeCache, MISS
+from page_records import PageRecord, PageRecords
+from classify import TextMatcher
+from categories import CategoryLister
+from dedup import SeenTitles
+from rules import RULES
+# парсеры живут в extract.py (их импортируют процессы-разборщики); здесь — реэкспорт
+from extract import (  # noqa: F401
+    PageExtract, extract_page, should_skip_title,
+    parse_categories, parse_infobox, parse_family_section,
+    parse_family_field_from_infobox, extract_family_relations_from_text,
+)
 
 # -----------------------------
 # ЛОГИ
@@ -36,23 +60,86 @@ logger = logging.getLogger("hp-kg")
 BASE_IRI = "http://www.semanticweb.org/ekaterinakulesova/ontologies/2025/0/harry_potter#"
 BASE = "https://harrypotter.fandom.com/ru/wiki/"
 
-REQUEST_DELAY = 0.2
-RELATION_DELAY = 0.05
+REQUEST_DELAY = 0.2  # начальная пауза между запросами к хосту
+MAX_IN_FLIGHT = 8  # одновременных запросов к вики (потолок)
+ADAPTIVE_RATE = True  # подбирать темп по ответам сервера: 429/503, Retry-After, задержка
+START_IN_FLIGHT = 4   # с какой параллельности начинать при ADAPTIVE_RATE
+MIN_RATE = 0.2        # запросов/с на хост: ниже не тормозим
+MAX_RATE = 20.0       # запросов/с на хост: выше не разгоняемся
+TRANSPORT = "requests"     # "requests" (urllib3, keep-alive) | "httpx" (HTTP/2, нужен httpx[http2])
+POOL_SIZE = MAX_IN_FLIGHT  # keep-alive соединений на хост
+POOL_HOSTS = 4             # хостов, для которых держим пулы (вики, api.php, CDN)
+HTTP_TIMEOUT = 20          # сек на один HTTP-запрос
+HTTP_RETRIES = 4           # повторов 5xx и обрывов соединения внутри транспорта
+HTTP_BACKOFF = 0.5         # сек: пауза перед первым повтором, дальше вдвое больше
+PARSE_WORKERS = os.cpu_count() or 1  # процессов для разбора HTML (0 — разбирать в потоках загрузки)
+HTML_PARSER = "stream"  # "stream" (один проход, без дерева) | "auto" (lxml, если установлен) | "lxml" | "html.parser"
+PARSE_TARGETED = True   # для режимов с деревом: строить его только для инфобокса/категорий/тела статьи
+
+CATEGORY_PAGES_AHEAD = 2  # страниц пагинации каждой категории, скачанных впереди потребителя
+
+INGEST = "html"  # "html" — отрендеренные страницы; "api" — MediaWiki api.php пачками
+API_URL = None   # None — api.php рядом с BASE
+
+CACHE_DIR = ".hp_cache"     # локальный кеш страниц (None — без кеша)
+CACHE_MAX_AGE = 3600        # сек: свежие страницы отдаём без запроса к серверу
+OFFLINE = False             # True — работать только по кешу, без сети
 
 OUT_FILE = "harrypotter_kg_ru.ttl"
+EXPORT_EXTRA = []  # ещё выгрузки при компактизации, формат по расширению: ".nt", ".owl" (RDF/XML), "+.gz"
+SNAPSHOT_FILE = "harrypotter_kg_ru.kg.snapshot"  # бинарный снимок графа при компактизации (None — не писать)
+START_FROM_SNAPSHOT = False  # True — новый прогон начинается с графа из SNAPSHOT_FILE, а не с пустого
+PROVENANCE = True  # помнить, какая статья и какой экстрактор дали каждый триплет (в STATE_FILE)
+PROVENANCE_FILE = "harrypotter_kg_ru.nq.gz"  # N-Quads: именованный граф на (статью, экстрактор) (None — не писать)
+GRAPH_STORE = "interned"  # "interned" (компактно в RAM) | "memory" | "sqlite" | плагин rdflib ("BerkeleyDB", ...)
+GRAPH_STORE_PATH = "harrypotter_kg_ru.store.sqlite"  # где живёт граф, если хранилище не в памяти
+DELTA_FILE = "harrypotter_kg_ru.delta.nt"  # журнал новых триплетов между компактизациями
+STATE_FILE = "harrypotter_kg_ru.state.sqlite"  # очередь/курсоры/посещённые для продолжения после падения
+RESUME = True  # False — всегда начинать прогон заново
+INCREMENTAL = False  # True — вместо полного обхода обновить статьи, изменившиеся после прошлого прогона
+RECENT_CHANGES_MAX_AGE = 30 * 24 * 3600  # сек: сколько вики помнит recentchanges; дольше — сверка lastrevid
 CHECKPOINT_EVERY = 120
+
+TYPE_CACHE_SIZE = 10000                  # записей кеша типов в памяти (LRU)
+TYPE_CACHE_TTL = 30 * 24 * 3600          # сек: найденный тип страницы
+TYPE_CACHE_NEGATIVE_TTL = 3600           # сек: «тип не определён» (часто — сбой сети)
+PAGE_RECORDS_SIZE = 2048                 # разобранных статей в памяти до полного скрапинга
+UNCLAIMED_PAGES = 512                    # загруженных заранее страниц, которые ещё не запросили (старые — вон)
+DEDUP_CAPACITY = 500_000                 # заголовков за прогон, на которые рассчитан фильтр Блума
+DEDUP_ERROR_RATE = 0.001                 # доля ложных «видели» у фильтра (их отсеивает точное множество)
+METRICS_FILE = "harrypotter_kg_ru.metrics.json"      # снимок метрик (None — не писать)
+METRICS_PROM_FILE = "harrypotter_kg_ru.metrics.prom"  # то же в текстовом формате Prometheus
+METRICS_INTERVAL = 30                                 # сек между снимками
 _save_counter = 0
 
+# время стадий и счётчики прогона (см. metrics.py)
+metrics = Metrics()
+
 # -----------------------------
 # RDF граф
 # -----------------------------
-g = Graph()
+# источник (статья, экстрактор) добавляемых сейчас триплетов и их буфер — см. provenance()
+current_source: Optional[int] = None
+claimed: set = set()
+
+class MeteredGraph(delta_log.LoggedGraph):
+    """LoggedGraph с замером вставки триплетов (стадия graph_insert) и записью их происхождения."""
+
+    def add(self, triple):
+        with metrics.timer("graph_insert"):
+            if current_source is not None:
+                claimed.add(triple)
+            return super().add(triple)
+
+g = triple_store.open_graph(GRAPH_STORE, GRAPH_STORE_PATH, MeteredGraph,
+                            delta_log=delta_log.DeltaLog(DELTA_FILE))
 HP = Namespace(BASE_IRI)
 HPO = Namespace(BASE_IRI)
 g.bind("hp", HP)
 g.bind("hpo", HPO)
 g.bind("rdfs", RDFS)
 g.bind("owl", OWL)
+entities = EntityIndex(HP)  # slug → (URI, тип, метка): зеркало сущностей графа для быстрых проверок
 
 def qn(term) -> str:
     try:
@@ -169,57 +256,295 @@ for p in ["godfatherOf", "godsonOf", "cousinOf", "nephewOf", "nieceOf"]:
     g.add((obj_props[p], RDF.type, OWL.ObjectProperty))
 
 # -----------------------------
-# HTTP session (ретраи)
+# HTTP-транспорт (пул соединений, ретраи 5xx) + асинхронный движок загрузки
 # -----------------------------
-session = requests.Session()
-retry = Retry(
-    total=4, backoff_factor=0.5,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET"], raise_on_status=False,
-)
-adapter = HTTPAdapter(max_retries=retry)
-session.mount("https://", adapter)
-session.mount("http://", adapter)
+# 429/503 транспорт не повторяет: их видит FetchEngine и подстраивает темп (Throttled)
+transport = open_transport(TRANSPORT, pool_size=POOL_SIZE, pool_hosts=POOL_HOSTS,
+                           retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, user_agent="hp-kg-populator/1.0")
+# дольше этого один fetch_html не длится: все попытки транспорта с паузами между ними
+FETCH_TIMEOUT = (HTTP_RETRIES + 1) * HTTP_TIMEOUT + sum(HTTP_BACKOFF * 2 ** i for i in range(HTTP_RETRIES))
+
+page_cache = PageCache(CACHE_DIR, offline=OFFLINE, max_age=CACHE_MAX_AGE) if CACHE_DIR else None
 
-def http_get(url: str) -> BeautifulSoup | None:
+def fetch_html(url: str) -> str | None:
+    if page_cache and page_cache.offline:
+        logger.warning("Нет в кеше (офлайн): %s", url)
+        return None
+    entry = page_cache.lookup(url) if page_cache else None
+    headers = entry.conditional_headers() if entry else {}
     try:
-        r = session.get(url, headers={"User-Agent": "hp-kg-populator/1.0"}, timeout=20)
+        r = transport.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+        if r.status_code == 304 and entry:
+            page_cache.touch(entry)
+            return page_cache.read(entry)
         if r.status_code == 200:
-            return BeautifulSoup(r.text, "html.parser")
+            if page_cache:
+                page_cache.store(url, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            return r.text
+        if r.status_code in (429, 503):
+            raise Throttled(r.status_code, parse_retry_after(r.headers.get("Retry-After")),
+                            fallback=page_cache.read(entry) if entry else None)
         logger.warning("HTTP %s: %s", r.status_code, url)
-    except requests.RequestException as e:
+    except TransportError as e:
         logger.warning("Ошибка запроса %s: %s", url, e)
-    return None
+    # сервер недоступен — лучше устаревшая копия, чем ничего
+    return page_cache.read(entry) if entry else None
+
+def cached_html(url: str) -> str | None:
+    """Страница, которую можно взять из кеша без обращения к сети."""
+    return page_cache.get_fresh(url) if page_cache else None
+
+# Старт — 1 запрос в REQUEST_DELAY на хост, дальше темп подбирается по ответам сервера;
+# пока одна страница обрабатывается, следующие уже скачиваются и разбираются.
+engine = FetchEngine(
+    fetch_html, max_in_flight=MAX_IN_FLIGHT, rate=1 / REQUEST_DELAY,
+    adaptive=ADAPTIVE_RATE, start_in_flight=START_IN_FLIGHT, min_rate=MIN_RATE, max_rate=MAX_RATE,
+    lookup=cached_html, process_workers=PARSE_WORKERS, observe=metrics.observe, max_unclaimed=UNCLAIMED_PAGES,
+    fetch_timeout=FETCH_TIMEOUT,
+    process=functools.partial(mw_api.extract_response, parser=HTML_PARSER, targeted=PARSE_TARGETED),
+)
+
+def prefetch_urls(urls: Iterable[str]):
+    engine.prefetch(urls)
+
+def get_page(url: str) -> PageExtract | None:
+    return engine.get(url)
+
+# --- источник статей: HTML по одной или api.php пачками ---
+api_pages: mw_api.BatchedPages | None = None
+
+def api_endpoint() -> str:
+    return API_URL or urllib.parse.urljoin(BASE, "../api.php")
+
+def _api_pages() -> mw_api.BatchedPages:
+    global api_pages
+    if api_pages is None:
+        api_pages = mw_api.BatchedPages(engine, api_endpoint())
+    return api_pages
+
+def article_page(title_ru: str) -> PageExtract | None:
+    if INGEST == "api":
+        return _api_pages().get(title_ru)
+    return get_page(fandom_url(title_ru))
+
+def prefetch_articles(titles: Iterable[str]):
+    if INGEST == "api":
+        _api_pages().prefetch(titles)
+    else:
+        prefetch_urls(fandom_url(t) for t in titles)
+
+def category_url(category_title_ru: str) -> str:
+    if INGEST == "api":
+        return mw_api.category_members_url(api_endpoint(), category_title_ru)
+    return fandom_url("Категория:" + category_title_ru)
+
+def prefetch_ahead() -> int:
+    """Сколько статей держать запрошенными впереди: в api-режиме — несколько полных пачек."""
+    if INGEST == "api":
+        return mw_api.BATCH_SIZE * MAX_IN_FLIGHT
+    return 2 * MAX_IN_FLIGHT
+
+# -----------------------------
+# Метрики: источники снимка и периодическая запись
+# -----------------------------
+triples_at_start = 0
+
+def graph_stats() -> dict:
+    triples = len(g)
+    elapsed = max(1e-9, time.time() - metrics.started)
+    stats = {"triples": triples, "new_triples": triples - triples_at_start,
+             "triples_per_sec": (triples - triples_at_start) / elapsed, "entities": len(entities)}
+    if isinstance(g.store, triple_store.InternedStore):
+        stats["store"] = g.store.stats()
+    return stats
+
+metrics.source("graph", graph_stats)
+metrics.source("type_cache", lambda: type_cache.stats())
+metrics.source("page_records", lambda: {"size": len(page_records), "reused": page_records.reused})
+metrics.source("dedup", lambda: seen_pages.report())
+metrics.source("page_cache", lambda: {"hits": engine.lookup_hits, "misses": engine.lookup_misses})
+metrics.source("hosts", engine.stats)
+metrics.source("transport", lambda: transport.stats.snapshot())
+reporter = Reporter(metrics, METRICS_FILE, METRICS_PROM_FILE, METRICS_INTERVAL)
 
 # -----------------------------
 # Утилиты + чекпоинты
 # -----------------------------
+# до start_crawl() — состояние в памяти (отдельные функции можно вызывать без main)
+crawl_state = CrawlState()
+
 def save_checkpoint(force=False):
+    """
+    Обычный чекпоинт — дописать новые триплеты в DELTA_FILE (цена не зависит от размера графа).
+    force=True — компактизация: полный отсортированный Turtle в OUT_FILE, журнал обнуляется.
+    """
     global _save_counter
     if not force and _save_counter < CHECKPOINT_EVERY:
         return
-    g.serialize(destination=OUT_FILE, format="turtle")
-    logger.info("Сохранено в %s (триплетов: %s)", OUT_FILE, len(g))
+    with metrics.timer("compaction" if force else "checkpoint"):
+        _write_checkpoint(force)
     _save_counter = 0
+    reporter.maybe_write()
+
+def _write_checkpoint(force: bool):
+    if force:
+        g.commit()
+        delta_log.write_turtle(g, OUT_FILE)
+        for path in EXPORT_EXTRA:
+            export.export_graph(g, path)
+        if PROVENANCE and PROVENANCE_FILE:
+            export_provenance(PROVENANCE_FILE)
+        if SNAPSHOT_FILE:
+            triple_store.save_snapshot(g, SNAPSHOT_FILE)
+        g.delta_log.reset()
+        logger.info("Сохранено в %s (триплетов: %s)", OUT_FILE, len(g))
+    else:
+        # сначала триплеты, потом состояние обхода: после падения состояние
+        # никогда не опережает граф (лишнее повторится, но ничего не потеряется)
+        n = g.delta_log.flush()
+        g.commit()  # хранилище на диске фиксирует транзакцию; для памяти — ничего
+        crawl_state.commit()
+        logger.info("Чекпоинт: +%s триплетов в %s (всего: %s)", n, DELTA_FILE, g.delta_log.written)
+
+def start_crawl(mode: str = "crawl"):
+    """
+    Открывает STATE_FILE. Если прошлый прогон не дошёл до конца — возвращает в граф
+    его журнал и кеш типов и продолжает с последнего чекпоинта; иначе начинает заново.
+    START_FROM_SNAPSHOT — в обоих случаях основа графа — снимок прошлого прогона.
+    mode="update" (update_main) — основа всегда граф прошлого прогона, журнал — правки поверх него.
+    """
+    global crawl_state, type_cache, seen_pages, triples_at_start
+    metrics.reset()
+    crawl_state = CrawlState(STATE_FILE)
+    type_cache = new_type_cache()
+    seen_pages = new_seen_pages()
+    on_previous = START_FROM_SNAPSHOT or mode == "update"
+    # прерванное обновление доводится всегда: происхождение в STATE_FILE уже учитывает его правки
+    resume = crawl_state.unfinished() and (RESUME or crawl_state.mode() == "update")
+    if resume and crawl_state.mode() != mode:
+        if mode == "update":
+            raise RuntimeError("Полный прогон не завершён: сначала доведите его до конца (main)")
+        if on_previous:
+            raise RuntimeError("Обновление не завершено: сначала доведите его до конца (update_main)")
+        resume = False  # полный обход с пустого графа: прерванное обновление больше не нужно
+    if resume:
+        if on_previous:
+            load_previous_graph()
+        n = delta_log.replay(DELTA_FILE, g)
+        entities.rebuild(g)
+        seen_pages.update(crawl_state.visited_titles(), source="resume")
+        triples_at_start = len(g)
+        logger.info("Продолжение прерванного прогона: %s триплетов из %s", n, DELTA_FILE)
+        return
+    if crawl_state.unfinished() and crawl_state.mode() == "update":
+        # журнал обновления — правки поверх снимка, а не граф; граф строится заново
+        g.delta_log.reset()
+    else:
+        recover_checkpoint()
+    if on_previous:
+        load_previous_graph()
+    else:
+        if triple_store.is_persistent(g):
+            reset_graph()
+        crawl_state.forget_graph()
+    entities.rebuild(g)
+    crawl_state.begin(mode)
+    triples_at_start = len(g)
+
+def finish_crawl():
+    crawl_state.finish()
+    save_checkpoint(force=True)
+    snapshot = reporter.write()
+    logger.info("Стадии прогона:\n%s", metrics.summary(snapshot))
+    for name, values in snapshot["sources"].items():
+        logger.info("%s: %s", name, values)
+
+def load_previous_graph():
+    """Граф прошлого прогона: хранилище на диске уже его содержит, в память — из SNAPSHOT_FILE."""
+    if triple_store.is_persistent(g):
+        return
+    if not SNAPSHOT_FILE or not os.path.exists(SNAPSHOT_FILE):
+        logger.info("Снимка %s нет — прогон начинается с пустого графа", SNAPSHOT_FILE)
+        return
+    with metrics.timer("snapshot_load"):
+        n = triple_store.load_snapshot(g, SNAPSHOT_FILE)
+    logger.info("Граф прошлого прогона из %s: %s триплетов", SNAPSHOT_FILE, n)
+
+def reset_graph():
+    """Новый прогон поверх хранилища на диске: от прошлого графа остаётся только онтология."""
+    schema_terms = set(classes.values()) | set(obj_props.values()) | set(data_props.values())
+    schema = [t for term in schema_terms for t in g.triples((term, None, None))]
+    g.remove((None, None, None))
+    for t in schema:
+        g.add(t)
+
+def recover_checkpoint():
+    """Журнал от упавшего прогона → OUT_FILE, чтобы не потерять его чекпоинты."""
+    n = delta_log.recover(DELTA_FILE, OUT_FILE, bind=dict(g.namespaces()))
+    if n:
+        logger.info("Восстановлено из %s в %s (триплетов: %s)", DELTA_FILE, OUT_FILE, n)
 
 def bump_counter(n=1):
     global _save_counter
     _save_counter += n
     save_checkpoint(False)
 
-SKIP_TITLE_PATTERNS = [
-    r"\(персонажи\)$", r"\(персонаж\)$", r"\(персонажи фильма\)$",
-    r"^Список($|[ \t])", r"^Персонажи($|[ \t])", r"^Категория:",
-]
-def should_skip_title(title: str) -> bool:
-    if not title:
-        return True
-    t = title.strip()
-    for pat in SKIP_TITLE_PATTERNS:
-        if re.search(pat, t, flags=re.IGNORECASE):
-            return True
-    return False
+# -----------------------------
+# Происхождение триплетов: именованный граф на (статья, экстрактор)
+# -----------------------------
+@contextlib.contextmanager
+def provenance(page: str, extractor: str, revid: Optional[int] = None):
+    """
+    Всё, что добавляется в граф внутри блока, записывается за источником
+    (page, extractor) с ревизией revid — вклад статьи потом убирается целиком (retract_page).
+    Триплеты копятся в памяти и уходят в STATE_FILE одним executemany при выходе из блока:
+    g.add не ждёт SQLite. Повторно добавленные тоже записываются — их утверждают оба источника.
+    """
+    global current_source, claimed
+    outer = current_source, claimed
+    current_source = crawl_state.source(page, extractor, revid) if PROVENANCE else None
+    claimed = set()
+    try:
+        yield
+    finally:
+        if current_source is not None and claimed:
+            crawl_state.record(current_source, (tuple(map(triple_store.encode, t)) for t in claimed))
+        current_source, claimed = outer
+
+def claim_entity(slug: str):
+    """Сущность уже в графе: источник ссылки тоже утверждает её тип и метку (иначе они уйдут с чужой страницей)."""
+    entity = entities.get(slug)
+    if current_source is None or entity is None:
+        return
+    claimed.add((entity.uri, RDF.type, entity.type))
+    if entity.label is not None:
+        claimed.add((entity.uri, RDFS.label, Literal(entity.label, lang="ru")))
+
+@functools.lru_cache(maxsize=4096)
+def source_iri(page: str, extractor: str) -> str:
+    """Имя именованного графа: URL статьи (категории) с экстрактором во фрагменте."""
+    return f"{fandom_url(page)}#{extractor}"
 
+def export_provenance(path: str) -> int:
+    """
+    N-Quads: триплет — в графе каждого источника, который его утверждает; триплеты без
+    источника (онтология) и prov:wasDerivedFrom графов (ссылка на ревизию статьи) —
+    в графе по умолчанию.
+    """
+    def default():
+        for t in g:
+            if not crawl_state.is_tracked(*map(triple_store.encode, t)):
+                yield t
+        for page, extractor, revid in crawl_state.sources():
+            url = fandom_url(page)
+            yield (URIRef(source_iri(page, extractor)), PROV.wasDerivedFrom,
+                   URIRef(f"{url}?oldid={revid}" if revid else url))
+
+    named = ((source_iri(page, extractor), tuple(map(triple_store.decode, spo)))
+             for page, extractor, *spo in crawl_state.quads())
+    return export.export_quads(path, default(), named)
+
+@functools.lru_cache(maxsize=65536)
 def slugify(label: str) -> str:
     txt = html.unescape(label).strip()
     ascii_txt = unidecode(txt)
@@ -231,7 +556,7 @@ def hp_entity(s: str) -> URIRef:
     return HP[s]
 
 def add_labeled_instance(uri: URIRef, label_ru: str, rdf_type: URIRef):
-    already = (uri, RDF.type, None) in g
+    already = not entities.add(entities.slug_of(uri), uri, rdf_type, label_ru)
     g.add((uri, RDF.type, rdf_type))
     g.add((uri, RDFS.label, Literal(label_ru, lang="ru")))
     if not already:
@@ -241,45 +566,6 @@ def add_labeled_instance(uri: URIRef, label_ru: str, rdf_type: URIRef):
 def fandom_url(title_ru: str) -> str:
     return urllib.parse.urljoin(BASE, urllib.parse.quote(title_ru.replace(" ", "_")))
 
-# --------- категории из шапки страницы ----------
-def parse_categories(soup: BeautifulSoup) -> set[str]:
-    """
-    Возвращает категории именно этой статьи (из шапки / page header).
-    Не сканируем всю страницу, чтобы не ловить навигацию/шаблоны.
-    """
-    cats = set()
-    for a in soup.select('.page-header__categories a.category[href^="/ru/wiki/Категория:"]'):
-        t = (a.get("title") or a.get_text(strip=True) or "").strip()
-        if t.startswith("Категория:"):
-            cats.add(t.replace("Категория:", "").strip())
-    # резервный блок категорий (если включен темой)
-    for a in soup.select('#articleCategories a[href^="/ru/wiki/Категория:"]'):
-        t = (a.get("title") or a.get_text(strip=True) or "").strip()
-        if t.startswith("Категория:"):
-            cats.add(t.replace("Категория:", "").strip())
-    return cats
-
-def parse_infobox(soup: BeautifulSoup) -> dict:
-    data = {}
-    box = soup.select_one(".portable-infobox")
-    if not box:
-        return data
-    for row in box.select(".pi-data"):
-        label = row.select_one(".pi-data-label")
-        value = row.select_one(".pi-data-value")
-        if not label or not value:
-            continue
-        key = label.get_text(separator=" ", strip=True)
-        text = value.get_text(separator=" ", strip=True)
-        links = []
-        for a in value.select("a[href]"):
-            href = a.get("href") or ""
-            title = a.get("title") or a.get_text(strip=True)
-            if href.startswith("/ru/wiki/") and title and "/Категория:" not in href:
-                links.append(title)
-        data[key] = {"text": text, "links": links}
-    return data
-
 def ensure_entity(title_ru: str, rdf_type: URIRef):
     uri = hp_entity(slugify(title_ru))
     add_labeled_instance(uri, title_ru, rdf_type)
@@ -289,53 +575,89 @@ def link_by_titles(subject_uri: URIRef, prop: URIRef, titles: list[str], fallbac
     for t in titles:
         if should_skip_title(t):
             continue
-        obj = hp_entity(slugify(t))
-        if (obj, RDF.type, None) not in g:
+        slug = slugify(t)
+        obj = hp_entity(slug)
+        if slug not in entities:
             add_labeled_instance(obj, t, fallback_type)
-            ##time.sleep(RELATION_DELAY)
+        else:
+            claim_entity(slug)
         g.add((subject_uri, prop, obj))
 
 
-detect_type_cache: dict[str, Optional[URIRef]] = {}
+def new_type_cache() -> TypeCache:
+    return TypeCache(crawl_state, max_entries=TYPE_CACHE_SIZE,
+                     ttl=TYPE_CACHE_TTL, negative_ttl=TYPE_CACHE_NEGATIVE_TTL)
+
+type_cache = new_type_cache()
+
+def new_seen_pages() -> SeenTitles:
+    return SeenTitles(DEDUP_CAPACITY, DEDUP_ERROR_RATE)
+
+# страницы, уже взятые в работу в этом прогоне (из любой категории или списка)
+seen_pages = new_seen_pages()
+
+def remember_type(title_ru: str, rdf_type: Optional[URIRef]) -> Optional[URIRef]:
+    return type_cache.put(title_ru, rdf_type)
 
 # New helper: попытка определить тип сущности по её странице
 def determine_type_for_title(title_ru: str) -> Optional[URIRef]:
     """
     Если в графе уже есть тип — возвращаем его.
     Иначе пробуем запросить страницу персонажа и вычислить тип через type_from_sources.
-    Кешируем результаты в detect_type_cache, чтобы не делать лишних запросов.
+    Кешируем результаты в type_cache (между прогонами тоже), чтобы не делать лишних запросов.
     Возвращаем найденный класс или None, если не удалось определить.
     """
     if not title_ru:
         return None
     # кеш
-    if title_ru in detect_type_cache:
-        return detect_type_cache[title_ru]
-    obj = hp_entity(slugify(title_ru))
-    # если уже есть тип в графе — вернём первый найденный URIRef
-    for _, _, t in g.triples((obj, RDF.type, None)):
-        if isinstance(t, URIRef):
-            detect_type_cache[title_ru] = t
-            return t
-        # если встретился не-URIRef — игнорируем и продолжаем
-
-    # попробуем получить страницу
-    url = fandom_url(title_ru)
-    soup = http_get(url)
-    ##time.sleep(REQUEST_DELAY)
-    if not soup:
-        detect_type_cache[title_ru] = None
-        return None
+    cached = type_cache.get(title_ru)
+    if cached is not MISS:
+        return cached
+    # если сущность уже в графе — вернём её тип
+    known = entities.type_of(slugify(title_ru))
+    if known is not None:
+        return remember_type(title_ru, known)
+
+    # попробуем получить страницу (запись сохранится для полного скрапинга)
+    return remember_type(title_ru, page_record(title_ru).rdf_type)
+
+page_records = PageRecords(PAGE_RECORDS_SIZE)
+
+def page_record(title_ru: str, consume: bool = False) -> PageRecord:
+    """
+    Статья, разобранная и классифицированная один раз: повторное обращение
+    (определение типа, затем полный скрапинг) берёт готовую запись.
+    consume=True — запись больше не понадобится (персонаж скрапится целиком).
+    Неудачная загрузка (page=None) не запоминается: следующее обращение скачивает заново.
+    """
+    record = page_records.pop(title_ru) if consume else page_records.get(title_ru)
+    if record is not None and record.page is not None:
+        return record
+    with metrics.timer("page_wait"):
+        page = article_page(title_ru)
     # если нет инфобокса — не считаем это персональной страницей
-    if not soup.select_one(".portable-infobox"):
-        detect_type_cache[title_ru] = None
-        return None
-    info = parse_infobox(soup)
-    cats = parse_categories(soup)
-    page_text = " ".join(soup.stripped_strings)
-    rdf_type = type_from_sources(info, cats, page_text)
-    detect_type_cache[title_ru] = rdf_type
-    return rdf_type
+    rdf_type = None
+    if page and page.has_infobox:
+        with metrics.timer("classify"):
+            rdf_type = type_from_sources(page.infobox, page.categories, page.text)
+    record = PageRecord(page, rdf_type)
+    if page is not None and not consume:
+        page_records.put(title_ru, record)
+    return record
+
+def prefetch_types(titles: Iterable[str]):
+    """
+    Заранее ставит в очередь движка страницы, которые понадобятся determine_type_for_title:
+    пока обрабатывается первый родственник, остальные уже скачиваются.
+    """
+    wanted = []
+    for t in titles:
+        if not t or should_skip_title(t) or t in type_cache:
+            continue
+        if slugify(t) in entities:
+            continue
+        wanted.append(t)
+    prefetch_articles(wanted)
 
 
 # Новая функция: для супругов — не назначаем сразу fallback, а пытаемся проанализировать каждого по имени/ссылке
@@ -346,11 +668,13 @@ def link_people_analyze(subject_uri: URIRef, prop: URIRef, titles: list[str], fa
         # попытаемся определить тип через страницу
         detected_type = determine_type_for_title(t)
         use_type = detected_type or fallback_type
-        obj = hp_entity(slugify(t))
-        if (obj, RDF.type, None) not in g:
+        slug = slugify(t)
+        obj = hp_entity(slug)
+        if slug not in entities:
             # создаём сущность с найденным типом (или fallback)
             add_labeled_instance(obj, t, use_type)
-            ##time.sleep(RELATION_DELAY)
+        else:
+            claim_entity(slug)
         g.add((subject_uri, prop, obj))
 
 
@@ -358,81 +682,27 @@ def link_people_analyze(subject_uri: URIRef, prop: URIRef, titles: list[str], fa
 # 3) Маппинг полей инфобокса -> свойства/классы
 # -----------------------------
 
+# подпись поля → (свойство, класс по умолчанию); таблица — в rules.json
 FIELD_MAP = {
-    "Дом": ("memberOf", classes["House"]),
-    "Организация": ("memberOf", classes["Organization"]),
-    "Принадлежность": ("memberOf", classes["Organization"]),
-
-    "Место обучения": ("studiedAt", classes["Location"]),
-    "Обучался в": ("studiedAt", classes["Location"]),
-    "Школа": ("studiedAt", classes["Location"]),
-    "Учился в": ("studiedAt", classes["Location"]),
-
-    "Род занятий": ("hasRole", classes["Role"]),
-    "Профессия": ("hasRole", classes["Role"]),
-    "Должность": ("hasRole", classes["Role"]),
-    "Специальность": ("hasRole", classes["Role"]),
-
-    "Супруг": ("marriedWith", classes["Character"]),
-    "Супруга": ("marriedWith", classes["Character"]),
-    "Супруг(а)": ("marriedWith", classes["Character"]),
-    "Отец": ("hasFather", classes["Character"]),
-    "Мать": ("hasMother", classes["Character"]),
-    "Родители": ("hasParent", classes["Character"]),
-    "Друзья": ("friendWith", classes["Character"]),
-    "Любовный интерес": ("romanceWith", classes["Character"]),
-    "Романтические отношения": ("romanceWith", classes["Character"]),
-
-    "Семья": ("family_from_infobox", classes["Character"]),
-    "Брат": ("hasBrother", classes["Character"]),
-    "Сестра": ("hasSister", classes["Character"]),
-    "Братья": ("hasSibling", classes["Character"]),
-    "Сёстры": ("hasSibling", classes["Character"]),
-    "Братья и сёстры": ("hasSibling", classes["Character"]),
-    "Дети": ("hasChild", classes["Character"]),
-    "Сын": ("hasSon", classes["Character"]),
-    "Дочь": ("hasDaughter", classes["Character"]),
-    "Сыновья": ("hasChild", classes["Character"]),
-    "Дочери": ("hasChild", classes["Character"]),
-    "Дядя": ("hasUncle", classes["Character"]),
-    "Тётя": ("hasAunt", classes["Character"]),
-    "Племянник": ("hasNephew", classes["Character"]),
-    "Племянница": ("hasNiece", classes["Character"]),
-    "Дедушка": ("hasGrandparent", classes["Character"]),
-    "Бабушка": ("hasGrandparent", classes["Character"]),
-    "Внук": ("hasGrandchild", classes["Character"]),
-    "Внучка": ("hasGrandchild", classes["Character"]),
-
-    # подсказки типа — отдельно
-    "Вид": ("type_hint", None),
-    "Вид(ы)": ("type_hint", None),
-    "Раса": ("type_hint", None),
-    "Раса/вид": ("type_hint", None),
-    "Принадлежность к виду": ("type_hint", None),
-    "Пол": ("sex_hint", None),
-
-    # важно: чтобы поле попало в info
-    "Чистота крови": ("blood_status_hint", None),
+    label: (prop_key, classes[cls] if cls else None)
+    for label, (prop_key, cls) in RULES.field_map.items()
 }
 
-CATEGORY_TO_CLASS = {
-    # люди
-    "Люди": classes["Human"],
-    "Маги": classes["Wizard"],
-    "Маги по алфавиту": classes["Wizard"],
-    "Магглы": classes["Muggle"],
-    "Сквибы": classes["Squib"],
-    "Маглорождённые волшебники": classes["Wizard"],
-    "Чистокровные волшебники": classes["Wizard"],
-    "Полукровки": classes["Wizard"],
-    # существа
-    "Домовые эльфы": classes["House_elf"],
-    "Привидения": classes["Ghost"],
-    "Кентавры": classes["Centaur"],
-    "Акромантулы": classes["Giant_spider"],
-    "Великаны": classes["Giant"],
-    "Русалки": classes["Mermaid"],
+# раздел «Семья»: связь субъекта → обратная связь, которую страница утверждает о родственнике
+FAMILY_INVERSE = {
+    "hasFather": "childOf", "hasMother": "childOf",
+    "hasBrother": "brotherOf", "hasSister": "sisterOf",
+    "cousinOf": "cousinOf", "godsonOf": "godfatherOf", "godfatherOf": "godsonOf",
 }
+# только обратные: такую связь о родственнике могла утвердить лишь страница, где он упомянут
+INVERSE_ONLY = set(FAMILY_INVERSE.values()) - set(FAMILY_INVERSE)
+
+# связи с людьми: тип объекта определяем по его странице, а не по fallback
+PERSON_RELATIONS = {"marriedWith", "hasFather", "hasMother", "friendWith",
+                    "romanceWith", "relativeOf", "hasParent"}
+
+# категория → класс; таблица — в rules.json
+CATEGORY_TO_CLASS = {category: classes[cls] for category, cls in RULES.category_to_class.items()}
 
 CREATURE_KEYWORDS = {
     "кентавр": classes["Centaur"],
@@ -443,13 +713,36 @@ CREATURE_KEYWORDS = {
     "русалк": classes["Mermaid"],  # стем
 }
 
-# --- поиск по слову с границами ---
-def has_word(txt: str, pattern: str) -> bool:
-    try:
-        return re.search(rf"(?iu)\b{pattern}\w*\b", txt) is not None
-    except re.error:
-        patt = re.escape(pattern)
-        return re.search(rf"(?iu)\b{patt}\w*\b", txt) is not None
+# признаки маггла в тексте страницы (даже если упомянут «Хогвартс»)
+MUGGLE_PHRASES = [
+    "не маг", "немаг", "маггл", "мугл", "muggle", "non-mag",
+    "не волшебник", "обычный человек", "простой человек",
+    "не имеет магических способностей", "не обучался в хогвартсе",
+    "не владеет магией"
+]
+WIZARD_HINTS = ["палочка", "заклин", "волшебник", "маги", "чары"]
+HOGWARTS_STUDY = ["учился", "посещал", "выпускник"]
+PURITY_STEMS = ["сквиб", "маглорожд", "полукров", "магл", "чистокровный", "грязнокров", "кровь"]
+
+# всё, что каскад ищет в тексте страницы: регулярки компилируются один раз
+TEXT_MATCHER = TextMatcher(
+    substrings=MUGGLE_PHRASES + WIZARD_HINTS + HOGWARTS_STUDY + ["сквиб", "хогвартс", "обучался"],
+    word_stems=CREATURE_KEYWORDS,
+)
+PURITY_MATCHER = TextMatcher(word_stems=PURITY_STEMS)
+
+@functools.lru_cache(maxsize=4096)
+def category_class(category: str) -> Optional[URIRef]:
+    """Тип по одной категории (точное совпадение или эвристика); None — категория ничего не говорит."""
+    if category in CATEGORY_TO_CLASS:
+        return CATEGORY_TO_CLASS[category]
+    c = category.lower()
+    if "сквиб" in c:
+        return classes["Squib"]
+    if "маггл" in c or "мугл" in c:
+        return classes["Muggle"]
+    # «хогвартс», «маг», «ученик»… — не доказательство: у магглов тоже встречаются
+    return None
 
 def choose_most_specific(types: list[URIRef]) -> URIRef:
     priority = [
@@ -475,23 +768,27 @@ def type_from_sources(info: dict, cats: set[str], page_text: str) -> URIRef:
       5. Контекст (осторожно: «Хогвартс» у магглов — не делает их волшебниками)
     """
 
+    # текст страницы приводится к нижнему регистру один раз; проверки запоминаются
+    text = TEXT_MATCHER.signals(page_text)
+
     # --- вспомогательная функция для поля "Чистота крови" ---
     def classify_by_purity() -> Optional[URIRef]:
         purity = (info.get("Чистота крови", {}) or {}).get("text", "")
         purity = purity.lower().strip()
         if not purity:
             return None
+        words = PURITY_MATCHER.signals(purity)
         # Сначала — сквибы (важнее магглов)
-        if has_word(purity, "сквиб"):
+        if words.has_word("сквиб"):
             return classes["Squib"]
         # Маглорождённые, полукровки → Wizard
-        if has_word(purity, "маглорожд") or has_word(purity, "полукров"):
+        if words.has_word("маглорожд") or words.has_word("полукров"):
             return classes["Wizard"]
         # Прямые указания на магглов
-        if has_word(purity, "магл") and not has_word(purity, "маглорожд"):
+        if words.has_word("магл") and not words.has_word("маглорожд"):
             return classes["Muggle"]
         # Грязнокровный/чистокровный → Wizard
-        if any(has_word(purity, s) for s in ["чистокровный", "грязнокров", "кровь"]):
+        if any(words.has_word(s) for s in ["чистокровный", "грязнокров", "кровь"]):
             return classes["Wizard"]
         return None
 
@@ -531,7 +828,7 @@ def type_from_sources(info: dict, cats: set[str], page_text: str) -> URIRef:
                 if any(h in house for h in ["гриффиндор", "слизерин", "когтевран", "пуффендуй"]):
                     return classes["Wizard"]
             # Упоминание обучения → Wizard
-            if "обучался" in page_text.lower() or "хогвартс" in page_text.lower() and "учился" in page_text.lower():
+            if text.has("обучался") or text.has("хогвартс") and text.has("учился"):
                 return classes["Wizard"]
             return classes["Human"]
 
@@ -542,275 +839,92 @@ def type_from_sources(info: dict, cats: set[str], page_text: str) -> URIRef:
 
     # --- 4) Категории (приоритет: конкретные типы > общие) ---
     for c in cats:
-        # Точные совпадения — высший приоритет
-        if c in CATEGORY_TO_CLASS:
-            return CATEGORY_TO_CLASS[c]
-        # Эвристики
-        if "сквиб" in c.lower():
-            return classes["Squib"]
-        if "маггл" in c.lower() or "мугл" in c.lower():
-            return classes["Muggle"]
-        if any(x in c.lower() for x in ["хогвартс", "маг", "волшебник", "ученик", "профессор"]):
-            # Но: если есть категория "Магглы" — она должна была сработать выше
-            # Поэтому верим категории только если нет прямых указаний на магглов
-            pass  # отложим до явного контекста
+        # точные совпадения и эвристики по одной категории — кешируются
+        cls = category_class(c)
+        if cls is not None:
+            return cls
 
     # --- 5) Контекст страницы — осторожно! ---
-    txt = page_text.lower()
-
     # 🔍 Сначала исключим магглов по явным фразам (даже если есть "Хогвартс")
-    muggle_phrases = [
-        "не маг", "немаг", "маггл", "мугл", "muggle", "non-mag",
-        "не волшебник", "обычный человек", "простой человек",
-        "не имеет магических способностей", "не обучался в хогвартсе",
-        "не владеет магией"
-    ]
-    for phrase in muggle_phrases:
-        if phrase in txt:
-            # Уточним: если есть "сквиб" — оставим Squib
-            if "сквиб" in txt:
-                return classes["Squib"]
-            return classes["Muggle"]
+    if text.any(MUGGLE_PHRASES):
+        # Уточним: если есть "сквиб" — оставим Squib
+        if text.has("сквиб"):
+            return classes["Squib"]
+        return classes["Muggle"]
 
     # Только теперь — магические указания
-    if ("хогвартс" in txt and ("учился" in txt or "посещал" in txt or "выпускник" in txt)) \
-       or "палочка" in txt \
-       or "заклин" in txt \
-       or "волшебник" in txt \
-       or "маги" in txt \
-       or "чары" in txt:
+    if (text.has("хогвартс") and text.any(HOGWARTS_STUDY)) or text.any(WIZARD_HINTS):
         return classes["Wizard"]
 
     # Существа по тексту
     for key, cls in CREATURE_KEYWORDS.items():
-        if has_word(txt, key):
+        if text.has_word(key):
             return cls
 
     # --- 6) Дефолт ---
     return classes["Human"]
 
-def extract_family_relations_from_text(soup: BeautifulSoup, subject_title: str) -> list[tuple[str, str]]:
-    """
-    Ищет в тексте статьи упоминания вида:
-      «брат <имя>», «сестра <имя>», «сын <имя>», «муж <имя>», «жена <имя>» и т.д.
-    Возвращает список пар: (relation_type, person_title)
-    """
-    relations = []
-
-    # Получаем весь текст статьи, но лучше — только основное тело (кроме навигации, комментариев)
-    content = soup.select_one(".mw-parser-output")
-    if not content:
-        return relations
-
-    # Извлекаем текст, сохраняя структуру параграфов и заголовков
-    text_blocks = []
-    for elem in content.children:
-        if elem.name in {"p", "ul", "ol", "h2", "h3"}:
-            text_blocks.append(elem.get_text(separator=" ", strip=True))
-
-    full_text = " ".join(text_blocks)
-
-    # Эвристики: ищем фразы вида "X — брат Y", "Y имеет брата X", "его брат — X"
-    # Для простоты — ищем шаблоны: « брат [имя]», « сестра [имя]» и т.д., с учётом падежей и пунктуации
-
-    # Паттерны: (ключ_свойства, регулярное_выражение, группа_имени)
-    patterns = [
-        ("hasBrother", r"(?:брат(?:а|у|ом)?|брат\s+его|его\s+брат)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-        ("hasSister", r"(?:сестр(?:а|ы|у|ой)?|сестра\s+его|его\s+сестра)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-        ("hasSon", r"(?:сын(?:а|у|ом)?|его\s+сын)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-        ("hasDaughter", r"(?:дочь|дочер(?:и|ью)?|его\s+дочь)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-        ("hasFather", r"(?:отец|его\s+отец)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-        ("hasMother", r"(?:мать|его\s+мать)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-        ("marriedWith", r"(?:супруг(?:а|и)?|муж|жена|женат\s+на|замужем\s+за)\s+—?\s*([А-ЯЁ][а-яё\s\-]+?(?:\s[А-ЯЁ]\.)?)"),
-    ]
-
-    for rel_type, pattern in patterns:
-        for match in re.finditer(pattern, full_text, flags=re.IGNORECASE | re.UNICODE):
-            name_candidate = match.group(1).strip()
-            # Очистка от лишних слов: «и», «также», «позже», знаков препинания в конце
-            name_candidate = re.sub(r"[,\.!\?;:]+$", "", name_candidate)
-            name_candidate = re.sub(r"\s+(?:и|или|также|ранее|позже)\s+.*$", "", name_candidate)
-            if name_candidate and not should_skip_title(name_candidate):
-                # Фильтрация: не должно быть местоимений, глаголов и т.д.
-                if len(name_candidate.split()) >= 2 and re.match(r"^[А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+)+$", name_candidate):
-                    relations.append((rel_type, name_candidate))
-
-
-    return relations
-
-
-def parse_family_section(soup: BeautifulSoup) -> list[tuple[str, str]]:
-    """
-    Парсит раздел '== Семья ==' и возвращает список связей: (relation_type, person_title)
-    Пример: 'Орион Блэк (отец)†' → ('hasFather', 'Орион Блэк')
-    """
-    relations = []
-
-    # Находим заголовок "Семья" и следующий элемент (обычно <p>)
-    family_header = None
-    for h2 in soup.select("h2"):
-        if "семья" in h2.get_text(strip=True).lower():
-            family_header = h2
-            break
-
-    if not family_header:
-        return relations
-
-    # Берём следующий (обычно <p>) или идём до следующего h2
-    next_elem = family_header.find_next_sibling()
-    family_text = ""
-    while next_elem and next_elem.name != "h2":
-        if next_elem.name in {"p", "ul", "ol"}:
-            family_text += " " + next_elem.get_text(separator=" ", strip=True)
-        next_elem = next_elem.find_next_sibling()
-
-    if not family_text.strip():
-        return relations
-
-    # Разбиваем по запятым и точкам с запятой
-    items = [item.strip() for item in re.split(r"[,;]", family_text)]
-
-    # Словарь маппинга: русское слово → свойство
-    role_map = {
-        # родственники
-        "отец": "hasFather",
-        "мать": "hasMother",
-        "брат": "hasBrother",
-        "сестра": "hasSister",
-        "сын": "hasSon",
-        "дочь": "hasDaughter",
-        "дядя": "hasUncle",
-        "тётя": "hasAunt",
-        "племянник": "hasNephew",
-        "племянница": "hasNiece",
-        "дедушка": "hasGrandparent",
-        "бабушка": "hasGrandparent",
-        "внук": "hasGrandchild",
-        "внучка": "hasGrandchild",
-        # расширенные
-        "кузина": "cousinOf",
-        "кузен": "cousinOf",
-        "двоюродная племянница": "nieceOf",
-        "двоюродный племянник": "nephewOf",
-        "троюродный племянник": "nephewOf",
-        "крестник": "godsonOf",  # у Сириуса → Гарри
-        "крёстный отец": "godfatherOf",
-    }
-
-    for item in items:
-        # Убираем †, *, и т.д.
-        item = re.sub(r"[†*«»\"]", "", item).strip()
-        if not item:
-            continue
-
-        # Ищем шаблон: "Имя Фамилия (роль)"
-        match = re.match(r"([А-ЯЁ][а-яё\s\-]+?)\s*\(([^)]+)\)", item)
-        if not match:
-            continue
-
-        name = match.group(1).strip()
-        role_desc = match.group(2).strip().lower()
-
-        for role_name, prop_key in role_map.items():
-            if role_name in role_desc:
-                relations.append((prop_key, name))
-                break  # первый найденный приоритетен
-
-    return relations
-
-
-def parse_family_field_from_infobox(family_text: str) -> list[tuple[str, str]]:
-    """
-    Парсит текст поля 'Семья' из инфобокса.
-    Пример входа: "Марджори Дурсль (сестра), Петуния Дурсль (жена), ..."
-    Возвращает список: [(relation_type, person_title), ...]
-    """
-    logger.debug("🔍 Разбор поля 'Семья': %r", family_text[:200])
-    relations = []
-
-    # Убираем лишние символы (†, *, «», [1], [2] и т.д.)
-    cleaned_text = re.sub(r"[\†*«»\"]|\[\s*\d+\s*\]", "", family_text).strip()
-    if not cleaned_text:
-        return relations
-
-    # Маппинг ролей → свойства (расширенный для синонимов)
-    role_map = {
-        "отец": "hasFather", "свёкор": "hasFather", "тесть": "hasFather",
-        "мать": "hasMother", "свекровь": "hasMother", "тёща": "hasMother",
-        "брат": "hasBrother", "деверь": "hasBrother", "шурин": "hasBrother",
-        "сестра": "hasSister", "золовка": "hasSister",
-        "сын": "hasSon",
-        "дочь": "hasDaughter",
-        "дядя": "hasUncle",
-        "тётя": "hasAunt",
-        "племянник": "hasNephew", "внучатый племянник": "hasNephew",
-        "племянница": "hasNiece",
-        "дед": "hasGrandparent", "дедушка": "hasGrandparent",
-        "бабушка": "hasGrandparent",
-        "внук": "hasGrandchild",
-        "внучка": "hasGrandchild",
-        "жена": "marriedWith", "супруга": "marriedWith",
-        "муж": "marriedWith", "супруг": "marriedWith",
-        "кузина": "cousinOf", "двоюродная сестра": "cousinOf",
-        "кузен": "cousinOf", "двоюродный брат": "cousinOf",
-        "крестник": "godsonOf",
-        "крёстный отец": "godfatherOf",
-        "зять": "sonOf",
-        "невестка": "daughterOf",
-        "предок": "relativeOf",
-        "потомок": "relativeOf",
-    }
-
-    # Регулярка ищет имя как последовательность символов, не содержащую скобок, перед ролью в скобках.
-    pattern = re.compile(r"([А-ЯЁ][^()]+?)\s*\(([^)]+)\)")
-
-    for match in pattern.finditer(cleaned_text):
-        name = match.group(1).strip()
-        role_desc = match.group(2).strip().lower()
-
-        if len(name) < 2 or should_skip_title(name):
-            continue
-
-        found_role = False
-        # Сортируем роли по длине, чтобы "внучатый племянник" проверялся раньше "племянник"
-        sorted_roles = sorted(role_map.keys(), key=len, reverse=True)
-        for role_name in sorted_roles:
-            # Используем \b для поиска целых слов, чтобы "дед" не находился в "дедушка"
-            if re.search(rf"\b{re.escape(role_name)}\b", role_desc):
-                prop_key = role_map[role_name]
-                relations.append((prop_key, name))
-                found_role = True
-                break
-
-        if not found_role:
-            # Если точного совпадения нет, проверяем частичное для основных ролей
-            for role_name, prop_key in role_map.items():
-                if role_name in role_desc:
-                    relations.append((prop_key, name))
-                    break
-
-    return relations
-
 # -----------------------------
 # 4) Скраперы
 # -----------------------------
 
-def scrape_character(title_ru: str):
-    if should_skip_title(title_ru):
+def scrape_character(title_ru: str, source: str = "titles"):
+    if should_skip_title(title_ru) or not seen_pages.claim(title_ru, source):
         return
-    url = fandom_url(title_ru)
-    soup = http_get(url)
-    if not soup:
+    _scrape_character(title_ru)
+    metrics.count("pages")
+    crawl_state.mark_visited(title_ru)
+
+def _scrape_character(title_ru: str):
+    record = page_record(title_ru, consume=True)
+    page = record.page
+    if not page:
         logger.warning("Пропуск (нет доступа): %s", title_ru)
         return
 
-    if not soup.select_one(".portable-infobox"):
+    if not page.has_infobox:
         logger.debug("Пропуск (нет инфобокса): %s", title_ru)
         return
 
-    info = parse_infobox(soup)
-    cats = parse_categories(soup)  # реальные категории
-    rdf_type = type_from_sources(info, cats, soup.get_text(separator=" ", strip=True))
+    rdf_type = record.rdf_type
+    crawl_state.put_revision(title_ru, page.title, page.revid)
+    with provenance(title_ru, "infobox", page.revid):
+        subj = _scrape_infobox(title_ru, page, rdf_type)
+
+    # === 2. Связи из раздела "Семья" ===
+    with provenance(title_ru, "family_section", page.revid):
+        for prop_key, person_title in page.family_section:
+            if prop_key in obj_props:
+                prop_uri = obj_props[prop_key]
+                detected_type = determine_type_for_title(person_title)
+                use_type = detected_type or classes["Character"]
+                obj = ensure_entity(person_title, use_type)
+                g.add((subj, prop_uri, obj))
+                if prop_key in FAMILY_INVERSE:
+                    g.add((obj, obj_props[FAMILY_INVERSE[prop_key]], subj))
+                logger.info("Семья: %s --%s--> %s", title_ru, prop_key, person_title)
+                bump_counter()
+
+    # === 3. Связи из всего текста (резерв) ===
+    with provenance(title_ru, "family_text", page.revid):
+        for rel_type, person_title in page.family_text:
+            if rel_type in obj_props:
+                prop_uri = obj_props[rel_type]
+                detected_type = determine_type_for_title(person_title)
+                use_type = detected_type or classes["Character"]
+                slug = slugify(person_title)
+                obj = hp_entity(slug)
+                if slug not in entities:
+                    add_labeled_instance(obj, person_title, use_type)
+                else:
+                    claim_entity(slug)
+                g.add((subj, prop_uri, obj))
+                logger.info("🔗 Текст: %s --%s--> %s", title_ru, rel_type, person_title)
+                bump_counter()
+
+def _scrape_infobox(title_ru: str, page: PageExtract, rdf_type: URIRef) -> URIRef:
+    """Субъект статьи, его метаданные и связи из инфобокса (поле «Семья» — отдельный источник)."""
+    info = page.infobox
     subj = ensure_entity(title_ru, rdf_type)
 
     # метаданные
@@ -855,6 +969,15 @@ def scrape_character(title_ru: str):
             bump_counter()
 
     logger.debug("Инфобокс для %s: %s", title_ru, list(info.keys()))
+
+    # все упомянутые люди — в очередь загрузки, до начала последовательной обработки
+    related = [t for _, t in page.family_infobox + page.family_section + page.family_text]
+    for key, val in info.items():
+        prop_key = FIELD_MAP.get(key, (None, None))[0]
+        if prop_key in PERSON_RELATIONS:
+            related += val["links"] or [val["text"]]
+    prefetch_types(related)
+
     # === 1. Связи из инфобокса (основной цикл) ===
     for key, val in info.items():
         if key not in FIELD_MAP:
@@ -863,24 +986,22 @@ def scrape_character(title_ru: str):
 
         if prop_key == "family_from_infobox":
             if val["text"]:
-                family_rels = parse_family_field_from_infobox(val["text"])
-                for rel_type, person_title in family_rels:
-                    if rel_type in obj_props:
-                        prop_uri = obj_props[rel_type]
-                        detected_type = determine_type_for_title(person_title)
-                        use_type = detected_type or classes["Character"]
-                        obj = ensure_entity(person_title, use_type)
-                        g.add((subj, prop_uri, obj))
-                        logger.info("👨‍👩‍👧‍👦 Инфобокс-Семья: %s --%s--> %s", title_ru, rel_type, person_title)
-                        bump_counter()
+                with provenance(title_ru, "family_infobox", page.revid):
+                    for rel_type, person_title in page.family_infobox:
+                        if rel_type in obj_props:
+                            prop_uri = obj_props[rel_type]
+                            detected_type = determine_type_for_title(person_title)
+                            use_type = detected_type or classes["Character"]
+                            obj = ensure_entity(person_title, use_type)
+                            g.add((subj, prop_uri, obj))
+                            logger.info("👨‍👩‍👧‍👦 Инфобокс-Семья: %s --%s--> %s", title_ru, rel_type, person_title)
+                            bump_counter()
             continue
 
         if prop_key in ("type_hint", "sex_hint", "blood_status_hint") or prop_key not in obj_props:
             continue
         prop_uri = obj_props[prop_key]
 
-        PERSON_RELATIONS = {"marriedWith", "hasFather", "hasMother", "friendWith",
-                            "romanceWith", "relativeOf", "hasParent"}
         if prop_key in PERSON_RELATIONS:
             if prop_key == "hasParent" and val["links"]:
                 for link_title in val["links"]:
@@ -915,106 +1036,266 @@ def scrape_character(title_ru: str):
             obj = ensure_entity(v, fallback_cls)
             g.add((subj, prop_uri, obj))
 
-    # === 2. Связи из раздела "Семья" ===
-    family_section_rels = parse_family_section(soup)
-    for prop_key, person_title in family_section_rels:
-        if prop_key in obj_props:
-            prop_uri = obj_props[prop_key]
-            detected_type = determine_type_for_title(person_title)
-            use_type = detected_type or classes["Character"]
-            obj = ensure_entity(person_title, use_type)
-            g.add((subj, prop_uri, obj))
-            if prop_key == "hasFather":
-                g.add((obj, obj_props["childOf"], subj))
-            elif prop_key == "hasMother":
-                g.add((obj, obj_props["childOf"], subj))
-            elif prop_key == "hasBrother":
-                g.add((obj, obj_props["brotherOf"], subj))
-            elif prop_key == "hasSister":
-                g.add((obj, obj_props["sisterOf"], subj))
-            elif prop_key == "cousinOf":
-                g.add((obj, obj_props["cousinOf"], subj))
-            elif prop_key == "godsonOf":
-                g.add((obj, obj_props["godfatherOf"], subj))
-            elif prop_key == "godfatherOf":
-                g.add((obj, obj_props["godsonOf"], subj))
-            logger.info("Семья: %s --%s--> %s", title_ru, prop_key, person_title)
-            bump_counter()
-
-    # === 3. Связи из всего текста (резерв) ===
-    family_rels = extract_family_relations_from_text(soup, title_ru)
-    for rel_type, person_title in family_rels:
-        if rel_type in obj_props:
-            prop_uri = obj_props[rel_type]
-            detected_type = determine_type_for_title(person_title)
-            use_type = detected_type or classes["Character"]
-            obj = hp_entity(slugify(person_title))
-            if (obj, RDF.type, None) not in g:
-                add_labeled_instance(obj, person_title, use_type)
-            g.add((subj, prop_uri, obj))
-            logger.info("🔗 Текст: %s --%s--> %s", title_ru, rel_type, person_title)
-            bump_counter()
+    return subj
 
 
 def scrape_single_page_as(label_ru: str, rdf_type: URIRef):
     if should_skip_title(label_ru):
         return
-    ensure_entity(label_ru, rdf_type)
+    with provenance(label_ru, "seed"):
+        ensure_entity(label_ru, rdf_type)
 
 # Пагинация + фильтры
-def iter_category_members(category_title_ru: str, cap: int | None = None):
-    url = fandom_url("Категория:" + category_title_ru)
-    seen, count = set(), 0
-    while url:
-        soup = http_get(url)
-        ##time.sleep(REQUEST_DELAY)
-        if not soup:
-            break
-        for a in soup.select("a.category-page__member-link"):
-            href = a.get("href") or ""
-            title = a.get("title") or a.get_text(strip=True)
-            if not title or title in seen:
-                continue
-            if "/Категория:" in href or should_skip_title(title):
-                continue
-            seen.add(title)
-            yield title
-            count += 1
-            if cap and count >= cap:
+category_listers: dict[str, CategoryLister] = {}
+
+def start_category_listing(categories: Iterable[tuple[str, int | None]]):
+    """
+    Запускает перечисление сразу всех категорий (категория, cap): пагинация
+    качается параллельно и впереди скрапинга, в очередях по CATEGORY_PAGES_AHEAD страниц.
+    """
+    for category_title_ru, cap in categories:
+        url, done = crawl_state.cursor(category_title_ru, category_url(category_title_ru))
+        if not done and url:
+            _category_lister(category_title_ru, url, cap)
+
+def _category_lister(category_title_ru: str, url: str, cap: int | None) -> CategoryLister:
+    lister = category_listers.get(category_title_ru)
+    if lister is None or (lister.finished and lister.truncated):
+        # cap набран не был (повторы на страницах) — дочитываем с курсора уже без лимита
+        limit = cap if lister is None else None
+        lister = category_listers[category_title_ru] = CategoryLister(
+            category_title_ru, url, get_page, base=BASE,
+            pages_ahead=CATEGORY_PAGES_AHEAD, limit=limit,
+        ).start()
+    return lister
+
+def stop_category_listing():
+    for lister in category_listers.values():
+        lister.close()
+    category_listers.clear()
+
+def iter_category_members(category_title_ru: str, cap: int | None = None, prefetch: bool = False,
+                          seen: SeenTitles | None = None):
+    """
+    Заголовки категории по порядку. Очередь и курсор пагинации живут в crawl_state:
+    заголовок считается обработанным, когда потребитель запросил следующий,
+    так что после падения обход продолжается с первого необработанного.
+    Страницы списка отдаёт CategoryLister, который качает пагинацию впереди.
+    prefetch=True — держать впереди окно из prefetch_ahead() запрошенных статей.
+    seen — страницы, уже взятые в работу в прогоне (seen_pages): такой заголовок
+    не выдаётся и не запрашивается повторно (но занимает место в cap).
+    """
+    url, done = crawl_state.cursor(category_title_ru, category_url(category_title_ru))
+    count = crawl_state.processed(category_title_ru)
+    pending = deque(crawl_state.pending(category_title_ru))
+    prefetched: set[str] = set()
+    while not done and not (cap and count >= cap):
+        if not pending:
+            if not url:
+                break
+            lister = _category_lister(category_title_ru, url, cap)
+            listed = lister.next_page()
+            if listed is None:
+                if lister.truncated:
+                    continue  # _category_lister дочитает с курсора новым листером, уже без лимита
+                # страница списка не загрузилась: курсор остаётся открытым — продолжение дойдёт до неё
+                logger.warning("Категория %s: страница списка недоступна, продолжим в следующий раз", category_title_ru)
+                _drop_lister(category_title_ru)
                 return
-        next_a = soup.select_one('a.category-page__pagination-next')
-        url = next_a["href"] if (next_a and next_a.get("href")) else None
-        if url and url.startswith("/"):
-            url = urllib.parse.urljoin(BASE, url)
+            members, url = listed
+            pending.extend(crawl_state.push(category_title_ru, members))
+            crawl_state.advance(category_title_ru, url)
+            continue
+        if prefetch:
+            ahead = prefetch_ahead() if not cap else min(prefetch_ahead(), cap - count)
+            window = [t for t in list(pending)[:ahead]
+                      if t not in prefetched and t not in seen_pages]
+            prefetched.update(window)
+            prefetch_articles(window)
+        title = pending.popleft()
+        if seen is None or not seen.is_duplicate(title, category_title_ru):
+            yield title
+        crawl_state.done(category_title_ru, title)
+        count += 1
+    crawl_state.close_cursor(category_title_ru)
+    _drop_lister(category_title_ru)
 
-def scrape_category_characters(category_title_ru: str, cap: int, delay: float = 0.2):
+def _drop_lister(category_title_ru: str):
+    lister = category_listers.pop(category_title_ru, None)
+    if lister is not None:
+        lister.close()
+
+def scrape_titles(titles: Iterable[str], scrape=scrape_character):
+    """
+    Скрапит персонажей по порядку, держа впереди окно из prefetch_ahead()
+    уже запрошенных страниц — сеть работает, пока идёт разбор.
+    """
+    window: list[str] = []
+    for title in titles:
+        window.append(title)
+        if len(window) >= prefetch_ahead():
+            _scrape_window(window, scrape)
+            window = []
+    _scrape_window(window, scrape)
+
+def _scrape_window(titles: list[str], scrape=scrape_character):
+    prefetch_articles(t for t in titles
+                      if not should_skip_title(t) and t not in seen_pages)
+    for title in titles:
+        scrape(title)
+
+def scrape_category_characters(category_title_ru: str, cap: int):
     logger.info("Категория персонажей: %s (cap=%s)", category_title_ru, cap)
-    for title in iter_category_members(category_title_ru, cap=cap):
-        scrape_character(title)
-        ##time.sleep(delay)
+    for title in iter_category_members(category_title_ru, cap=cap, prefetch=True, seen=seen_pages):
+        scrape_character(title, source=category_title_ru)
 
-def scrape_category_entities(category_title_ru: str, rdf_type: URIRef, cap: int, delay: float = 0.1):
+def scrape_category_entities(category_title_ru: str, rdf_type: URIRef, cap: int):
     logger.info("Категория сущностей: %s → %s (cap=%s)", category_title_ru, qn(rdf_type), cap)
-    for title in iter_category_members(category_title_ru, cap=cap):
-        ensure_entity(title, rdf_type)
-        ##time.sleep(delay)
+    with provenance("Категория:" + category_title_ru, "category"):
+        for title in iter_category_members(category_title_ru, cap=cap):
+            ensure_entity(title, rdf_type)
 
 def scrape_category_list(category_title_ru: str, want_type: URIRef, cap: int):
-    url = fandom_url("Категория:" + category_title_ru)
-    soup = http_get(url)
-    ##time.sleep(REQUEST_DELAY)
-    if not soup:
+    key = "Категория:" + category_title_ru
+    if crawl_state.is_visited(key):
         return
-    items = []
-    for a in soup.select("a.category-page__member-link"):
-        href = a.get("href") or ""
-        title = a.get("title") or a.get_text(strip=True)
-        if not title or should_skip_title(title) or "/Категория:" in href:
-            continue
-        items.append(title)
-    for title in items[:cap]:
-        ensure_entity(title, want_type)
-        ##time.sleep(RELATION_DELAY)
+    page = get_page(category_url(category_title_ru))
+    if not page:
+        return
+    items = page.members
+    with provenance(key, "category"):
+        for title in items[:cap]:
+            ensure_entity(title, want_type)
+    crawl_state.mark_visited(key)
+
+# -----------------------------
+# Обновление: только статьи, изменившиеся после прошлого прогона
+# -----------------------------
+def api_query(url: str) -> dict | None:
+    """Служебный запрос к api.php мимо кеша страниц: ответ нужен на сейчас."""
+    try:
+        r = transport.get(url, timeout=HTTP_TIMEOUT)
+    except TransportError as e:
+        logger.warning("Ошибка запроса %s: %s", url, e)
+        return None
+    if r.status_code != 200:
+        logger.warning("HTTP %s: %s", r.status_code, url)
+        return None
+    try:
+        return json.loads(r.text)
+    except ValueError as e:
+        # обрезанный ответ или HTML-страница ошибки вместо JSON
+        logger.warning("Не JSON в ответе %s: %s", url, e)
+        return None
+
+def recent_revisions(since: float) -> dict[str, int] | None:
+    """{название: последняя ревизия} статей, правленных после since (list=recentchanges)."""
+    latest: dict[str, int] = {}
+    cont = None
+    while True:
+        data = api_query(mw_api.recent_changes_url(api_endpoint(), since, cont))
+        if data is None:
+            return None
+        page, cont = mw_api.parse_recent_changes(data)
+        for title, revid in page.items():
+            latest[title] = max(revid, latest.get(title, 0))
+        if not cont:
+            return latest
+
+def current_revisions(titles: list[str]) -> dict[str, int | None] | None:
+    """{заголовок: последняя ревизия} по prop=info, пачками по mw_api.BATCH_SIZE."""
+    latest: dict[str, int | None] = {}
+    for i in range(0, len(titles), mw_api.BATCH_SIZE):
+        url = mw_api.page_info_url(api_endpoint(), titles[i:i + mw_api.BATCH_SIZE])
+        data = api_query(url)
+        if data is None:
+            return None
+        latest.update(mw_api.parse_page_info(url, data))
+    return latest
+
+def changed_titles() -> list[str] | None:
+    """
+    Скрапленные статьи (ревизии в crawl_state), у которых на вики есть ревизия новее.
+    Если прошлый прогон недавний — одна-две страницы recentchanges (с запасом
+    CACHE_MAX_AGE: страницы могли прийти из кеша), иначе — lastrevid всех статей.
+    Ревизия статьи неизвестна (HTML без конфигурации MediaWiki) — она считается
+    изменившейся, если вики вернула для неё хоть какую-то ревизию. None — api.php не ответил.
+    """
+    tracked = crawl_state.revisions()
+    since = crawl_state.last_crawl()
+    if since is not None and time.time() - since < RECENT_CHANGES_MAX_AGE:
+        latest = recent_revisions(since - CACHE_MAX_AGE)
+        if latest is None:
+            return None
+        # recentchanges знает канонические названия: редирект сверяется по цели
+        current = {title: latest.get(page or title) for title, (page, _) in tracked.items()}
+    else:
+        current = current_revisions(sorted(tracked))
+        if current is None:
+            return None
+    return sorted(title for title, (_, revid) in tracked.items()
+                  if current.get(title) is not None and (revid is None or current[title] > revid))
+
+def retract_sources(sources: list[int]) -> int:
+    """
+    Убирает вклад источников: из графа уходят их триплеты, которые не утверждает
+    никто другой; сущности, потерявшие тип или метку, перечитываются в реестре.
+    """
+    stale = [tuple(map(triple_store.decode, t)) for t in crawl_state.retract(sources)]
+    touched = set()
+    for t in stale:
+        g.remove(t)
+        if t[1] in (RDF.type, RDFS.label):
+            touched.add(t[0])
+    for uri in touched:
+        entities.refresh(g, uri)
+    return len(stale)
+
+def retract_page(title_ru: str) -> int:
+    """Убирает из графа то, что утверждала статья (все её источники); возвращает число триплетов."""
+    sources = crawl_state.sources_of(page=title_ru)
+    if not sources:
+        return _retract_untracked(title_ru)
+    return retract_sources(sources)
+
+def retract_extractor(extractor: str) -> int:
+    """Убирает из графа всё, что дал экстрактор (например, "family_text" — связи из текста)."""
+    return retract_sources(crawl_state.sources_of(extractor=extractor))
+
+def _retract_untracked(title_ru: str) -> int:
+    """
+    Статья скраплена без записи происхождения (PROVENANCE выключен или граф старше):
+    убираются связи и данные субъекта (инфобокс, семья, «Пол» в rdfs:comment) и обратные
+    связи раздела «Семья» у родственников. Тип и метка субъекта и сущности по ссылкам
+    остаются; взаимные связи (cousinOf, godsonOf/godfatherOf) — тоже, если их утверждает
+    и другая сторона: без происхождения не различить, чья это запись.
+    """
+    subj = hp_entity(slugify(title_ru))
+    claimed = {(subj, obj_props[FAMILY_INVERSE[p]], other)
+               for p in FAMILY_INVERSE for other in g.subjects(obj_props[p], subj)}
+    keep = {RDF.type, RDFS.label} | {obj_props[p] for p in INVERSE_ONLY}
+    stale = [t for t in g.triples((subj, None, None)) if t[1] not in keep and t not in claimed]
+    for p in sorted(INVERSE_ONLY):
+        stale.extend(g.triples((None, obj_props[p], subj)))
+    for t in stale:
+        g.remove(t)
+    return len(stale)
+
+def refresh_character(title_ru: str):
+    """Статья изменилась: старые утверждения страницы заменяются извлечёнными заново."""
+    if should_skip_title(title_ru) or not seen_pages.claim(title_ru, "update"):
+        return
+    record = page_record(title_ru)
+    if record.page is None or not record.page.has_infobox:
+        # удалена, стала редиректом или не загрузилась — прежние триплеты лучше, чем никаких
+        logger.warning("Не обновлена (нет страницы или инфобокса): %s", title_ru)
+    else:
+        n = retract_page(title_ru)
+        _scrape_character(title_ru)
+        remember_type(title_ru, record.rdf_type)
+        metrics.count("pages_refreshed")
+        logger.info("Обновлена: %s (убрано триплетов: %s)", title_ru, n)
+    crawl_state.mark_visited(title_ru)
 
 # -----------------------------
 # Семена и списки категорий
@@ -1051,35 +1332,70 @@ ENTITY_CATS = [
 # main
 # -----------------------------
 def main():
+    start_crawl()
+
     # базовые узлы
     for h in HOUSES: scrape_single_page_as(h, classes["House"])
     for o in ORGS:   scrape_single_page_as(o, classes["Organization"])
     for l in LOCATIONS: scrape_single_page_as(l, classes["Location"])
 
-    # семена персонажей
-    for name in CHAR_SEED:
-        scrape_character(name)
-        # time.sleep(0.4)
-    for name in MUGGLE_SEED:
-        scrape_character(name)
-    for name in SQUIB_SEED:
-        scrape_character(name)
+    person_caps = [(cat, 500 if cat in ("Люди", "Персонажи") else 200) for cat in PERSON_CATS]
+    entity_caps = [(cat, 300) for cat, _ in ENTITY_CATS]
+    try:
+        # все категории перечисляются параллельно, пока идёт скрапинг
+        start_category_listing(person_caps + entity_caps)
+
+        # семена персонажей
+        scrape_titles(CHAR_SEED + MUGGLE_SEED + SQUIB_SEED)
 
-    for cat in PERSON_CATS:
-        cap = 500 if cat in ("Люди", "Персонажи") else 200
-        scrape_category_characters(cat, cap=cap, delay=0.15)
+        for cat, cap in person_caps:
+            scrape_category_characters(cat, cap=cap)
 
-    # прочие сущности
-    for cat, tp in ENTITY_CATS:
-        scrape_category_entities(cat, tp, cap=300, delay=0.1)
+        # прочие сущности
+        for cat, tp in ENTITY_CATS:
+            scrape_category_entities(cat, tp, cap=300)
 
-    # заклинания и зелья
-    scrape_category_list("Заклинания", classes["Spell"], cap=200)
-    scrape_category_list("Зелья", classes["Potion"], cap=200)
+        # заклинания и зелья
+        scrape_category_list("Заклинания", classes["Spell"], cap=200)
+        scrape_category_list("Зелья", classes["Potion"], cap=200)
+    finally:
+        stop_category_listing()
+        engine.close()
 
     # финал
-    save_checkpoint(force=True)
+    finish_crawl()
+    logger.info("Готово. Триплетов в графе: %s", len(g))
+
+def update_main():
+    """
+    Обновление готового графа вместо полного обхода: запрашиваются и перескрапиваются
+    только статьи, изменившиеся на вики после прошлого прогона. Основа — граф прошлого
+    прогона (хранилище на диске или SNAPSHOT_FILE); новые статьи добавит полный прогон.
+    """
+    if OFFLINE:
+        logger.error("Обновление без сети невозможно (OFFLINE)")
+        return
+    if not triple_store.is_persistent(g) and not (SNAPSHOT_FILE and os.path.exists(SNAPSHOT_FILE)):
+        logger.error("Нет снимка прошлого прогона %s — сначала полный прогон (main)", SNAPSHOT_FILE)
+        return
+    start_crawl(mode="update")
+    if page_cache:
+        page_cache.max_age = 0  # изменившиеся статьи — только после ревалидации у сервера
+    try:
+        titles = changed_titles()
+        if titles is None:
+            logger.error("api.php недоступен — обновление не выполнено")
+            return
+        logger.info("Изменились после прошлого прогона: %s статей", len(titles))
+        scrape_titles(titles, scrape=refresh_character)
+    finally:
+        engine.close()
+
+    finish_crawl()
     logger.info("Готово. Триплетов в графе: %s", len(g))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if INCREMENTAL:
+        update_main()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Метрики прогона: время стадий конвейера, счётчики и состояние подсистем.
+  stage  — длительности (загрузка, разбор, классификация, вставка в граф,
+           чекпоинт...): count/sum/min/max и квантили по последним RESERVOIR замерам;
+  count  — монотонные счётчики (страницы...) и их темп в секунду от старта;
+  source — функции, возвращающие dict чисел (кеш типов, транспорт, движок):
+           опрашиваются только при снимке.
+snapshot() — всё вместе; to_json()/to_prometheus() — форматы для файлов,
+summary() — таблица стадий для лога в конце прогона.
+Потокобезопасно: стадии загрузки пишутся из потоков FetchEngine.
+Снимок опрашивает источники (в том числе граф), поэтому его делает основной поток.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+RESERVOIR = 1024  # последних замеров на стадию для квантилей
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Stage:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.recent: deque[float] = deque(maxlen=RESERVOIR)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.recent)
+        quantiles = {
+            str(q): ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+            for q in QUANTILES
+        }
+        return {"count": self.count, "sum": self.total, "min": self.min, "max": self.max,
+                "mean": self.total / self.count if self.count else None, "quantiles": quantiles}
+
+
+class Metrics:
+    def __init__(self, prefix: str = "hp_kg"):
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages: dict[str, Stage] = {}
+        self._counters: dict[str, float] = {}
+        self._sources: dict[str, Callable[[], dict]] = {}
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._stages.clear()
+            self._counters.clear()
+
+    # --- запись ---
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = Stage()
+            entry.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def count(self, name: str, n: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def source(self, name: str, fn: Callable[[], dict]):
+        self._sources[name] = fn
+
+    # --- чтение ---
+    def snapshot(self) -> dict:
+        now = time.time()
+        elapsed = max(1e-9, now - self.started)
+        with self._lock:
+            stages = {name: stage.snapshot() for name, stage in self._stages.items()}
+            counters = dict(self._counters)
+        sources = {}
+        for name, fn in self._sources.items():
+            try:
+                sources[name] = fn()
+            except Exception as e:  # снимок не должен ронять прогон
+                sources[name] = {"error": str(e)}
+        return {
+            "timestamp": now, "elapsed": elapsed,
+            "stages": stages, "counters": counters,
+            "rates": {name: value / elapsed for name, value in counters.items()},
+            "sources": sources,
+        }
+
+    # --- форматы ---
+    @staticmethod
+    def to_json(snapshot: dict) -> str:
+        return json.dumps(snapshot, ensure_ascii=False, indent=1, sort_keys=True)
+
+    def to_prometheus(self, snapshot: dict) -> str:
+        p = self.prefix
+        lines = [f"# TYPE {p}_stage_seconds summary"]
+        for name, st in sorted(snapshot["stages"].items()):
+            for q, value in st["quantiles"].items():
+                if value is not None:
+                    lines.append(f'{p}_stage_seconds{{stage="{name}",quantile="{q}"}} {value:.6g}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {st["sum"]:.6g}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {st["count"]}')
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{p}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:.6g}"]
+        gauges: dict[str, list[str]] = {}
+        for source, values in sorted(snapshot["sources"].items()):
+            for (key, labels), value in _flatten(values).items():
+                metric = f"{p}_{_metric_name(source)}_{key}"
+                label_text = ",".join(f'{name}="{_label_value(v)}"' for name, v in labels)
+                gauges.setdefault(metric, []).append(
+                    f"{metric}{{{label_text}}} {value:.6g}" if labels else f"{metric} {value:.6g}")
+        for metric, samples in sorted(gauges.items()):
+            lines += [f"# TYPE {metric} gauge"] + samples
+        lines.append(f"{p}_elapsed_seconds {snapshot['elapsed']:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, snapshot: Optional[dict] = None) -> str:
+        """Таблица стадий по убыванию суммарного времени — что доминирует в прогоне."""
+        snapshot = snapshot or self.snapshot()
+        stages = sorted(snapshot["stages"].items(), key=lambda kv: kv[1]["sum"], reverse=True)
+        rows = [f"{'стадия':<16}{'вызовов':>9}{'всего, с':>11}{'сред, мс':>10}{'p50, мс':>9}{'p90, мс':>9}"]
+        for name, st in stages:
+            q = st["quantiles"]
+            rows.append(f"{name:<16}{st['count']:>9}{st['sum']:>11.2f}{(st['mean'] or 0) * 1000:>10.2f}"
+                        f"{(q['0.5'] or 0) * 1000:>9.2f}{(q['0.9'] or 0) * 1000:>9.2f}")
+        rates = ", ".join(f"{name}: {value:.2f}/с" for name, value in sorted(snapshot["rates"].items()))
+        rows.append(f"за {snapshot['elapsed']:.1f} с — {rates}")
+        return "\n".join(rows)
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name).strip("_").lower() or "value"
+
+
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _flatten(values: dict, prefix: str = "", labels: tuple = ()) -> dict[tuple, float]:
+    """
+    Числовые значения вложенного dict: (имя через «_», метки) → число.
+    Ключи-данные (категории, хосты — не идентификаторы) становятся меткой key=...
+    Нечисловые значения пропускаются.
+    """
+    flat = {}
+    for key, value in values.items():
+        key = str(key)
+        if _IDENT.fullmatch(key):
+            name, key_labels = f"{prefix}{key.lower()}", labels
+        else:
+            name, key_labels = prefix.rstrip("_"), labels + (("key", key),)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}_" if name else "", key_labels))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[(name or "value", key_labels)] = value
+    return flat
+
+
+def write_atomic(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class Reporter:
+    """
+    Периодические снимки в файлы (JSON и/или текст Prometheus — для node_exporter
+    textfile collector). maybe_write() дёшев: пишет, только если прошло interval сек.
+    """
+
+    def __init__(self, metrics: Metrics, json_path: Optional[str] = None,
+                 prom_path: Optional[str] = None, interval: float = 30.0):
+        self.metrics = metrics
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self._last = time.monotonic()
+
+    def write(self) -> dict:
+        snapshot = self.metrics.snapshot()
+        if self.json_path:
+            write_atomic(self.json_path, self.metrics.to_json(snapshot))
+        if self.prom_path:
+            write_atomic(self.prom_path, self.metrics.to_prometheus(snapshot))
+        self._last = time.monotonic()
+        return snapshot
+
+    def maybe_write(self):
+        if (self.json_path or self.prom_path) and time.monotonic() - self._last >= self.interval:
+            self.write()
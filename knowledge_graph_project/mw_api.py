@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Альтернативный источник данных: MediaWiki api.php вместо отрендеренного HTML.
+  - участники категории — list=categorymembers по 500 за запрос (+ continue);
+  - статьи — prop=revisions|categories пачками до 50 заголовков за запрос;
+  - поля инфобокса разбираются из параметров шаблона в викитексте;
+  - что изменилось с прошлого прогона — list=recentchanges или prop=info (lastrevid).
+Ответы превращаются в те же PageExtract, что и HTML-страницы (extract.py),
+поэтому скраперы не знают, откуда пришли данные.
+"""
+from __future__ import annotations
+
+import json
+import re
+import time
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from extract import (
+    PageExtract, extract_page, should_skip_title,
+    parse_family_items, parse_family_field_from_infobox, family_relations_in_text,
+)
+
+CATEGORY_LIMIT = 500  # cmlimit (максимум для анонимных запросов)
+BATCH_SIZE = 50       # заголовков в одном prop=revisions
+CHANGES_LIMIT = 500   # rclimit
+READY_LIMIT = 2048    # статей из полученных пачек, ещё не забранных get() (LRU)
+QUEUED_BATCHES = 128  # пачек, поставленных заранее и ещё не забранных (старые забываются)
+
+# параметры шаблона → подписи полей, как в отрендеренном инфобоксе (ключи FIELD_MAP);
+# остальные параметры: «чистота_крови» → «Чистота крови»
+INFOBOX_PARAM_LABELS = {
+    "species": "Вид", "вид": "Вид", "раса": "Раса",
+    "gender": "Пол", "пол": "Пол",
+    "blood": "Чистота крови", "кровь": "Чистота крови",
+    "family": "Семья", "семья": "Семья",
+    "house": "Факультет", "факультет": "Факультет",
+    "job": "Работа", "работа": "Работа",
+    "wand": "Палочка", "палочка": "Палочка",
+    "patronus": "Патронус", "патронус": "Патронус",
+    "loyalty": "Принадлежность", "принадлежность": "Принадлежность",
+    "spouse": "Супруг(а)", "супруг": "Супруг(а)", "супруга": "Супруг(а)",
+}
+INFOBOX_TEMPLATE_RE = re.compile(r"(?i)(инфобокс|infobox|персонаж|character)")
+SKIP_LINK_PREFIXES = ("категория:", "category:", "файл:", "file:", "изображение:", "image:")
+
+
+# -----------------------------
+# URL запросов
+# -----------------------------
+def _api(api_url: str, **params) -> str:
+    params.update(format="json", formatversion="2")
+    return api_url + "?" + urllib.parse.urlencode(params)
+
+def category_members_url(api_url: str, category: str, cont: dict | None = None) -> str:
+    return _api(api_url, action="query", list="categorymembers", cmtitle="Категория:" + category,
+                cmnamespace="0", cmtype="page", cmlimit=str(CATEGORY_LIMIT), **(cont or {}))
+
+def pages_url(api_url: str, titles: list[str]) -> str:
+    return _api(api_url, action="query", prop="revisions|categories", rvprop="ids|content",
+                rvslots="main", clshow="!hidden", cllimit="max", redirects="1",
+                titles="|".join(titles))
+
+def recent_changes_url(api_url: str, since: float, cont: dict | None = None) -> str:
+    """Правки статей от сейчас назад до since (unix time)."""
+    return _api(api_url, action="query", list="recentchanges", rcnamespace="0", rctype="edit|new",
+                rcprop="title|ids", rcend=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(since)),
+                rclimit=str(CHANGES_LIMIT), **(cont or {}))
+
+def page_info_url(api_url: str, titles: list[str]) -> str:
+    return _api(api_url, action="query", prop="info", redirects="1", titles="|".join(titles))
+
+def is_api_url(url: str) -> bool:
+    return urllib.parse.urlsplit(url).path.endswith("api.php")
+
+
+# -----------------------------
+# Викитекст
+# -----------------------------
+def _split_top(s: str, sep: str = "|") -> list[str]:
+    """Делит по sep только на верхнем уровне (не внутри {{…}} и [[…]])."""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(s):
+        two = s[i:i + 2]
+        if two in ("{{", "[["):
+            depth += 1
+            i += 2
+            continue
+        if two in ("}}", "]]") and depth:
+            depth -= 1
+            i += 2
+            continue
+        if s[i] == sep and depth == 0:
+            parts.append(s[start:i])
+            start = i + 1
+        i += 1
+    parts.append(s[start:])
+    return parts
+
+def top_templates(wikitext: str) -> list[tuple[str, dict[str, str], int, int]]:
+    """Шаблоны верхнего уровня: (имя, именованные параметры, начало, конец)."""
+    found, depth, start, i = [], 0, 0, 0
+    while i < len(wikitext):
+        two = wikitext[i:i + 2]
+        if two == "{{":
+            if depth == 0:
+                start = i
+            depth += 1
+            i += 2
+            continue
+        if two == "}}" and depth:
+            depth -= 1
+            i += 2
+            if depth == 0:
+                parts = _split_top(wikitext[start + 2:i - 2])
+                params = {}
+                for part in parts[1:]:
+                    key, eq, value = part.partition("=")
+                    if eq:
+                        params[key.strip()] = value.strip()
+                found.append((parts[0].strip(), params, start, i))
+            continue
+        i += 1
+    return found
+
+def _strip_templates(s: str) -> str:
+    prev = None
+    while prev != s:
+        prev = s
+        s = re.sub(r"\{\{[^{}]*\}\}", "", s)
+    return s
+
+def _link_text(m: re.Match) -> str:
+    target, _, label = m.group(1).partition("|")
+    if target.strip().lower().startswith(SKIP_LINK_PREFIXES):
+        return ""
+    return label or target
+
+def wikitext_to_text(s: str) -> str:
+    s = re.sub(r"<!--.*?-->", "", s, flags=re.S)
+    s = re.sub(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", "", s, flags=re.S | re.I)
+    s = _strip_templates(s)
+    s = re.sub(r"\[\[([^\[\]]*)\]\]", _link_text, s)
+    s = re.sub(r"\[(?:https?:)?//\S+\s+([^\]]*)\]", r"\1", s)
+    s = re.sub(r"<br\s*/?>", " ", s, flags=re.I)
+    s = re.sub(r"<[^>]+>", "", s)
+    s = re.sub(r"'{2,}", "", s)
+    s = re.sub(r"^[*#:;]+\s*", "", s, flags=re.M)
+    s = re.sub(r"^=+\s*(.*?)\s*=+\s*$", r"\1", s, flags=re.M)
+    return s
+
+def normalize_title(t: str) -> str:
+    t = t.split("#", 1)[0].replace("_", " ").strip()
+    return t[:1].upper() + t[1:]
+
+def wiki_links(s: str) -> list[str]:
+    links = []
+    for m in re.finditer(r"\[\[([^\[\]|]*)(?:\|[^\[\]]*)?\]\]", _strip_templates(s)):
+        target = m.group(1).strip()
+        if target and not target.lower().startswith(SKIP_LINK_PREFIXES):
+            links.append(normalize_title(target))
+    return links
+
+def _label(param: str) -> str:
+    key = param.strip().lower()
+    if key in INFOBOX_PARAM_LABELS:
+        return INFOBOX_PARAM_LABELS[key]
+    label = param.strip().replace("_", " ")
+    return label[:1].upper() + label[1:]
+
+def _flat(s: str) -> str:
+    return " ".join(wikitext_to_text(s).split())
+
+_H2 = re.compile(r"^==\s*([^=].*?)\s*==\s*$", re.M)
+
+def _family_section(wikitext: str) -> str:
+    for m in _H2.finditer(wikitext):
+        if "семья" in m.group(1).lower():
+            end = _H2.search(wikitext, m.end())
+            return wikitext[m.end():end.start() if end else len(wikitext)]
+    return ""
+
+def extract_wikitext(wikitext: str, categories: Iterable[str] = ()) -> PageExtract:
+    page = PageExtract()
+    infobox = next((t for t in top_templates(wikitext) if INFOBOX_TEMPLATE_RE.search(t[0])), None)
+    if infobox is None:
+        return page
+    name, params, start, end = infobox
+    page.has_infobox = True
+    for param, value in params.items():
+        text = _flat(value)
+        if text:
+            page.infobox[_label(param)] = {"text": text, "links": wiki_links(value)}
+    page.categories = {c.split(":", 1)[-1].strip() for c in categories}
+    body = wikitext[:start] + wikitext[end:]
+    # в HTML-режиме текст — вся страница; здесь ближайшее: инфобокс, тело статьи, категории
+    page.text = " ".join(
+        [v["text"] for v in page.infobox.values()] + [_flat(body)] + sorted(page.categories)
+    )
+    family = page.infobox.get("Семья")
+    if family and family["text"]:
+        page.family_infobox = parse_family_field_from_infobox(family["text"])
+    page.family_section = parse_family_items(_flat(_family_section(body)))
+    page.family_text = family_relations_in_text(_flat(body))
+    return page
+
+
+# -----------------------------
+# Ответы api.php → PageExtract
+# -----------------------------
+def _query_param(url: str, name: str) -> Optional[str]:
+    values = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get(name)
+    return values[0] if values else None
+
+def parse_category_response(url: str, data: dict) -> PageExtract:
+    page = PageExtract()
+    for m in data.get("query", {}).get("categorymembers", []):
+        title = m.get("title")
+        if title and m.get("ns", 0) == 0 and not should_skip_title(title):
+            page.members.append(title)
+    cont = data.get("continue")
+    if cont:
+        base, _, query = url.partition("?")
+        params = dict(urllib.parse.parse_qsl(query))
+        params.update(cont)
+        page.next_href = base + "?" + urllib.parse.urlencode(params)
+    return page
+
+def _by_requested_title(url: str, query: dict, by_title: dict) -> dict:
+    """Ответ по итоговым названиям → по заголовкам из запроса (нормализация, редиректы)."""
+    rename = {}
+    for section in ("normalized", "redirects"):
+        for r in query.get(section, []):
+            rename[r["from"]] = r["to"]
+    result = {}
+    for title in (_query_param(url, "titles") or "").split("|"):
+        resolved = title
+        while resolved in rename:
+            resolved = rename[resolved]
+        result[title] = by_title.get(resolved)
+    return result
+
+def parse_pages_response(url: str, data: dict) -> dict[str, Optional[PageExtract]]:
+    """{запрошенный заголовок: PageExtract или None, если страницы нет}."""
+    query = data.get("query", {})
+    by_title = {}
+    for p in query.get("pages", []):
+        if p.get("missing") or p.get("invalid") or not p.get("revisions"):
+            continue
+        rev = p["revisions"][0]
+        content = rev.get("slots", {}).get("main", {}).get("content", rev.get("content", ""))
+        cats = [c["title"] for c in p.get("categories", [])]
+        page = by_title[p["title"]] = extract_wikitext(content, cats)
+        page.title, page.revid = p["title"], rev.get("revid")
+    return _by_requested_title(url, query, by_title)
+
+def parse_page_info(url: str, data: dict) -> dict[str, Optional[int]]:
+    """{запрошенный заголовок: последняя ревизия или None, если страницы нет}."""
+    query = data.get("query", {})
+    by_title = {p["title"]: p.get("lastrevid") for p in query.get("pages", [])
+                if not p.get("missing") and not p.get("invalid")}
+    return _by_requested_title(url, query, by_title)
+
+def parse_recent_changes(data: dict) -> tuple[dict[str, int], Optional[dict]]:
+    """({название: последняя ревизия в выборке}, параметры continue или None)."""
+    latest: dict[str, int] = {}
+    for rc in data.get("query", {}).get("recentchanges", []):
+        title, revid = rc.get("title"), rc.get("revid") or 0
+        if title and revid > latest.get(title, 0):
+            latest[title] = revid
+    return latest, data.get("continue")
+
+def extract_response(url: str, text: str, parser: str = "html.parser", targeted: bool = False):
+    """Стадия разбора для FetchEngine: HTML-страница или ответ api.php."""
+    if not is_api_url(url):
+        return extract_page(text, parser=parser, targeted=targeted)
+    data = json.loads(text)
+    if _query_param(url, "list") == "categorymembers":
+        return parse_category_response(url, data)
+    return parse_pages_response(url, data)
+
+
+# -----------------------------
+# Пакетная загрузка статей
+# -----------------------------
+class BatchedPages:
+    """
+    Статьи по заголовку через prop=revisions пачками по BATCH_SIZE.
+    prefetch() раскладывает заголовки по пачкам и ставит их в FetchEngine,
+    get() ждёт свою пачку и раздаёт её результаты остальным заголовкам.
+    Заголовки, которые так и не запросят (дубликаты, уже посещённые, за пределом
+    cap категории), память не держат: готовые статьи — LRU на max_ready,
+    незабранные пачки — не больше max_batches (самая старая забывается).
+    """
+
+    _MISSING = object()
+
+    def __init__(self, engine, api_url: str, batch_size: int = BATCH_SIZE,
+                 max_ready: int = READY_LIMIT, max_batches: int = QUEUED_BATCHES):
+        self.engine = engine
+        self.api_url = api_url
+        self.batch_size = batch_size
+        self.max_ready = max(1, max_ready)
+        self.max_batches = max(1, max_batches)
+        self._queued: dict[str, str] = {}                          # заголовок → URL пачки
+        self._batches: OrderedDict[str, list[str]] = OrderedDict()  # URL пачки → заголовки
+        self._ready: OrderedDict[str, Optional[PageExtract]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prefetch(self, titles: Iterable[str]):
+        with self._lock:
+            fresh = []
+            for t in titles:
+                if t and t not in self._queued and t not in self._ready and t not in fresh:
+                    fresh.append(t)
+            for i in range(0, len(fresh), self.batch_size):
+                chunk = fresh[i:i + self.batch_size]
+                url = pages_url(self.api_url, chunk)
+                self._batches[url] = chunk
+                for t in chunk:
+                    self._queued[t] = url
+            evicted = []
+            while len(self._batches) > self.max_batches:
+                stale_url, stale = self._batches.popitem(last=False)
+                evicted.append(stale_url)
+                for t in stale:
+                    self._queued.pop(t, None)
+            urls = {self._queued[t] for t in fresh if t in self._queued}
+        for url in evicted:
+            self.engine.discard(url)
+        for url in urls:
+            self.engine.submit(url)
+
+    def get(self, title: str) -> Optional[PageExtract]:
+        while True:
+            with self._lock:
+                page = self._ready.pop(title, self._MISSING)
+                if page is not self._MISSING:
+                    return page
+                url = self._queued.get(title)
+            if url is not None:
+                break
+            self.prefetch([title])
+        result = self.engine.get(url)
+        with self._lock:
+            batch = self._batches.pop(url, [])
+            for t in batch:
+                self._queued.pop(t, None)
+            if result is None:
+                # пачка не загрузилась: это не «страницы нет» — остальные заголовки
+                # в _ready не попадают и при своём get() запрашиваются заново
+                return None
+            for t in batch:
+                if t != title:
+                    self._ready[t] = result.get(t)
+                    self._ready.move_to_end(t)
+            while len(self._ready) > self.max_ready:
+                self._ready.popitem(last=False)
+        return result.get(title)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Локальный кеш страниц ru.fandom на диске.
+  <root>/index/<sha1(url)>.json  — url, ETag, Last-Modified, время загрузки, хеш тела
+  <root>/objects/<sha256>.html.gz — сжатое тело (content-addressed: одинаковые
+                                    страницы под разными URL хранятся один раз)
+Повторная загрузка — условный GET (If-None-Match / If-Modified-Since).
+В офлайн-режиме сеть не используется вообще: только то, что уже в кеше.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, asdict
+from typing import Iterator, Optional
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: str  # sha256 тела
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class PageCache:
+    def __init__(self, root: str, offline: bool = False, max_age: float = 0.0):
+        """
+        max_age — сколько секунд запись считается свежей и отдаётся без
+        обращения к серверу (0 — всегда ревалидировать).
+        """
+        self.root = root
+        self.offline = offline
+        self.max_age = max_age
+
+    def _index_path(self, url: str) -> str:
+        h = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "index", h[:2], h + ".json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ".html.gz")
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._index_path(url), "r", encoding="utf-8") as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        if not os.path.exists(self._object_path(entry.body)):
+            return None
+        return entry
+
+    def entries(self) -> Iterator[CacheEntry]:
+        """Все записи кеша (в стабильном порядке) — например, как корпус для bench.py."""
+        index = os.path.join(self.root, "index")
+        for dirpath, dirnames, files in os.walk(index):
+            dirnames.sort()
+            for name in sorted(files):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(dirpath, name), "r", encoding="utf-8") as f:
+                        yield CacheEntry(**json.load(f))
+                except (OSError, ValueError, TypeError):
+                    continue
+
+    def read(self, entry: CacheEntry) -> Optional[str]:
+        path = self._object_path(entry.body)
+        try:
+            with gzip.open(path, "rb") as f:
+                return f.read().decode("utf-8")
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, zlib.error, UnicodeDecodeError):
+            # оборванная запись или битый файл (BadGzipFile — тоже OSError): промах,
+            # и запись вон, чтобы страницу скачали заново, а не читали битую снова
+            self.evict(entry)
+            return None
+
+    def evict(self, entry: CacheEntry):
+        """Убрать запись и её тело (тело общее у одинаковых страниц — они тоже станут промахами)."""
+        for path in (self._index_path(entry.url), self._object_path(entry.body)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return self.offline or (time.time() - entry.fetched_at) < self.max_age
+
+    def has_fresh(self, url: str) -> bool:
+        entry = self.lookup(url)
+        return entry is not None and self.is_fresh(entry)
+
+    def get_fresh(self, url: str) -> Optional[str]:
+        """Тело страницы, если её можно отдать без сети; иначе None."""
+        entry = self.lookup(url)
+        if entry is None or not self.is_fresh(entry):
+            return None
+        return self.read(entry)
+
+    def store(self, url: str, text: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> CacheEntry:
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        obj = self._object_path(digest)
+        if not os.path.exists(obj):
+            _atomic_write(obj, gzip.compress(raw, compresslevel=6))
+        entry = CacheEntry(url=url, body=digest, etag=etag,
+                           last_modified=last_modified, fetched_at=time.time())
+        self._write_entry(entry)
+        return entry
+
+    def touch(self, entry: CacheEntry):
+        """Сервер ответил 304 — тело то же, обновляем только время проверки."""
+        entry.fetched_at = time.time()
+        self._write_entry(entry)
+
+    def _write_entry(self, entry: CacheEntry):
+        data = json.dumps(asdict(entry), ensure_ascii=False).encode("utf-8")
+        _atomic_write(self._index_path(entry.url), data)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Записи о уже загруженных статьях: разобранная страница + вычисленный тип.
+Страница, скачанная ради определения типа родственника, остаётся здесь,
+и полный скрапинг того же персонажа берёт её отсюда — без второй загрузки
+и второго разбора. Записи ограничены LRU: после полного скрапинга запись
+забирается (pop), для типа дальше хватает реестра сущностей.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from rdflib import URIRef
+
+from extract import PageExtract
+
+
+@dataclass
+class PageRecord:
+    page: Optional[PageExtract]       # None — страница недоступна
+    rdf_type: Optional[URIRef] = None  # type_from_sources; None — нет инфобокса
+
+
+class PageRecords:
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max(1, max_entries)
+        self._records: OrderedDict[str, PageRecord] = OrderedDict()
+        self.reused = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, title: str) -> Optional[PageRecord]:
+        record = self._records.get(title)
+        if record is not None:
+            self._records.move_to_end(title)
+            self.reused += 1
+        return record
+
+    def pop(self, title: str) -> Optional[PageRecord]:
+        record = self._records.pop(title, None)
+        if record is not None:
+            self.reused += 1
+        return record
+
+    def put(self, title: str, record: PageRecord):
+        self._records[title] = record
+        self._records.move_to_end(title)
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Таблицы правил извлечения — во внешнем файле (rules.json рядом с модулем;
+.yaml/.yml — если установлен PyYAML):
+  field_map            — подпись поля инфобокса → [свойство, класс-fallback];
+  category_to_class    — категория → класс;
+  family_section_roles — роль в разделе «Семья» → свойство;
+  family_infobox_roles — роль в поле «Семья» инфобокса → свойство;
+  text_relations       — [свойство, регулярка] для поиска родственников в тексте.
+Файл читается один раз при импорте, роли компилируются в RoleMatcher —
+одна регулярка на таблицу, самая длинная роль побеждает.
+Новые роли, связи или языки добавляются правкой файла, без кода.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import yaml  # необязательно: правила в YAML
+except ImportError:
+    yaml = None
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+
+class RoleMatcher:
+    """
+    Роли (слова и словосочетания) → свойство. Все роли — одна регулярка,
+    альтернативы от длинных к коротким; из найденных выбирается самая
+    длинная («внучатый племянник» раньше «племянник», «крёстный отец» раньше «отец»).
+    """
+
+    def __init__(self, roles: dict[str, str]):
+        self.roles = dict(roles)
+        by_length = sorted(self.roles, key=len, reverse=True)
+        self._rank = {role: i for i, role in enumerate(by_length)}
+        alternation = "|".join(re.escape(r) for r in by_length)
+        # lookahead: совпадения с каждой позиции, в том числе перекрывающиеся
+        self._anywhere = re.compile(rf"(?=({alternation}))")
+        self._words = re.compile(rf"(?=\b({alternation})\b)")
+
+    def _best(self, rx: re.Pattern, text: str) -> Optional[str]:
+        found = [m.group(1) for m in rx.finditer(text)]
+        if not found:
+            return None
+        return self.roles[min(found, key=self._rank.__getitem__)]
+
+    def match(self, text: str) -> Optional[str]:
+        """Свойство для самой длинной роли, встретившейся в тексте где угодно."""
+        return self._best(self._anywhere, text)
+
+    def match_word(self, text: str) -> Optional[str]:
+        """То же, но роль — целые слова («дед» не находится в «дедушка»)."""
+        return self._best(self._words, text)
+
+
+@dataclass
+class Rules:
+    field_map: dict[str, tuple[str, Optional[str]]]
+    category_to_class: dict[str, str]
+    family_section: RoleMatcher
+    family_infobox: RoleMatcher
+    text_relations: list[tuple[str, re.Pattern]]
+
+
+def _read(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError(f"Для {path} нужен PyYAML (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_rules(path: str = RULES_FILE) -> Rules:
+    data = _read(path)
+    return Rules(
+        field_map={label: (prop, cls) for label, (prop, cls) in data["field_map"].items()},
+        category_to_class=dict(data["category_to_class"]),
+        family_section=RoleMatcher(data["family_section_roles"]),
+        family_infobox=RoleMatcher(data["family_infobox_roles"]),
+        text_relations=[(prop, re.compile(pattern, re.IGNORECASE | re.UNICODE))
+                        for prop, pattern in data["text_relations"]],
+    )
+
+
+RULES = load_rules()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# модули проекта лежат плоско рядом с tests/ и импортируются по имени (import mw_api, ...)
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Режим INGEST="api": прогон lab против локального api.php (api_stub) и пачки BatchedPages.
+Прогон идёт в отдельном процессе: lab при импорте открывает файлы состояния и движок загрузки.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from rdflib import Graph, Literal, Namespace, RDF, RDFS
+
+import api_stub
+import mw_api
+from conftest import PROJECT_DIR
+
+HPO = Namespace("http://www.semanticweb.org/ekaterinakulesova/ontologies/2025/0/harry_potter#")
+
+
+def test_api_crawl_builds_graph(tmp_path):
+    out = tmp_path / "graph.ttl"
+    proc = subprocess.run(
+        [sys.executable, os.path.join(PROJECT_DIR, "api_stub.py"), "crawl", "--out", str(out)],
+        capture_output=True, text=True, timeout=300, cwd=tmp_path,
+    )
+    assert proc.returncode == 0, proc.stderr
+    summary = json.loads(proc.stdout)
+
+    g = Graph().parse(out)
+    assert len(g) == summary["triples"]
+    fixture = api_stub.load_fixture()
+    assert 0 < summary["pages"] <= len(fixture["pages"])
+    # статьи приходят пачками, участники категорий — с continue (MAX_MEMBERS за ответ)
+    assert summary["requests"]["revisions|categories"] < summary["pages"]
+    longest = max(len(members) for members in fixture["categories"].values())
+    assert summary["requests"]["categorymembers"] > len(fixture["categories"])
+    assert longest > api_stub.MAX_MEMBERS
+
+    harry = HPO.Garri_Potter
+    assert (harry, RDF.type, HPO.Wizard) in g
+    assert (harry, RDFS.label, Literal("Гарри Поттер", lang="ru")) in g
+    assert (harry, HPO.hasFather, HPO.Dzheims_Potter) in g
+    assert (harry, HPO.memberOf, HPO.Griffindor) in g
+    assert (HPO.Argus_Filch, RDF.type, HPO.Squib) in g
+
+
+class FakeEngine:
+    """FetchEngine без сети: ответ пачки — заголовок → заглушка; failing — пачки, которые не загрузились."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.fetched = []
+
+    def submit(self, url):
+        pass
+
+    def discard(self, url):
+        pass
+
+    def get(self, url):
+        titles = mw_api._query_param(url, "titles").split("|")
+        self.fetched.append(titles)
+        if self.failing & set(titles):
+            return None
+        return {t: mw_api.PageExtract(title=t) for t in titles}
+
+
+def test_batched_pages_shares_batch():
+    engine = FakeEngine()
+    pages = mw_api.BatchedPages(engine, "http://wiki/api.php", batch_size=3)
+    pages.prefetch(["А", "Б", "В"])
+    assert [pages.get(t).title for t in ("А", "Б", "В")] == ["А", "Б", "В"]
+    assert engine.fetched == [["А", "Б", "В"]]
+
+
+def test_batched_pages_failed_batch_is_not_cached_as_missing():
+    engine = FakeEngine(failing={"А"})
+    pages = mw_api.BatchedPages(engine, "http://wiki/api.php", batch_size=3)
+    pages.prefetch(["А", "Б", "В"])
+    assert pages.get("А") is None
+    # остальные заголовки пачки запрашиваются заново, а не считаются отсутствующими
+    assert pages.get("Б").title == "Б"
+    assert engine.fetched == [["А", "Б", "В"], ["Б"]]
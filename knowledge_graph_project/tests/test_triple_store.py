@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+InternedStore против rdflib Memory: add/remove/triples дают одно и то же
+при слиянии блоков (LSM), пометках удалённых, _compact и через снимок.
+Хвост и порог потокового слияния уменьшены, чтобы на сотнях триплетов
+сработали все ветки.
+"""
+import itertools
+import pickle
+import random
+
+import pytest
+from rdflib import Graph, URIRef, Literal, BNode, RDF, XSD
+
+import triple_store
+from triple_store import InternedStore
+
+A = "http://ex.org/a#"
+B = "http://ex.org/b/"
+NODES = ([URIRef(A + f"n{i}") for i in range(30)] + [URIRef(B + f"Ж{i}") for i in range(10)]
+         + [Literal("x"), Literal("x", lang="ru"), Literal(5), Literal("5", datatype=XSD.string),
+            Literal("Пол: м", lang="ru"), BNode("b1")])
+SUBJECTS = [n for n in NODES if not isinstance(n, Literal)]
+PREDICATES = [URIRef(A + f"p{i}") for i in range(6)] + [RDF.type]
+
+
+@pytest.fixture(autouse=True)
+def small_runs(monkeypatch):
+    monkeypatch.setattr(triple_store, "TAIL_SIZE", 7)
+    monkeypatch.setattr(triple_store, "SORT_MERGE_LIMIT", 50)
+
+
+def random_triple(rng):
+    return rng.choice(SUBJECTS), rng.choice(PREDICATES), rng.choice(NODES)
+
+
+def patterns(triple):
+    """Все 8 шаблонов с None на месте любых позиций триплета."""
+    for mask in itertools.product((False, True), repeat=3):
+        yield tuple(None if wild else term for wild, term in zip(mask, triple))
+
+
+def assert_same(expected: Graph, actual: Graph, rng, probes: int = 30):
+    assert len(actual) == len(expected)
+    assert set(actual) == set(expected)
+    for _ in range(probes):
+        for pattern in patterns(random_triple(rng)):
+            assert set(actual.triples(pattern)) == set(expected.triples(pattern)), pattern
+
+
+def test_matches_memory_through_merges_and_tombstones():
+    rng = random.Random(3)
+    memory, interned = Graph(), Graph(store=InternedStore())
+    seen = {"runs": 0, "tombstones": 0, "compactions": 0}
+    for step in range(3000):
+        triple = random_triple(rng)
+        memory.add(triple)
+        interned.add(triple)
+        if step % 97 == 0:
+            # удаление по шаблону: часть триплетов в хвосте, часть — в блоках
+            pattern = tuple(rng.choice((None, term)) for term in triple)
+            before = interned.store.stats()["tombstones"]
+            memory.remove(pattern)
+            interned.remove(pattern)
+            if interned.store.stats()["tombstones"] < before:
+                seen["compactions"] += 1
+        stats = interned.store.stats()
+        seen["runs"] = max(seen["runs"], stats["runs"])
+        seen["tombstones"] = max(seen["tombstones"], stats["tombstones"])
+        if step % 250 == 0:
+            assert_same(memory, interned, rng)
+    assert_same(memory, interned, rng, probes=200)
+    assert seen["runs"] > 1 and seen["tombstones"] > 0 and seen["compactions"] > 0, seen
+
+
+def test_readd_after_remove_and_duplicates():
+    store = InternedStore()
+    graph = Graph(store=store)
+    triples = [(URIRef(A + f"s{i}"), RDF.type, URIRef(A + "Wizard")) for i in range(20)]
+    for t in triples + triples:
+        graph.add(t)
+    assert len(graph) == 20 and store.stats()["runs"] >= 1
+    graph.remove((None, RDF.type, None))
+    assert len(graph) == 0 and list(graph) == []
+    # триплеты из блоков возвращаются из-под пометки, а не дублируются
+    for t in triples[:5] + triples[:5]:
+        graph.add(t)
+    assert len(graph) == 5
+    assert set(graph) == set(triples[:5])
+    assert (triples[7][0], None, None) not in graph
+
+
+def test_compact_keeps_contents():
+    rng = random.Random(7)
+    memory, interned = Graph(), Graph(store=InternedStore())
+    for _ in range(400):
+        t = random_triple(rng)
+        memory.add(t)
+        interned.add(t)
+    for _ in range(10):
+        t = random_triple(rng)
+        memory.remove(t)
+        interned.remove(t)
+    interned.store._compact()
+    stats = interned.store.stats()
+    assert stats["runs"] <= 1 and stats["tombstones"] == 0
+    assert_same(memory, interned, rng)
+
+
+def test_add_while_iterating():
+    graph = Graph(store=InternedStore())
+    for i in range(30):
+        graph.add((URIRef(A + f"s{i}"), RDF.type, URIRef(A + "Human")))
+    for s in list(graph.subjects(RDF.type, URIRef(A + "Human"))):
+        graph.add((s, URIRef(A + "p0"), Literal("x")))
+    matched = 0
+    for s, _, _ in graph.triples((None, RDF.type, None)):
+        graph.add((s, URIRef(A + "p1"), Literal(matched)))  # хвост сбрасывается посреди перебора
+        matched += 1
+    assert matched == 30 and len(graph) == 90
+
+
+def test_snapshot_round_trip(tmp_path):
+    rng = random.Random(11)
+    memory, interned = Graph(), Graph(store=InternedStore())
+    interned.bind("a", A)
+    for step in range(600):
+        t = random_triple(rng)
+        memory.add(t)
+        interned.add(t)
+        if step % 50 == 0:
+            memory.remove((t[0], None, None))
+            interned.remove((t[0], None, None))
+    assert interned.store.stats()["tombstones"] or interned.store._tail
+    path = str(tmp_path / "g.snapshot")
+    assert triple_store.save_snapshot(interned, path) == len(memory)
+    # save() сбрасывает хвост и пометки, содержимое то же
+    assert_same(memory, interned, rng)
+
+    restored = triple_store.load_graph(path)
+    assert_same(memory, restored, rng)
+    assert dict(restored.namespaces())["a"] == URIRef(A)
+    # после восстановления граф продолжает жить: запись, удаление, новый снимок
+    extra = (URIRef(B + "новый"), PREDICATES[0], Literal("y", lang="ru"))
+    for graph in (memory, restored):
+        graph.add(extra)
+        graph.remove((None, PREDICATES[1], None))
+    assert_same(memory, restored, rng)
+    triple_store.save_snapshot(restored, path)
+    assert_same(memory, triple_store.load_graph(path), rng)
+
+
+def test_load_snapshot_into_graph_with_triples(tmp_path):
+    rng = random.Random(5)
+    source = Graph()
+    for _ in range(200):
+        source.add(random_triple(rng))
+    path = str(tmp_path / "g.snapshot")
+    assert triple_store.save_snapshot(source, path) == len(source)
+
+    local = (URIRef(B + "локальный"), RDF.type, URIRef(A + "Squib"))
+    for store in ("interned", "memory"):
+        graph = triple_store.open_graph(store)
+        graph.add(local)
+        graph.add(next(iter(source)))
+        assert triple_store.load_snapshot(graph, path) == len(source)
+        expected = Graph()
+        expected += source
+        expected.add(local)
+        assert_same(expected, graph, rng)
+
+
+def test_restore_rejects_foreign_pickle(tmp_path):
+    path = tmp_path / "other.pickle"
+    path.write_bytes(pickle.dumps({"format": ("something-else", 1)}))
+    with pytest.raises(ValueError):
+        InternedStore().restore(str(path))
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP-транспорт краулера: пул keep-alive соединений на хост, сжатие, метрики.
+  "requests" — requests.Session + HTTPAdapter (urllib3): pool_size соединений
+               на хост, pool_block=True — лишний запрос ждёт свободное соединение,
+               а не открывает одноразовое; 500/502/504 повторяет urllib3 Retry;
+  "httpx"    — httpx.Client(http2=True): одно TLS-соединение на хост, запросы из
+               потоков FetchEngine мультиплексируются в нём как потоки HTTP/2
+               (нужно pip install "httpx[http2]").
+Accept-Encoding — всё, что умеет распаковать окружение: gzip/deflate всегда,
+br и zstd — если установлены brotli/zstandard.
+429/503 транспорт не повторяет: это решает FetchEngine (Retry-After, темп).
+stats(): запросы, новые соединения и TLS-рукопожатия, доля переиспользования
+соединений, байты по сети (сжатые) и после распаковки.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+try:
+    import httpx  # необязательно: HTTP/2
+except ImportError:
+    httpx = None
+
+RETRY_STATUSES = (500, 502, 504)
+
+
+class TransportError(Exception):
+    """Запрос не удался на уровне сети (соединение, таймаут, протокол)."""
+
+
+def accept_encoding() -> str:
+    return make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class TransportStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = self.connections = self.tls_handshakes = 0
+        self.bytes_wire = self.bytes_decoded = 0
+        self.http2_responses = 0
+        self.seconds = 0.0
+
+    def count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            reuse = 1 - self.connections / self.requests if self.requests else None
+            ratio = self.bytes_wire / self.bytes_decoded if self.bytes_decoded else None
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_rate": reuse if reuse is None else round(max(0.0, reuse), 3),
+                "http2_responses": self.http2_responses,
+                "bytes_wire": self.bytes_wire,
+                "bytes_decoded": self.bytes_decoded,
+                "compression_ratio": ratio if ratio is None else round(ratio, 3),
+                "seconds": round(self.seconds, 3),
+            }
+
+
+# -----------------------------
+# requests / urllib3
+# -----------------------------
+def _counting_pools(stats: TransportStats):
+    """
+    Классы пулов urllib3, которые считают установленные соединения (и TLS-рукопожатия).
+    Считается connect(), а не создание объекта: закрытое сервером соединение
+    urllib3 переподключает в том же объекте.
+    """
+
+    class CountingHTTPConnection(HTTPConnection):
+        def connect(self):
+            stats.count(connections=1)
+            super().connect()
+
+    class CountingHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            stats.count(connections=1, tls_handshakes=1)
+            super().connect()
+
+    class CountingHTTPPool(HTTPConnectionPool):
+        ConnectionCls = CountingHTTPConnection
+
+    class CountingHTTPSPool(HTTPSConnectionPool):
+        ConnectionCls = CountingHTTPSConnection
+
+    return {"http": CountingHTTPPool, "https": CountingHTTPSPool}
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: TransportStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _counting_pools(self._stats)
+
+
+class RequestsTransport:
+    name = "requests"
+
+    def __init__(self, pool_size: int = 8, pool_hosts: int = 4, retries: int = 4,
+                 backoff: float = 0.5, user_agent: Optional[str] = None):
+        self.stats = TransportStats()
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = accept_encoding()
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        retry = Retry(
+            total=retries, backoff_factor=backoff,
+            status_forcelist=list(RETRY_STATUSES), respect_retry_after_header=False,
+            allowed_methods=["GET"], raise_on_status=False,
+        )
+        adapter = _CountingAdapter(self.stats, max_retries=retry, pool_connections=pool_hosts,
+                                   pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout: float = 20):
+        started = time.monotonic()
+        try:
+            r = self.session.get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            raise TransportError(str(e)) from e
+        # tell() у urllib3 — сколько байт пришло по сети (до распаковки)
+        self.stats.count(requests=1, bytes_wire=r.raw.tell(), bytes_decoded=len(r.content),
+                         seconds=time.monotonic() - started)
+        return r
+
+    def close(self):
+        self.session.close()
+
+
+# -----------------------------
+# httpx (HTTP/2)
+# -----------------------------
+class HttpxTransport:
+    name = "httpx"
+
+    def __init__(self, pool_size: int = 8, pool_hosts: int = 4, retries: int = 4,
+                 backoff: float = 0.5, user_agent: Optional[str] = None, http2: bool = True):
+        if httpx is None:
+            raise RuntimeError('Для TRANSPORT="httpx" нужен httpx (pip install "httpx[http2]")')
+        self.stats = TransportStats()
+        self.retries = retries
+        self.backoff = backoff
+        headers = {"Accept-Encoding": accept_encoding()}
+        if user_agent:
+            headers["User-Agent"] = user_agent
+        # у HTTP/2 pool_size — потолок потоков, соединение на хост обычно одно;
+        # retries транспорта httpx — только ошибки соединения, 5xx повторяет get()
+        limits = httpx.Limits(max_connections=pool_size * pool_hosts,
+                              max_keepalive_connections=pool_size * pool_hosts)
+        self.client = httpx.Client(
+            headers=headers,
+            transport=httpx.HTTPTransport(http2=http2, limits=limits, retries=retries),
+        )
+
+    def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            self.stats.count(connections=1)
+        elif event == "connection.start_tls.complete":
+            self.stats.count(tls_handshakes=1)
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout: float = 20):
+        started = time.monotonic()
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.client.get(url, headers=headers, timeout=timeout,
+                                    extensions={"trace": self._trace})
+            except httpx.HTTPError as e:
+                raise TransportError(str(e)) from e
+            self.stats.count(requests=1, bytes_wire=r.num_bytes_downloaded, bytes_decoded=len(r.content),
+                             http2_responses=int(r.http_version == "HTTP/2"))
+            if r.status_code not in RETRY_STATUSES or attempt == self.retries:
+                break
+            time.sleep(self.backoff * 2 ** attempt)
+        self.stats.count(seconds=time.monotonic() - started)
+        return r
+
+    def close(self):
+        self.client.close()
+
+
+TRANSPORTS = {"requests": RequestsTransport, "httpx": HttpxTransport}
+
+
+def open_transport(kind: str = "requests", **kwargs):
+    """Транспорт по имени ("requests" | "httpx"); kwargs — pool_size, pool_hosts, retries, ..."""
+    try:
+        return TRANSPORTS[kind](**kwargs)
+    except KeyError:
+        raise ValueError(f"Неизвестный транспорт: {kind!r} (есть: {', '.join(TRANSPORTS)})") from None
@@ -0,0 +1,613 @@
+# -*- coding: utf-8 -*-
+"""
+Хранилище триплетов для графа: в памяти (как раньше) или на диске.
+  - "memory"  — стандартный rdflib Memory, весь граф в RAM;
+  - "interned" — InternedStore ниже: тоже в RAM, но компактно — термы
+                 хранятся один раз и заменяются целыми ID, триплет — три
+                 64-битных ключа в отсортированных массивах (spo, pos, osp);
+  - "sqlite"  — SQLiteStore ниже: триплеты в одном файле, индексы под
+                 проверки вида (s, RDF.type, None) in g, фиксация транзакцией;
+  - любое другое имя — плагин rdflib (например "BerkeleyDB" или "Oxigraph",
+    если установлен oxrdflib), path передаётся ему в open().
+Готовый граф на диске открывается сразу, без разбора Turtle.
+Снимок (save_snapshot/load_snapshot) — граф InternedStore в одном бинарном
+файле: словари термов и массивы индексов как есть, загрузка без разбора
+и без пересортировки — для старта с графа прошлого прогона.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import pickle
+import sqlite3
+import tempfile
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional
+
+from rdflib import Graph, URIRef, Literal, BNode
+from rdflib.store import Store, VALID_STORE
+from rdflib.plugins.stores.memory import Memory
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS triples (
+    s TEXT NOT NULL,
+    p TEXT NOT NULL,
+    o TEXT NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_po ON triples(p, o);
+CREATE INDEX IF NOT EXISTS triples_os ON triples(o, s);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri    TEXT NOT NULL
+);
+"""
+
+
+# -----------------------------
+# Кодирование термов
+# -----------------------------
+def encode(term) -> str:
+    """Терм → ключ: первый символ — вид терма, у литерала ещё язык и тип через \\x00."""
+    if isinstance(term, URIRef):
+        return "<" + str(term)
+    if isinstance(term, BNode):
+        return "_" + str(term)
+    if isinstance(term, Literal):
+        return '"' + (term.language or "") + "\x00" + str(term.datatype or "") + "\x00" + str(term)
+    raise TypeError(f"Не RDF-терм: {term!r}")
+
+
+def decode(key: str):
+    kind, rest = key[0], key[1:]
+    if kind == "<":
+        return URIRef(rest)
+    if kind == "_":
+        return BNode(rest)
+    lang, datatype, value = rest.split("\x00", 2)
+    return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+
+
+class SQLiteStore(Store):
+    """
+    Контекстно-независимое хранилище rdflib поверх SQLite.
+    Изменения копятся в транзакции до commit() (его делает чекпоинт).
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None):
+        self.db: sqlite3.Connection | None = None
+        super().__init__(configuration, identifier)
+
+    # --- жизненный цикл ---
+    def open(self, configuration: str, create: bool = False) -> int:
+        if self.db is not None:
+            return VALID_STORE
+        self.db = sqlite3.connect(configuration)
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False):
+        if self.db is None:
+            return
+        if commit_pending_transaction:
+            self.db.commit()
+        self.db.close()
+        self.db = None
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    # --- триплеты ---
+    def add(self, triple, context, quoted: bool = False):
+        self.db.execute("INSERT OR IGNORE INTO triples(s, p, o) VALUES (?, ?, ?)",
+                        tuple(encode(t) for t in triple))
+        super().add(triple, context, quoted)
+
+    def addN(self, quads: Iterable):
+        self.db.executemany("INSERT OR IGNORE INTO triples(s, p, o) VALUES (?, ?, ?)",
+                            ((encode(s), encode(p), encode(o)) for s, p, o, _ in quads))
+
+    @staticmethod
+    def _where(pattern) -> tuple[str, list[str]]:
+        conds, args = [], []
+        for col, term in zip("spo", pattern):
+            if term is not None:
+                conds.append(f"{col} = ?")
+                args.append(encode(term))
+        return (" WHERE " + " AND ".join(conds)) if conds else "", args
+
+    def remove(self, triple_pattern, context=None):
+        where, args = self._where(triple_pattern)
+        self.db.execute("DELETE FROM triples" + where, args)
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        where, args = self._where(triple_pattern)
+        # fetchall: вызывающий код может менять граф, пока перебирает результат
+        for s, p, o in self.db.execute("SELECT s, p, o FROM triples" + where, args).fetchall():
+            yield (decode(s), decode(p), decode(o)), iter(())
+
+    def __len__(self, context=None) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # --- префиксы ---
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        if override:
+            self.db.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+            self.db.execute("INSERT OR REPLACE INTO namespaces(prefix, uri) VALUES (?, ?)",
+                            (prefix, str(namespace)))
+        else:
+            self.db.execute("INSERT OR IGNORE INTO namespaces(prefix, uri) VALUES (?, ?)",
+                            (prefix, str(namespace)))
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        row = self.db.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        row = self.db.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        for prefix, uri in self.db.execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
+
+
+# -----------------------------
+# Компактное хранилище в памяти
+# -----------------------------
+NODE_BITS = 26  # до 67 млн разных субъектов/объектов
+PRED_BITS = 12  # до 4096 предикатов: s, p, o упаковываются в одно 64-битное число
+TAIL_SIZE = 512  # новых триплетов в несортированном хвосте до сброса в отсортированный блок
+TERM_CACHE_SIZE = 4096  # последних термов → ID без построения ключа (сбрасывается целиком)
+SORT_MERGE_LIMIT = 1 << 20  # блоки крупнее сливаются потоково (heapq.merge), без временного списка
+SNAPSHOT_FORMAT = ("hp-kg-interned", 1)  # сигнатура и версия файла снимка
+
+_NODE_MASK = (1 << NODE_BITS) - 1
+_PRED_MASK = (1 << PRED_BITS) - 1
+_SP_SHIFT = NODE_BITS + PRED_BITS  # s в ключе spo, o в ключе osp
+_P_SHIFT = 2 * NODE_BITS           # p в ключе pos
+
+
+def _spo(s: int, p: int, o: int) -> int:
+    return (s << _SP_SHIFT) | (p << NODE_BITS) | o
+
+
+def _spo_ids(key: int) -> tuple[int, int, int]:
+    return key >> _SP_SHIFT, (key >> NODE_BITS) & _PRED_MASK, key & _NODE_MASK
+
+
+def _pos(key: int) -> int:
+    s, p, o = _spo_ids(key)
+    return (p << _P_SHIFT) | (o << NODE_BITS) | s
+
+
+def _osp(key: int) -> int:
+    s, p, o = _spo_ids(key)
+    return (o << _SP_SHIFT) | (s << PRED_BITS) | p
+
+
+def _pos_ids(key: int) -> tuple[int, int, int]:
+    return key & _NODE_MASK, key >> _P_SHIFT, (key >> NODE_BITS) & _NODE_MASK
+
+
+def _osp_ids(key: int) -> tuple[int, int, int]:
+    return (key >> PRED_BITS) & _NODE_MASK, key & _PRED_MASK, key >> _SP_SHIFT
+
+
+def _merge(a: array, b: array) -> array:
+    if len(a) + len(b) <= SORT_MERGE_LIMIT:
+        return array("Q", sorted(a + b))  # timsort сливает два готовых прогона за O(n)
+    return array("Q", heapq.merge(a, b))
+
+
+class _Terms:
+    """
+    Словарь термов: ключ → ID и обратно. URI хранится как ID пространства имён
+    (всё до последнего «#» или «/») плюс локальная часть, так что длинный BASE_IRI
+    лежит в памяти один раз. Строка ключа одна на терм — её держат и dict, и список.
+    Недавние термы (субъект страницы, предикаты) находятся по самому терму, без ключа.
+    """
+
+    def __init__(self, limit: int, kind: str):
+        self.limit = limit
+        self.kind = kind
+        self.ids: dict[str, int] = {}
+        self.keys: list[str] = []
+        self.namespaces: list[str] = []
+        self._ns_ids: dict[str, int] = {}
+        self._recent: dict = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def key(self, term, create: bool = False) -> Optional[str]:
+        if isinstance(term, URIRef):
+            cut = max(term.rfind("#"), term.rfind("/")) + 1
+            ns = str(term[:cut])
+            ns_id = self._ns_ids.get(ns)
+            if ns_id is None:
+                if not create:
+                    return None
+                ns_id = self._ns_ids[ns] = len(self.namespaces)
+                self.namespaces.append(ns)
+            return f"<{ns_id}\x00{term[cut:]}"
+        return encode(term)
+
+    def id(self, term, create: bool = False) -> Optional[int]:
+        term_id = self._recent.get(term)
+        if term_id is not None:
+            return term_id
+        key = self.key(term, create)
+        if key is None:
+            return None
+        term_id = self.ids.get(key)
+        if term_id is None:
+            if not create:
+                return None
+            term_id = len(self.keys)
+            if term_id >= self.limit:
+                raise OverflowError(f"InternedStore: больше {self.limit} разных {self.kind}")
+            self.ids[key] = term_id
+            self.keys.append(key)
+        if len(self._recent) >= TERM_CACHE_SIZE:
+            self._recent.clear()
+        self._recent[term] = term_id
+        return term_id
+
+    def dump(self) -> tuple[list[str], list[str]]:
+        return self.keys, self.namespaces
+
+    def restore(self, keys: list[str], namespaces: list[str]):
+        self.keys = keys
+        self.ids = dict(zip(keys, range(len(keys))))
+        self.namespaces = namespaces
+        self._ns_ids = dict(zip(namespaces, range(len(namespaces))))
+        self._recent = {}
+
+    def term(self, term_id: int):
+        key = self.keys[term_id]
+        if key[0] == "<":
+            ns_id, local = key[1:].split("\x00", 1)
+            return URIRef(self.namespaces[int(ns_id)] + local)
+        return decode(key)
+
+
+class InternedStore(Store):
+    """
+    Контекстно-независимое хранилище rdflib в памяти с целочисленным кодированием.
+    Триплет (s, p, o) из ID термов упакован в 64 бита в трёх порядках — spo, pos, osp,
+    каждый индекс — отсортированные блоки array('Q') (24 байта на триплет вместо
+    объектов Python во вложенных dict у Memory). Новые триплеты копятся в небольшом
+    хвосте; заполненный хвост сортируется в блок, соседние блоки близкого размера
+    сливаются (как в LSM-дереве), поэтому блоков O(log n), а поиск по шаблону —
+    бинарный поиск диапазона в каждом блоке плюс хвост (с заданным s — только
+    триплеты этого субъекта).
+    Удалённый из блока триплет помечается (множество удалённых ключей) и пропускается
+    при поиске, так что правка статьи при обновлении не трогает блоки; когда пометок
+    становится больше 1/8 графа (сброс графа), индексы перестраиваются без них.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None):
+        self.nodes = _Terms(1 << NODE_BITS, "субъектов/объектов")
+        self.predicates = _Terms(1 << PRED_BITS, "предикатов")
+        self._runs: list[tuple[array, array, array]] = []  # (spo, pos, osp), по убыванию размера
+        self._tail: set[int] = set()
+        self._tail_by_s: dict[int, list[int]] = {}
+        self._dead: set[int] = set()  # ключи spo, удалённые из блоков
+        self._count = 0
+        self._prefixes: dict[str, URIRef] = {}
+        self._namespaces: dict[URIRef, str] = {}
+        super().__init__(configuration, identifier)
+
+    # --- запись ---
+    def _insert(self, s, p, o) -> bool:
+        s_id = self.nodes.id(s, True)
+        key = _spo(s_id, self.predicates.id(p, True), self.nodes.id(o, True))
+        if key in self._tail:
+            return False
+        if key in self._dead:
+            # триплет снова в графе: он по-прежнему лежит в своём блоке
+            self._dead.discard(key)
+            self._count += 1
+            return True
+        if self._in_runs(key):
+            return False
+        self._tail.add(key)
+        self._tail_by_s.setdefault(s_id, []).append(key)
+        self._count += 1
+        if len(self._tail) >= TAIL_SIZE:
+            self._flush_tail()
+        return True
+
+    def add(self, triple, context, quoted: bool = False):
+        self._insert(*triple)
+        super().add(triple, context, quoted)
+
+    def addN(self, quads: Iterable):
+        for s, p, o, _ in quads:
+            self._insert(s, p, o)
+
+    def _flush_tail(self):
+        if not self._tail:
+            return
+        keys = self._tail
+        self._runs.append((array("Q", sorted(keys)), array("Q", sorted(map(_pos, keys))),
+                           array("Q", sorted(map(_osp, keys)))))
+        self._tail = set()
+        self._tail_by_s = {}
+        runs = self._runs
+        while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+            newer, older = runs.pop(), runs.pop()
+            runs.append(tuple(_merge(a, b) for a, b in zip(older, newer)))
+
+    def remove(self, triple_pattern, context=None):
+        doomed = [_spo(*ids) for ids in self._match(triple_pattern)]
+        for key in doomed:
+            if key in self._tail:
+                self._tail.discard(key)
+                same_s = self._tail_by_s[key >> _SP_SHIFT]
+                same_s.remove(key)
+                if not same_s:
+                    del self._tail_by_s[key >> _SP_SHIFT]
+            else:
+                self._dead.add(key)
+        self._count -= len(doomed)
+        if len(self._dead) > max(TAIL_SIZE, self._count >> 3):
+            self._compact()
+
+    def _compact(self):
+        """Один отсортированный блок из живых триплетов: пометки удалённых больше не нужны."""
+        keys = self._all_keys()
+        self._runs = []
+        self._tail = set()
+        self._tail_by_s = {}
+        self._dead = set()
+        if keys:
+            self._runs.append((array("Q", keys), array("Q", sorted(map(_pos, keys))),
+                               array("Q", sorted(map(_osp, keys)))))
+
+    # --- поиск ---
+    def _in_runs(self, key: int) -> bool:
+        for spo, _, _ in self._runs:
+            i = bisect_left(spo, key)
+            if i < len(spo) and spo[i] == key:
+                return True
+        return False
+
+    def _all_keys(self) -> list[int]:
+        dead = self._dead
+        keys = [k for run in self._runs for k in run[0] if k not in dead]
+        keys.extend(self._tail)
+        keys.sort()
+        return keys
+
+    def _match(self, pattern) -> Iterator[tuple[int, int, int]]:
+        """ID-тройки, подходящие под шаблон (None — любой терм)."""
+        s, p, o = pattern
+        ids = []
+        for term, terms in ((s, self.nodes), (p, self.predicates), (o, self.nodes)):
+            if term is None:
+                ids.append(None)
+                continue
+            term_id = terms.id(term)
+            if term_id is None:
+                return  # терм ни разу не встречался — совпадений нет
+            ids.append(term_id)
+        s, p, o = ids
+        if s is not None and p is not None and o is not None:
+            key = _spo(s, p, o)
+            if key in self._tail or (key not in self._dead and self._in_runs(key)):
+                yield s, p, o
+            return
+        # индекс, где заданные позиции образуют префикс ключа, и границы диапазона
+        if s is not None:
+            if o is not None:
+                index, unpack = 2, _osp_ids
+                lo = (o << _SP_SHIFT) | (s << PRED_BITS)
+                hi = lo + (1 << PRED_BITS)
+            else:
+                index, unpack = 0, _spo_ids
+                lo = s << _SP_SHIFT if p is None else (s << _SP_SHIFT) | (p << NODE_BITS)
+                hi = lo + (1 << (_SP_SHIFT if p is None else NODE_BITS))
+        elif p is not None:
+            index, unpack = 1, _pos_ids
+            lo = p << _P_SHIFT if o is None else (p << _P_SHIFT) | (o << NODE_BITS)
+            hi = lo + (1 << (_P_SHIFT if o is None else NODE_BITS))
+        elif o is not None:
+            index, unpack = 2, _osp_ids
+            lo, hi = o << _SP_SHIFT, (o + 1) << _SP_SHIFT
+        else:
+            index, unpack, lo, hi = 0, _spo_ids, 0, 1 << 64
+        # вызывающий код может добавлять триплеты, пока перебирает результат:
+        # блоки не меняются на месте (слияние создаёт новые массивы), копируется только хвост
+        runs = list(self._runs)
+        tail = [_spo_ids(k) for k in (self._tail if s is None else self._tail_by_s.get(s, ()))]
+        dead = self._dead
+        for run in runs:
+            keys = run[index]
+            start = bisect_left(keys, lo)
+            for i in range(start, bisect_left(keys, hi, start)):
+                ids = unpack(keys[i])
+                if dead and _spo(*ids) in dead:
+                    continue
+                yield ids
+        for ts, tp, to in tail:
+            if (s is None or ts == s) and (p is None or tp == p) and (o is None or to == o):
+                yield ts, tp, to
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        node, pred = self.nodes.term, self.predicates.term
+        for s, p, o in self._match(triple_pattern):
+            yield (node(s), pred(p), node(o)), iter(())
+
+    def __len__(self, context=None) -> int:
+        return self._count
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def stats(self) -> dict:
+        return {
+            "triples": self._count,
+            "nodes": len(self.nodes),
+            "predicates": len(self.predicates),
+            "namespaces": len(self.nodes.namespaces) + len(self.predicates.namespaces),
+            "runs": len(self._runs),
+            "tombstones": len(self._dead),
+            "index_bytes": sum(a.itemsize * len(a) for run in self._runs for a in run),
+        }
+
+    # --- снимок ---
+    def save(self, path: str):
+        """Атомарно пишет всё содержимое (термы, индексы, префиксы) в бинарный файл."""
+        self._flush_tail()
+        if self._dead:
+            self._compact()
+        state = {
+            "format": SNAPSHOT_FORMAT,
+            "nodes": self.nodes.dump(),
+            "predicates": self.predicates.dump(),
+            "runs": self._runs,
+            "count": self._count,
+            "prefixes": {prefix: str(ns) for prefix, ns in self._prefixes.items()},
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def restore(self, path: str):
+        """
+        Заменяет содержимое снимком из save(). Файл — pickle: открывать только свои снимки.
+        Префиксы снимка добавляются к уже привязанным, не перекрывая их.
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if not isinstance(state, dict) or state.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path}: не снимок InternedStore версии {SNAPSHOT_FORMAT[1]}")
+        self.nodes.restore(*state["nodes"])
+        self.predicates.restore(*state["predicates"])
+        self._runs = state["runs"]
+        self._tail = set()
+        self._tail_by_s = {}
+        self._dead = set()
+        self._count = state["count"]
+        for prefix, ns in state["prefixes"].items():
+            self.bind(prefix, URIRef(ns), override=False)
+
+    # --- префиксы ---
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        namespace = URIRef(namespace)
+        if not override and (prefix in self._prefixes or namespace in self._namespaces):
+            return
+        old = self._namespaces.pop(namespace, None)
+        if old is not None:
+            self._prefixes.pop(old, None)
+        replaced = self._prefixes.pop(prefix, None)
+        if replaced is not None:
+            self._namespaces.pop(replaced, None)
+        self._prefixes[prefix] = namespace
+        self._namespaces[namespace] = prefix
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self._prefixes.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self._namespaces.get(URIRef(namespace))
+
+    def namespaces(self):
+        yield from list(self._prefixes.items())
+
+
+# -----------------------------
+# Открытие графа
+# -----------------------------
+def open_graph(store: str = "memory", path: Optional[str] = None,
+               graph_class: type[Graph] = Graph, **kwargs) -> Graph:
+    """Граф нужного класса (например, LoggedGraph) поверх выбранного хранилища."""
+    if store == "memory":
+        return graph_class(**kwargs)
+    if store == "interned":
+        return graph_class(store=InternedStore(), **kwargs)
+    backend = SQLiteStore() if store == "sqlite" else store
+    graph = graph_class(store=backend, **kwargs)
+    graph.open(path, create=True)
+    return graph
+
+
+def is_persistent(graph: Graph) -> bool:
+    return not isinstance(graph.store, (Memory, InternedStore))
+
+
+def save_snapshot(graph: Graph, path: str) -> int:
+    """Снимок графа в path (граф не на InternedStore сначала копируется в него)."""
+    store = graph.store
+    if not isinstance(store, InternedStore):
+        store = InternedStore()
+        for prefix, namespace in graph.namespaces():
+            store.bind(prefix, namespace)
+        store.addN((s, p, o, None) for s, p, o in graph)
+    store.save(path)
+    return len(store)
+
+
+def load_snapshot(graph: Graph, path: str) -> int:
+    """
+    Добавляет в graph триплеты снимка, возвращает их число. Граф на InternedStore
+    принимает индексы снимка как есть (то, что уже было в графе, добавляется поверх),
+    остальные хранилища — через addN. Журнал LoggedGraph снимок не пишет:
+    его триплеты и так на диске.
+    """
+    if isinstance(graph.store, InternedStore):
+        existing = list(graph)
+        graph.store.restore(path)
+        n = len(graph)
+        graph.store.addN((s, p, o, None) for s, p, o in existing)
+        return n
+    snapshot = InternedStore()
+    snapshot.restore(path)
+    for prefix, namespace in snapshot.namespaces():
+        graph.bind(prefix, namespace, override=False)
+    graph.addN((s, p, o, graph) for (s, p, o), _ in snapshot.triples((None, None, None)))
+    return len(snapshot)
+
+
+def load_graph(path: str) -> Graph:
+    """Граф из снимка — для скриптов и запросов к результату прошлого прогона."""
+    graph = Graph(store=InternedStore())
+    graph.store.restore(path)
+    return graph
+
+
+def to_memory(graph: Graph) -> Graph:
+    """Копия графа в обычном rdflib Memory (с префиксами) — для кода, которому нужен именно он."""
+    copy = Graph()
+    for prefix, namespace in graph.namespaces():
+        copy.bind(prefix, namespace, override=True)
+    copy.addN((s, p, o, copy) for s, p, o in graph)
+    return copy
+
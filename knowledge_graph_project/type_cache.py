@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Кеш определённых типов сущностей (determine_type_for_title).
+  - в памяти — LRU на max_entries записей;
+  - на диске — таблица type_cache в CrawlState, переживает перезапуски
+    и фиксируется вместе с чекпоинтом;
+  - у найденного типа и у «тип не определён» разные TTL: отрицательный
+    результат (часто — временная ошибка сети) живёт недолго и перепроверяется.
+Счётчики hits/misses/expired/evictions — для лога в конце прогона.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from rdflib import URIRef
+
+from crawl_state import CrawlState
+
+MISS = object()  # get(): записи нет или она устарела
+
+
+class TypeCache:
+    def __init__(self, state: CrawlState, max_entries: int = 10000,
+                 ttl: float = 30 * 24 * 3600, negative_ttl: float = 3600):
+        self.state = state
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lru: OrderedDict[str, tuple[Optional[URIRef], float]] = OrderedDict()
+        self.hits = self.misses = self.expired = self.evictions = 0
+
+    def _fresh(self, type_uri: Optional[URIRef], checked_at: float) -> bool:
+        ttl = self.ttl if type_uri is not None else self.negative_ttl
+        return time.time() - checked_at < ttl
+
+    def _remember(self, title: str, type_uri: Optional[URIRef], checked_at: float):
+        self._lru[title] = (type_uri, checked_at)
+        self._lru.move_to_end(title)
+        if len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, title: str):
+        entry = self._lru.get(title)
+        if entry is None:
+            row = self.state.get_type(title)
+            if row is None:
+                return MISS
+            type_uri, checked_at = row
+            entry = (URIRef(type_uri) if type_uri else None, checked_at)
+            self._remember(title, *entry)
+        else:
+            self._lru.move_to_end(title)
+        if not self._fresh(*entry):
+            return MISS
+        return entry[0]
+
+    def __contains__(self, title: str) -> bool:
+        return self._lookup(title) is not MISS
+
+    def get(self, title: str):
+        """Тип (или None — «тип не определён»); MISS, если записи нет или она устарела."""
+        value = self._lookup(title)
+        if value is MISS:
+            if title in self._lru:
+                self.expired += 1
+            else:
+                self.misses += 1
+            return MISS
+        self.hits += 1
+        return value
+
+    def put(self, title: str, type_uri: Optional[URIRef]) -> Optional[URIRef]:
+        now = time.time()
+        self._remember(title, type_uri, now)
+        self.state.put_type(title, str(type_uri) if type_uri is not None else None, now)
+        return type_uri
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired,
+                "evictions": self.evictions, "size": len(self._lru)}